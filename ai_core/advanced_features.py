@@ -26,8 +26,22 @@ import websockets
 import aiohttp
 from pathlib import Path
 
+from sandbox import run_process_async, termination_reason
+from parsed_source import content_hash, get_parsed_source
+from benchmark_stats import BASELINE_PATH, BaselineStore, compare_runs, summarize
+from code_rewriter import rewrite_python
+from code_metrics import compute_code_metrics, maintainability_score, readability_score
+from security_rules import RULESET_VERSION, SECURITY_RULES, RuleSet, fix_suggestion, scan_files, security_score
+from vulnerability_index import DEFAULT_DATASET, VulnerabilityIndex, extract_dependencies
+from profile_analysis import analyze_stats
+from profile_runner import DEFAULT_SAMPLE_INTERVAL, collapsed_stacks, speedscope_profile
+from project_runner import CACHE_PATH, OPTIMIZER_VERSION, optimize_files, run_project
+
 logger = logging.getLogger(__name__)
 
+# سكربت القياس المتكرر المشترك بين المحسن والمحلل (يُشغل في عملية فرعية معزولة)
+BENCHMARK_SCRIPT = str(Path(__file__).parent / "micro_benchmark.py")
+
 @dataclass
 class CodePattern:
     """نمط برمجي مكتشف"""
@@ -242,138 +256,125 @@ class AdvancedLearningEngine:
 class IntelligentCodeOptimizer:
     """محسن الأكواد الذكي"""
     
+    BENCHMARK_REPEAT = 5
+    BENCHMARK_TIMEOUT = 30
+    BENCHMARK_MEMORY_LIMIT_MB = 512
+    # التباطؤ المقبول قبل رفض التحويلات (ضوضاء القياس)
+    SLOWDOWN_TOLERANCE = 0.05
+    
     def __init__(self, knowledge_base):
         self.kb = knowledge_base
-        self.optimization_rules = self._load_optimization_rules()
         self.performance_metrics = {}
         
-    def _load_optimization_rules(self) -> Dict[str, List[Dict]]:
-        """تحميل قواعد التحسين"""
-        return {
-            "python": [
-                {
-                    "name": "list_comprehension",
-                    "pattern": r"for .+ in .+:\s+.+\.append\(.+\)",
-                    "replacement": "list comprehension",
-                    "performance_gain": 0.3
-                },
-                {
-                    "name": "generator_expression",
-                    "pattern": r"sum\(\[.+ for .+ in .+\]\)",
-                    "replacement": "generator expression",
-                    "performance_gain": 0.4
-                },
-                {
-                    "name": "string_join",
-                    "pattern": r".*\+.*\+.*",
-                    "replacement": "str.join()",
-                    "performance_gain": 0.5
-                }
-            ],
-            "javascript": [
-                {
-                    "name": "arrow_functions",
-                    "pattern": r"function\s*\([^)]*\)\s*{[^}]*}",
-                    "replacement": "arrow function",
-                    "performance_gain": 0.1
-                },
-                {
-                    "name": "template_literals",
-                    "pattern": r".*\+.*\+.*",
-                    "replacement": "template literals",
-                    "performance_gain": 0.2
-                }
-            ]
-        }
-    
-    async def optimize_code(self, code: str, language: str) -> Dict[str, Any]:
-        """تحسين الكود"""
+    async def optimize_code(self, code: str, language: str, measure: bool = True) -> Dict[str, Any]:
+        """تحسين الكود
+        
+        performance_improvement نسبة الزمن الموفر فعلياً في قياس معزول
+        (None إذا تعذر القياس). التحويلات تُرفض إذا اختلف سلوك النسختين أو
+        فشلت إحداهما أو أبطأت الكود.
+        """
         optimization_results = {
             "original_code": code,
             "optimized_code": code,
             "optimizations_applied": [],
             "performance_improvement": 0.0,
+            "benchmark": None,
             "readability_score": 0.0,
             "maintainability_score": 0.0
         }
         
-        if language.lower() in self.optimization_rules:
-            rules = self.optimization_rules[language.lower()]
-            
-            for rule in rules:
-                optimized = await self._apply_optimization_rule(
-                    optimization_results["optimized_code"], 
-                    rule
-                )
+        if language.lower() == "python":
+            optimized, applied = await asyncio.to_thread(rewrite_python, code)
+            if applied:
+                optimization_results["optimized_code"] = optimized
+                optimization_results["optimizations_applied"] = applied
                 
-                if optimized != optimization_results["optimized_code"]:
-                    optimization_results["optimized_code"] = optimized
-                    optimization_results["optimizations_applied"].append(rule["name"])
-                    optimization_results["performance_improvement"] += rule["performance_gain"]
-        
-        # تقييم جودة الكود
-        optimization_results["readability_score"] = await self._calculate_readability(
-            optimization_results["optimized_code"], language
-        )
-        optimization_results["maintainability_score"] = await self._calculate_maintainability(
-            optimization_results["optimized_code"], language
-        )
+                if measure:
+                    benchmark = await self._measure_speedup(code, optimized)
+                    optimization_results["benchmark"] = benchmark
+                    improvement = benchmark.get("improvement")
+                    optimization_results["performance_improvement"] = improvement
+                    if improvement is None or improvement < -self.SLOWDOWN_TOLERANCE:
+                        # تعذر التحقق من تطابق السلوك أو أبطأت التحويلات الكود، فيُحتفظ بالأصل
+                        optimization_results["optimized_code"] = code
+                        optimization_results["optimizations_applied"] = []
+                        benchmark["rejected"] = True
+                else:
+                    optimization_results["performance_improvement"] = None
+        
+        # تقييم جودة الكود من مرور واحد على الرموز
+        scores = await self.score_source(optimization_results["optimized_code"], language)
+        optimization_results["readability_score"] = scores["readability_score"]
+        optimization_results["maintainability_score"] = scores["maintainability_score"]
+        optimization_results["metrics"] = scores["metrics"]
         
         return optimization_results
     
-    async def _apply_optimization_rule(self, code: str, rule: Dict) -> str:
-        """تطبيق قاعدة تحسين"""
-        import re
-        
-        # هذا مثال بسيط - في التطبيق الحقيقي نحتاج محلل أكثر تعقيداً
-        if rule["name"] == "list_comprehension":
-            # تحويل حلقات for إلى list comprehension
-            pattern = r"(\w+)\s*=\s*\[\]\s*\nfor\s+(\w+)\s+in\s+(.+):\s*\n\s*\1\.append\((.+)\)"
-            replacement = r"\1 = [\4 for \2 in \3]"
-            code = re.sub(pattern, replacement, code, flags=re.MULTILINE)
+    async def _measure_speedup(self, original: str, optimized: str) -> Dict[str, Any]:
+        """قياس زمن النسختين في عملية فرعية معزولة ومقارنة الوسيط
+        
+        النسختان تُشغلان أولاً مرة واحدة وتُقارن مخرجاتهما واستثناءاتهما وقيمهما
+        العامة، والعملية تعمل في مجلد مؤقت بحدود للذاكرة ووقت المعالج.
+        """
+        import tempfile
+        
+        with tempfile.TemporaryDirectory(prefix="benchmark_") as workdir:
+            spec_path = os.path.join(workdir, "spec.json")
+            with open(spec_path, "w", encoding="utf-8") as spec_file:
+                json.dump({
+                    "variants": {"before": original, "after": optimized},
+                    "repeat": self.BENCHMARK_REPEAT,
+                    "warmup": 1,
+                    "compare": True,
+                    "memory_limit_mb": self.BENCHMARK_MEMORY_LIMIT_MB,
+                    "cpu_limit": self.BENCHMARK_TIMEOUT
+                }, spec_file)
+            process = await run_process_async(
+                [sys.executable, BENCHMARK_SCRIPT, spec_path],
+                timeout=self.BENCHMARK_TIMEOUT, cwd=workdir
+            )
         
-        return code
+        try:
+            result = json.loads(process["stdout"].strip().splitlines()[-1])
+        except (ValueError, IndexError):
+            return {"improvement": None, "error": termination_reason(process, "انتهت مهلة القياس")}
+        if "error" in result:
+            return {"improvement": None, **result}
+        
+        before_summary = summarize(result["samples"]["before"])
+        after_summary = summarize(result["samples"]["after"])
+        before = before_summary["median_ns"]
+        after = after_summary["median_ns"]
+        return {
+            "before_ns": before,
+            "after_ns": after,
+            "before": before_summary,
+            "after": after_summary,
+            "speedup": before / after if after else None,
+            "improvement": 1 - after / before if before else None,
+            "repeat": self.BENCHMARK_REPEAT
+        }
     
-    async def _calculate_readability(self, code: str, language: str) -> float:
-        """حساب قابلية القراءة"""
-        # مقاييس بسيطة لقابلية القراءة
-        lines = code.split('\n')
-        non_empty_lines = [line for line in lines if line.strip()]
-        
-        # طول الأسطر
-        avg_line_length = sum(len(line) for line in non_empty_lines) / len(non_empty_lines) if non_empty_lines else 0
-        line_length_score = max(0, 1 - (avg_line_length - 80) / 80) if avg_line_length > 80 else 1
-        
-        # التعقيد (عدد الأقواس والعمليات)
-        complexity_chars = code.count('(') + code.count('[') + code.count('{')
-        complexity_score = max(0, 1 - complexity_chars / (len(code) / 10))
-        
-        # التعليقات
-        comment_lines = len([line for line in lines if line.strip().startswith('#')])
-        comment_score = min(1, comment_lines / (len(non_empty_lines) / 5)) if non_empty_lines else 0
-        
-        return (line_length_score + complexity_score + comment_score) / 3
+    async def optimize_project(self, root: str, cache_path: Optional[str] = CACHE_PATH,
+                               max_workers: Optional[int] = None):
+        """تحسين وتقييم كل ملفات المشروع بالتوازي وبث النتائج ملفاً بملف
+        
+        الملفات التي لم يتغير محتواها منذ آخر تشغيل تُؤخذ من الذاكرة المؤقتة،
+        ولا يُقاس الزمن هنا (القياس لكل ملف على حدة عبر optimize_code).
+        """
+        async for record in run_project(root, optimize_files, "optimize", OPTIMIZER_VERSION,
+                                        cache_path=cache_path, max_workers=max_workers):
+            yield record
+    
+    async def score_source(self, source, language: str) -> Dict[str, Any]:
+        """تقييم كود (نص أو ملف مفتوح) من مرور واحد على رموزه"""
+        metrics = compute_code_metrics(source, language)
+        return {
+            "readability_score": readability_score(metrics),
+            "maintainability_score": maintainability_score(metrics),
+            "metrics": metrics
+        }
     
-    async def _calculate_maintainability(self, code: str, language: str) -> float:
-        """حساب قابلية الصيانة"""
-        # مقاييس بسيطة لقابلية الصيانة
-        lines = code.split('\n')
-        
-        # عدد الدوال
-        function_count = code.count('def ') if language == 'python' else code.count('function ')
-        
-        # عدد الكلاسات
-        class_count = code.count('class ')
-        
-        # طول الدوال (تقدير)
-        avg_function_length = len(lines) / max(1, function_count)
-        function_length_score = max(0, 1 - (avg_function_length - 20) / 20) if avg_function_length > 20 else 1
-        
-        # التنظيم (وجود دوال وكلاسات)
-        organization_score = min(1, (function_count + class_count) / 5)
-        
-        return (function_length_score + organization_score) / 2
-
 class RealTimeCollaborationEngine:
     """محرك التعاون في الوقت الفعلي"""
     
@@ -458,78 +459,44 @@ class RealTimeCollaborationEngine:
 class AdvancedSecurityScanner:
     """ماسح الأمان المتقدم"""
     
-    def __init__(self):
+    def __init__(self, vulnerability_dataset: str = DEFAULT_DATASET):
         self.security_rules = self._load_security_rules()
-        self.vulnerability_database = self._load_vulnerability_db()
+        self.vulnerability_database = self._load_vulnerability_db(vulnerability_dataset)
+        # القواعد تُجمّع مرة واحدة لكل لغة
+        self.rule_sets = {language: RuleSet(rules) for language, rules in self.security_rules.items()}
         
     def _load_security_rules(self) -> Dict[str, List[Dict]]:
         """تحميل قواعد الأمان"""
-        return {
-            "python": [
-                {
-                    "rule_id": "SQL_INJECTION",
-                    "pattern": r".*execute\(.*%.*\)",
-                    "severity": "HIGH",
-                    "description": "احتمالية SQL Injection"
-                },
-                {
-                    "rule_id": "HARDCODED_PASSWORD",
-                    "pattern": r"password\s*=\s*['\"][^'\"]+['\"]",
-                    "severity": "MEDIUM",
-                    "description": "كلمة مرور مكتوبة في الكود"
-                },
-                {
-                    "rule_id": "UNSAFE_EVAL",
-                    "pattern": r"eval\s*\(",
-                    "severity": "HIGH",
-                    "description": "استخدام eval() غير آمن"
-                }
-            ],
-            "javascript": [
-                {
-                    "rule_id": "XSS_VULNERABILITY",
-                    "pattern": r"innerHTML\s*=.*\+",
-                    "severity": "HIGH",
-                    "description": "احتمالية XSS"
-                },
-                {
-                    "rule_id": "UNSAFE_EVAL",
-                    "pattern": r"eval\s*\(",
-                    "severity": "HIGH",
-                    "description": "استخدام eval() غير آمن"
-                }
-            ]
-        }
+        return {language: [dict(rule) for rule in rules] for language, rules in SECURITY_RULES.items()}
     
-    def _load_vulnerability_db(self) -> Dict:
-        """تحميل قاعدة بيانات الثغرات"""
-        return {
-            "known_vulnerabilities": [
-                {
-                    "cve_id": "CVE-2021-44228",
-                    "description": "Log4j RCE",
-                    "affected_packages": ["log4j"],
-                    "severity": "CRITICAL"
-                }
-            ]
-        }
+    def _load_vulnerability_db(self, path: str) -> VulnerabilityIndex:
+        """تحميل قاعدة بيانات الثغرات (ملف مرتب مربوط بالذاكرة)"""
+        return VulnerabilityIndex(path)
     
-    async def scan_code_security(self, code: str, language: str) -> Dict[str, Any]:
-        """فحص أمان الكود"""
+    async def scan_code_security(self, code: str, language: str,
+                                 requirements: Optional[List[str]] = None) -> Dict[str, Any]:
+        """فحص أمان الكود
+        
+        requirements أسطر متطلبات بإصدارات مثبتة (requests==2.19.0، lodash@4.17.11)
+        تُطابق مع استيرادات الكود عند البحث في قاعدة بيانات الثغرات.
+        """
         scan_results = {
             "scan_timestamp": datetime.now().isoformat(),
             "language": language,
             "vulnerabilities": [],
+            "dependencies": [],
             "security_score": 100.0,
             "recommendations": []
         }
         
-        if language.lower() in self.security_rules:
-            rules = self.security_rules[language.lower()]
-            
-            for rule in rules:
-                vulnerabilities = await self._check_security_rule(code, rule)
-                scan_results["vulnerabilities"].extend(vulnerabilities)
+        rules = self.rule_sets.get(language.lower())
+        if rules is not None:
+            # مرور واحد على الكود لكل القواعد، خارج حلقة الأحداث
+            scan_results["vulnerabilities"] = await asyncio.to_thread(rules.scan, code)
+        
+        dependencies, findings = await asyncio.to_thread(self._check_dependencies, code, language, requirements)
+        scan_results["dependencies"] = dependencies
+        scan_results["vulnerabilities"].extend(findings)
         
         # حساب نقاط الأمان
         scan_results["security_score"] = await self._calculate_security_score(
@@ -543,58 +510,48 @@ class AdvancedSecurityScanner:
         
         return scan_results
     
-    async def _check_security_rule(self, code: str, rule: Dict) -> List[Dict]:
-        """فحص قاعدة أمان"""
-        import re
-        vulnerabilities = []
-        
-        matches = re.finditer(rule["pattern"], code, re.MULTILINE | re.IGNORECASE)
-        
-        for match in matches:
-            line_number = code[:match.start()].count('\n') + 1
-            
-            vulnerability = {
-                "rule_id": rule["rule_id"],
-                "severity": rule["severity"],
-                "description": rule["description"],
-                "line_number": line_number,
-                "code_snippet": match.group(0),
-                "fix_suggestion": await self._get_fix_suggestion(rule["rule_id"])
-            }
-            
-            vulnerabilities.append(vulnerability)
-        
-        return vulnerabilities
+    def _check_dependencies(self, code: str, language: str, requirements: Optional[List[str]]):
+        """التبعيات المستخرجة والثغرات المعروفة فيها"""
+        dependencies = extract_dependencies(code, language, requirements)
+        findings = []
+        for advisory in self.vulnerability_database.check(dependencies):
+            fix = f"حدّث {advisory['package']} إلى {advisory['fixed']} أو أحدث" if advisory["fixed"] \
+                else f"لا يوجد إصدار مُصلح من {advisory['package']} - استبدلها أو اعزل استخدامها"
+            findings.append({
+                "rule_id": "VULNERABLE_DEPENDENCY",
+                "severity": advisory["severity"],
+                "description": f"{advisory['advisory_id']}: {advisory['description']}",
+                "line_number": advisory["line"],
+                "code_snippet": f"{advisory['package']}=={advisory['version']}" if advisory["version"] else advisory["package"],
+                "fix_suggestion": fix,
+                "advisory_id": advisory["advisory_id"],
+                "package": advisory["package"],
+                "version": advisory["version"]
+            })
+        return [
+            {"ecosystem": dep.ecosystem, "name": dep.name, "version": dep.version, "line": dep.line}
+            for dep in dependencies
+        ], findings
     
     async def _get_fix_suggestion(self, rule_id: str) -> str:
         """الحصول على اقتراح إصلاح"""
-        fix_suggestions = {
-            "SQL_INJECTION": "استخدم parameterized queries أو prepared statements",
-            "HARDCODED_PASSWORD": "استخدم متغيرات البيئة أو ملفات التكوين الآمنة",
-            "UNSAFE_EVAL": "تجنب استخدام eval() واستخدم بدائل آمنة",
-            "XSS_VULNERABILITY": "استخدم textContent بدلاً من innerHTML أو قم بتنظيف البيانات"
-        }
-        
-        return fix_suggestions.get(rule_id, "راجع الوثائق الأمنية للغة البرمجة")
+        return fix_suggestion(rule_id)
     
     async def _calculate_security_score(self, vulnerabilities: List[Dict]) -> float:
         """حساب نقاط الأمان"""
-        if not vulnerabilities:
-            return 100.0
-        
-        severity_weights = {
-            "CRITICAL": 30,
-            "HIGH": 20,
-            "MEDIUM": 10,
-            "LOW": 5
-        }
-        
-        total_deduction = sum(
-            severity_weights.get(vuln["severity"], 5) 
-            for vuln in vulnerabilities
-        )
-        
-        return max(0, 100 - total_deduction)
+        return security_score(vulnerabilities)
+    
+    async def scan_project(self, root: str, cache_path: Optional[str] = CACHE_PATH,
+                           max_workers: Optional[int] = None):
+        """فحص كل ملفات المشروع بالتوازي وبث النتائج ملفاً بملف
+        
+        النتائج مخزنة حسب (بصمة المحتوى، إصدار القواعد)، فإعادة الفحص بعد
+        تعديل صغير لا تعيد إلا الملفات المتغيرة. لإخراج SARIF تُمرر السجلات
+        إلى security_rules.stream_sarif.
+        """
+        async for record in run_project(root, scan_files, "security", RULESET_VERSION,
+                                        cache_path=cache_path, max_workers=max_workers):
+            yield record
     
     async def _generate_security_recommendations(self, vulnerabilities: List[Dict]) -> List[str]:
         """توليد توصيات الأمان"""
@@ -612,14 +569,46 @@ class AdvancedSecurityScanner:
         return recommendations
 
 class PerformanceProfiler:
-    """محلل الأداء"""
+    """محلل الأداء
     
-    def __init__(self):
+    الكود يُنفذ في عملية فرعية معزولة بحدود صارمة للزمن والذاكرة، فلا يشارك
+    الخادم ذاكرته ولا حلقة أحداثه.
+    """
+    
+    # سكربت التحليل الذي يُشغل في العملية الفرعية
+    PROFILE_SCRIPT = str(Path(__file__).parent / "profile_runner.py")
+    PROFILE_TIMEOUT = 30
+    PROFILE_MEMORY_LIMIT_MB = 512
+    TOP_ALLOCATIONS = 10
+    # أقصى طول لمخرجات الكود المحفوظة في النتيجة
+    OUTPUT_LIMIT = 2000
+    # القياس المتكرر (BENCHMARK_SCRIPT في عملية فرعية)
+    BENCHMARK_REPEAT = 10
+    BENCHMARK_WARMUP = 2
+    
+    def __init__(self, baseline_path: str = BASELINE_PATH):
         self.profiling_data = {}
+        # آخر نتيجة قياس لكل مفتاح، وخطوط الأساس محفوظة في SQLite
         self.benchmarks = {}
-        
-    async def profile_code_execution(self, code: str, language: str, test_cases: List[Dict] = None) -> Dict[str, Any]:
-        """تحليل أداء تنفيذ الكود"""
+        self.baselines = BaselineStore(baseline_path)
+        
+    async def profile_code_execution(self, code: str, language: str, test_cases: List[Dict] = None,
+                                     mode: str = "deterministic",
+                                     sample_interval: Optional[float] = None,
+                                     benchmark: bool = False,
+                                     save_baseline: bool = False) -> Dict[str, Any]:
+        """تحليل أداء تنفيذ الكود
+        
+        mode="sampling" (Python فقط) يأخذ عينات من المكدس كل sample_interval ثانية
+        من وقت المعالج بدلاً من cProfile، ويعيد flamegraph بالصيغة المطوية
+        وبصيغة speedscope.
+        
+        benchmark=True يضيف قياساً متكرراً (benchmark_code) تُحسب النقاط من
+        وسيطه، وsave_baseline=True يحفظ نتيجته خطاً للأساس؛ كلاهما معطل
+        افتراضياً لأن القياس يضاعف الزمن.
+        """
+        if mode not in ("deterministic", "sampling"):
+            raise ValueError(f"نمط تحليل غير معروف: {mode}")
         profile_results = {
             "language": language,
             "execution_time": 0.0,
@@ -631,69 +620,266 @@ class PerformanceProfiler:
         }
         
         if language.lower() == "python":
-            profile_results = await self._profile_python_code(code, test_cases)
+            profile_results = await self._profile_python_code(
+                code, test_cases, mode, sample_interval, benchmark, save_baseline
+            )
         elif language.lower() == "javascript":
             profile_results = await self._profile_javascript_code(code, test_cases)
         
         return profile_results
     
-    async def _profile_python_code(self, code: str, test_cases: List[Dict] = None) -> Dict[str, Any]:
-        """تحليل أداء كود Python"""
-        import cProfile
-        import io
+    def _limits(self) -> Dict[str, Any]:
+        return {
+            "timeout": self.PROFILE_TIMEOUT,
+            "memory_limit_mb": self.PROFILE_MEMORY_LIMIT_MB,
+            "cpu_limit": self.PROFILE_TIMEOUT
+        }
+    
+    @staticmethod
+    def _failure(language: str, error: str, **extra) -> Dict[str, Any]:
+        return {
+            "language": language,
+            "execution_time": 0.0,
+            "memory_usage": 0.0,
+            "cpu_usage": 0.0,
+            "performance_score": 0.0,
+            "bottlenecks": [f"خطأ في التنفيذ: {error}"],
+            "optimization_suggestions": ["تأكد من صحة بناء الجملة"],
+            "error": error,
+            **extra
+        }
+    
+    async def _profile_python_code(self, code: str, test_cases: List[Dict] = None,
+                                   mode: str = "deterministic",
+                                   sample_interval: Optional[float] = None,
+                                   benchmark: bool = False,
+                                   save_baseline: bool = False) -> Dict[str, Any]:
+        """تحليل أداء كود Python في عملية فرعية معزولة"""
         import pstats
-        import tracemalloc
-        import time
-        
-        # بدء تتبع الذاكرة
-        tracemalloc.start()
-        
-        # إنشاء profiler
-        profiler = cProfile.Profile()
-        
-        try:
-            # تنفيذ الكود مع التحليل
-            start_time = time.time()
-            profiler.enable()
-            
-            # تنفيذ الكود في بيئة آمنة
-            exec_globals = {"__builtins__": __builtins__}
-            exec(code, exec_globals)
+        import tempfile
+        
+        # التحليل المشترك يكشف أخطاء بناء الجملة دون تشغيل عملية فرعية
+        syntax_error = get_parsed_source(code).syntax_error
+        if syntax_error is not None:
+            return self._failure("python", f"خطأ في بناء الجملة: {syntax_error}")
+        
+        limits = self._limits()
+        with tempfile.TemporaryDirectory(prefix="profile_") as workdir:
+            spec_path = os.path.join(workdir, "spec.json")
+            result_path = os.path.join(workdir, "result.json")
+            stats_path = os.path.join(workdir, "profile.pstats")
+            with open(spec_path, "w", encoding="utf-8") as spec_file:
+                json.dump({
+                    "code": code,
+                    "result": result_path,
+                    "stats": stats_path,
+                    "mode": mode,
+                    "sample_interval": sample_interval or DEFAULT_SAMPLE_INTERVAL,
+                    "memory_limit_mb": limits["memory_limit_mb"],
+                    "cpu_limit": limits["cpu_limit"],
+                    "top_allocations": self.TOP_ALLOCATIONS
+                }, spec_file)
             
-            profiler.disable()
-            end_time = time.time()
-            
-            # قياس استخدام الذاكرة
-            current, peak = tracemalloc.get_traced_memory()
-            tracemalloc.stop()
+            # الكود يعمل داخل مجلد مؤقت، فما يكتبه من ملفات يُحذف معه
+            process = await run_process_async(
+                [sys.executable, self.PROFILE_SCRIPT, spec_path],
+                timeout=limits["timeout"], cwd=workdir
+            )
+            output = (process["stdout"] + process["stderr"])[-self.OUTPUT_LIMIT:]
             
-            # تحليل النتائج
-            stats_stream = io.StringIO()
-            stats = pstats.Stats(profiler, stream=stats_stream)
-            stats.sort_stats('cumulative')
-            stats.print_stats(10)
+            if not os.path.exists(result_path):
+                return self._failure("python", termination_reason(process),
+                                     resources=process["resources"], limits=limits, output=output)
+            with open(result_path, "r", encoding="utf-8") as result_file:
+                measured = json.load(result_file)
+            if measured.get("failed"):
+                return self._failure("python", measured["error"], resources=process["resources"],
+                                     limits=limits, output=output)
+            if mode == "sampling":
+                return await self._sampling_results(measured, process["resources"], limits, output)
             
-            return {
-                "language": "python",
-                "execution_time": end_time - start_time,
-                "memory_usage": peak / 1024 / 1024,  # MB
-                "cpu_usage": 0.0,  # يحتاج تنفيذ أكثر تعقيداً
-                "performance_score": await self._calculate_performance_score(end_time - start_time, peak),
-                "bottlenecks": await self._identify_bottlenecks(stats_stream.getvalue()),
-                "optimization_suggestions": await self._generate_optimization_suggestions("python", end_time - start_time, peak)
-            }
+            def load_stats() -> Dict:
+                return pstats.Stats(stats_path).stats
             
-        except Exception as e:
-            logger.error(f"خطأ في تحليل أداء Python: {e}")
-            return {
-                "language": "python",
-                "execution_time": 0.0,
-                "memory_usage": 0.0,
-                "cpu_usage": 0.0,
-                "performance_score": 0.0,
-                "bottlenecks": [f"خطأ في التنفيذ: {str(e)}"],
-                "optimization_suggestions": ["تأكد من صحة بناء الجملة"]
-            }
+            stats_table = await asyncio.to_thread(load_stats)
+        
+        execution_time = measured["wall_time"]
+        cpu_time = measured["cpu_user"] + measured["cpu_system"]
+        peak = measured["peak_traced_bytes"]
+        analysis = await self._identify_bottlenecks(stats_table, code)
+        
+        # عند طلب القياس: النقاط من وسيط تشغيلات متكررة إذا كان الكود سريعاً بما يكفي لتكراره
+        benchmark_result = None
+        scored_time = execution_time
+        runs = self.BENCHMARK_REPEAT + self.BENCHMARK_WARMUP
+        if benchmark and measured["error"] is None and execution_time * runs <= self.PROFILE_TIMEOUT / 2:
+            benchmark_result = await self.benchmark_code(code, save_baseline=save_baseline)
+            if "summary" in benchmark_result:
+                scored_time = benchmark_result["summary"]["median_ns"] / 1e9
+        
+        return {
+            "language": "python",
+            "execution_time": execution_time,
+            "cpu_time": cpu_time,
+            # نسبة وقت المعالج إلى الزمن الفعلي (قد تتجاوز 100 مع الخيوط)
+            "cpu_usage": cpu_time / execution_time * 100 if execution_time > 0 else 0.0,
+            "memory_usage": peak / 1024 / 1024,  # MB
+            "peak_rss_mb": measured["max_rss_kb"] / 1024,
+            "allocations": measured["allocations"],
+            "error": measured["error"],
+            "output": output,
+            "resources": process["resources"],
+            "limits": limits,
+            "benchmark": benchmark_result,
+            "performance_score": await self._calculate_performance_score(scored_time, peak),
+            "bottlenecks": analysis["bottlenecks"],
+            "cumulative_hotspots": analysis["cumulative"],
+            "hot_calls": analysis["hot_calls"],
+            "optimization_suggestions": await self._generate_optimization_suggestions(
+                "python", execution_time, peak, analysis
+            )
+        }
+    
+    async def benchmark_code(self, code: str, name: Optional[str] = None, repeat: Optional[int] = None,
+                             warmup: Optional[int] = None, save_baseline: bool = True) -> Dict[str, Any]:
+        """قياس كود Python بتشغيلات تمهيدية ثم repeat تشغيلاً مقاساً بـ perf_counter_ns
+        
+        يُقارن بخط الأساس المحفوظ للمفتاح (name أو بصمة الكود) باختبار
+        Mann-Whitney، ويُحدّث خط الأساس (مع save_baseline) ما لم يكن التشغيل
+        تراجعاً دالاً، فيبقى التراجع ظاهراً في التشغيلات التالية حتى يُصلح.
+        القياس يعمل في مجلد مؤقت بنفس حدود التحليل (_limits).
+        """
+        import tempfile
+        
+        repeat = repeat or self.BENCHMARK_REPEAT
+        warmup = self.BENCHMARK_WARMUP if warmup is None else warmup
+        code_hash = content_hash(code)
+        key = name or code_hash
+        limits = self._limits()
+        
+        with tempfile.TemporaryDirectory(prefix="benchmark_") as workdir:
+            spec_path = os.path.join(workdir, "spec.json")
+            with open(spec_path, "w", encoding="utf-8") as spec_file:
+                json.dump({
+                    "variants": {"current": code},
+                    "repeat": repeat,
+                    "warmup": warmup,
+                    "memory_limit_mb": limits["memory_limit_mb"],
+                    "cpu_limit": limits["cpu_limit"]
+                }, spec_file)
+            process = await run_process_async(
+                [sys.executable, BENCHMARK_SCRIPT, spec_path],
+                timeout=limits["timeout"], cwd=workdir
+            )
+        
+        result: Dict[str, Any] = {"key": key, "code_hash": code_hash, "repeat": repeat, "warmup": warmup,
+                                  "limits": limits}
+        try:
+            measured = json.loads(process["stdout"].strip().splitlines()[-1])
+        except (ValueError, IndexError):
+            return {**result, "error": termination_reason(process, "انتهت مهلة القياس")}
+        if "error" in measured:
+            return {**result, "error": measured["error"]}
+        
+        samples = measured["samples"]["current"]
+        result["summary"] = summarize(samples)
+        baseline = await asyncio.to_thread(self.baselines.get, key)
+        result["baseline"] = compare_runs(samples, baseline["samples"]) if baseline else None
+        result["regression"] = bool(result["baseline"] and result["baseline"]["regression"])
+        if save_baseline and not result["regression"]:
+            await asyncio.to_thread(self.baselines.put, key, code_hash, samples, result["summary"])
+        
+        self.benchmarks[key] = result
+        return result
+    
+    async def _sampling_results(self, measured: Dict[str, Any], resources: Dict[str, Any],
+                                limits: Dict[str, Any], output: str) -> Dict[str, Any]:
+        """نتيجة نمط العينات: الأزمنة من rusage والاختناقات من أكثر الدوال ظهوراً في قمة المكدس"""
+        execution_time = measured["wall_time"]
+        cpu_time = measured["cpu_user"] + measured["cpu_system"]
+        peak = measured["max_rss_kb"] * 1024
+        stacks = measured["stacks"]
+        return {
+            "language": "python",
+            "mode": "sampling",
+            "execution_time": execution_time,
+            "cpu_time": cpu_time,
+            "cpu_usage": cpu_time / execution_time * 100 if execution_time > 0 else 0.0,
+            "memory_usage": peak / 1024 / 1024,
+            "peak_rss_mb": peak / 1024 / 1024,
+            "samples": measured["samples"],
+            "sample_interval": measured["sample_interval"],
+            "flamegraph": {
+                "collapsed": collapsed_stacks(stacks),
+                "speedscope": speedscope_profile(stacks, measured["sample_interval"])
+            },
+            "error": measured["error"],
+            "output": output,
+            "resources": resources,
+            "limits": limits,
+            "performance_score": await self._calculate_performance_score(execution_time, peak),
+            "bottlenecks": self._sampled_bottlenecks(stacks, measured["samples"]),
+            "optimization_suggestions": await self._generate_optimization_suggestions("python", execution_time, peak)
+        }
+    
+    @staticmethod
+    def _sampled_bottlenecks(stacks: List, total_samples: int, limit: int = 5) -> List[str]:
+        """الدوال الأكثر ظهوراً في قمة المكدس (الوقت الذاتي)"""
+        if not total_samples:
+            return []
+        self_samples: Dict[tuple, int] = {}
+        for frames, count in stacks:
+            leaf = tuple(frames[-1])
+            self_samples[leaf] = self_samples.get(leaf, 0) + count
+        ranked = sorted(self_samples.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [
+            f"{name} ({filename}:{line}): {count / total_samples:.1%} من العينات"
+            for (name, filename, line), count in ranked
+        ]
+    
+    async def _profile_javascript_code(self, code: str, test_cases: List[Dict] = None) -> Dict[str, Any]:
+        """تحليل أداء كود JavaScript (زمن وموارد العملية عبر Node.js)"""
+        import shutil
+        import tempfile
+        
+        node = shutil.which("node")
+        if node is None:
+            return self._failure("javascript", "Node.js غير مثبت")
+        
+        limits = self._limits()
+        with tempfile.TemporaryDirectory(prefix="profile_") as workdir:
+            script_path = os.path.join(workdir, "main.js")
+            with open(script_path, "w", encoding="utf-8") as script_file:
+                script_file.write(code)
+            process = await run_process_async(
+                [node, f"--max-old-space-size={limits['memory_limit_mb']}", script_path],
+                timeout=limits["timeout"], cwd=workdir
+            )
+        
+        resources = process["resources"]
+        output = (process["stdout"] + process["stderr"])[-self.OUTPUT_LIMIT:]
+        if process["timed_out"] or process["returncode"] != 0:
+            return self._failure("javascript", termination_reason(process),
+                                 resources=resources, limits=limits, output=output)
+        
+        # الأرقام تشمل بدء تشغيل Node.js نفسه
+        execution_time = resources["wall_time"]
+        cpu_time = resources["cpu_user"] + resources["cpu_system"]
+        peak = resources["max_rss_kb"] * 1024
+        return {
+            "language": "javascript",
+            "execution_time": execution_time,
+            "cpu_time": cpu_time,
+            "cpu_usage": cpu_time / execution_time * 100 if execution_time > 0 else 0.0,
+            "memory_usage": peak / 1024 / 1024,
+            "peak_rss_mb": peak / 1024 / 1024,
+            "output": output,
+            "resources": resources,
+            "limits": limits,
+            "performance_score": await self._calculate_performance_score(execution_time, peak),
+            "bottlenecks": [],
+            "optimization_suggestions": await self._generate_optimization_suggestions("javascript", execution_time, peak)
+        }
     
     async def _calculate_performance_score(self, execution_time: float, memory_usage: int) -> float:
         """حساب نقاط الأداء"""
@@ -706,20 +892,21 @@ class PerformanceProfiler:
         
         return (time_score + memory_score) / 2
     
-    async def _identify_bottlenecks(self, profiler_output: str) -> List[str]:
-        """تحديد نقاط الاختناق"""
-        bottlenecks = []
-        
-        # تحليل بسيط لمخرجات profiler
-        lines = profiler_output.split('\n')
-        for line in lines:
-            if 'cumulative' in line and any(keyword in line for keyword in ['sort', 'search', 'loop']):
-                bottlenecks.append(f"عملية بطيئة محتملة: {line.strip()}")
+    async def _identify_bottlenecks(self, stats_table: Dict, code: Optional[str] = None) -> Dict[str, Any]:
+        """تحديد نقاط الاختناق من بيانات pstats الخام (Stats.stats)
         
-        return bottlenecks[:5]  # أول 5 نقاط اختناق
+        الدوال مرتبة بالوقت الذاتي والتراكمي مع حواف الاستدعاء الأثقل، ودوال
+        الكود المولد مربوطة بأسطرها.
+        """
+        return await asyncio.to_thread(analyze_stats, stats_table, code)
     
-    async def _generate_optimization_suggestions(self, language: str, execution_time: float, memory_usage: int) -> List[str]:
-        """توليد اقتراحات التحسين"""
+    async def _generate_optimization_suggestions(self, language: str, execution_time: float, memory_usage: int,
+                                                 analysis: Optional[Dict[str, Any]] = None) -> List[str]:
+        """توليد اقتراحات التحسين
+        
+        مع نتيجة تحليل pstats تُستبدل النصائح العامة باقتراحات موجهة إلى
+        الدوال والأسطر الساخنة.
+        """
         suggestions = []
         
         if execution_time > 1.0:  # أكثر من ثانية
@@ -729,7 +916,9 @@ class PerformanceProfiler:
         if memory_mb > 100:  # أكثر من 100 ميجابايت
             suggestions.append("استخدام ذاكرة مرتفع - فكر في تحسين هياكل البيانات")
         
-        if language == "python":
+        if analysis is not None:
+            suggestions.extend(analysis["suggestions"])
+        elif language == "python":
             suggestions.extend([
                 "استخدم list comprehensions بدلاً من حلقات for التقليدية",
                 "فكر في استخدام NumPy للعمليات الرياضية",
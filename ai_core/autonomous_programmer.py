@@ -16,22 +16,37 @@ NexoraTrix Advanced AI Programmer - النواة الذكية للبرمجة ا
 import asyncio
 import json
 import os
-import subprocess
-import requests
+import aiohttp
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 import sqlite3
 import logging
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from collections import OrderedDict, deque
+from contextvars import ContextVar
 from pathlib import Path
-import ast
 import importlib.util
+import multiprocessing
 import sys
 import threading
 import time
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import hashlib
+import heapq
+import itertools
+import math
+import functools
 import pickle
+import uuid
+import zlib
+
+from sandbox import run_process_async
+from benchmark_stats import percentile
+from language_plugins import LanguageRegistry
+from similarity_index import MinHashLSHIndex, task_text
+from pattern_mining import count_patterns, merge_pattern_counts
+from parsed_source import get_parsed_source
 
 # إعداد نظام السجلات
 logging.basicConfig(
@@ -44,6 +59,39 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# الحالات النهائية للمهمة
+TERMINAL_STATUSES = {"completed", "failed", "error", "cancelled", "expired"}
+
+@dataclass
+class TaskMetrics:
+    """مقاييس الزمن والموارد لمهمة واحدة"""
+    stages: Dict[str, float] = field(default_factory=dict)
+    queue_wait: Dict[str, float] = field(default_factory=dict)
+    db_calls: int = 0
+    http_calls: int = 0
+    sandbox: Dict[str, float] = field(default_factory=dict)
+    last_transition: float = field(default_factory=time.perf_counter)
+    
+    def as_dict(self) -> Dict[str, Any]:
+        """تحويل المقاييس إلى قاموس قابل للتخزين"""
+        return {
+            "stages": dict(self.stages),
+            "queue_wait": dict(self.queue_wait),
+            "db_calls": self.db_calls,
+            "http_calls": self.http_calls,
+            "sandbox": dict(self.sandbox)
+        }
+
+# مقاييس المهمة الجارية؛ تنتقل تلقائياً إلى مهام asyncio وخيوط to_thread
+current_task_metrics: ContextVar[Optional[TaskMetrics]] = ContextVar("current_task_metrics", default=None)
+
+def connect_db(db_path: str) -> sqlite3.Connection:
+    """فتح اتصال SQLite مع احتسابه ضمن مقاييس المهمة الجارية"""
+    metrics = current_task_metrics.get()
+    if metrics is not None:
+        metrics.db_calls += 1
+    return sqlite3.connect(db_path)
+
 @dataclass
 class LearningSession:
     """جلسة تعلم للذكاء الاصطناعي"""
@@ -66,6 +114,17 @@ class ProgrammingTask:
     status: str = "pending"
     generated_code: str = ""
     test_results: Dict = None
+    priority: int = 0
+    client_id: str = "default"
+    depends_on: List[str] = field(default_factory=list)
+    upstream: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    knowledge: List[Dict[str, Any]] = field(default_factory=list)
+    similar_tasks: List[Dict[str, Any]] = field(default_factory=list)
+    metrics: TaskMetrics = field(default_factory=TaskMetrics)
+    # يُضبط عند بدء إنهاء المهمة (حفظ أو إلغاء أو مهلة) فلا تُنهى مرتين
+    finalized: bool = False
+    # أُعيد استخدام كود مهمة مكتملة مشابهة فتتخطى التوليد والاختبار
+    reused: bool = False
 
 class KnowledgeBase:
     """قاعدة المعرفة للذكاء الاصطناعي"""
@@ -76,7 +135,7 @@ class KnowledgeBase:
         
     def init_database(self):
         """إنشاء قاعدة البيانات وجداولها"""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect_db(self.db_path)
         cursor = conn.cursor()
         
         # جدول المعرفة العامة
@@ -119,12 +178,64 @@ class KnowledgeBase:
             )
         ''')
         
+        # نتائج اختبار الأكواد (إلحاق فقط) ليُعالج التحسين الذاتي الجديد منها فقط
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS code_outcomes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                hash TEXT NOT NULL,
+                success INTEGER NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_code_outcomes_hash ON code_outcomes (hash)")
+        
+        # إجمالي الأنماط المستخرجة من الأكواد الناجحة
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS code_patterns (
+                pattern TEXT PRIMARY KEY,
+                occurrences INTEGER NOT NULL DEFAULT 0,
+                codes INTEGER NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # مقاييس كل دورة تحسين (تُحذف بعد فترة الاحتفاظ) وتجميعاتها بالساعة واليوم
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS improvement_metrics (
+                metric TEXT NOT NULL,
+                ts INTEGER NOT NULL,
+                value REAL NOT NULL,
+                PRIMARY KEY (metric, ts)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS improvement_rollups (
+                resolution TEXT NOT NULL,
+                metric TEXT NOT NULL,
+                bucket INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                total REAL NOT NULL,
+                min_value REAL NOT NULL,
+                max_value REAL NOT NULL,
+                last_value REAL NOT NULL,
+                PRIMARY KEY (resolution, metric, bucket)
+            ) WITHOUT ROWID
+        ''')
+        
+        # آخر معرف عولج في كل عملية تعدين
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS mining_state (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+        ''')
+        
         conn.commit()
         conn.close()
         
     def add_knowledge(self, topic: str, content: str, source: str = "self-learning", confidence: float = 0.5):
         """إضافة معرفة جديدة"""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect_db(self.db_path)
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -138,7 +249,7 @@ class KnowledgeBase:
         
     def get_knowledge(self, topic: str) -> List[Dict]:
         """استرجاع المعرفة حول موضوع معين"""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect_db(self.db_path)
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -152,6 +263,171 @@ class KnowledgeBase:
         
         return [dict(zip([col[0] for col in cursor.description], row)) for row in results]
 
+class TaskResultStore:
+    """مخزن نتائج المهام المفهرس"""
+    
+    # الحد الأدنى لحجم الكود قبل ضغطه
+    COMPRESSION_THRESHOLD = 512
+    MAX_PAGE_SIZE = 200
+    
+    def __init__(self, db_path: str = "ai_task_results.db", compress_code: bool = True):
+        self.db_path = db_path
+        self.compress_code = compress_code
+        self.init_database()
+        
+    def init_database(self):
+        """إنشاء جدول النتائج وفهارسه"""
+        conn = connect_db(self.db_path)
+        cursor = conn.cursor()
+        
+        # WAL يسمح بالقراءة من واجهة الويب أثناء الكتابة
+        cursor.execute("PRAGMA journal_mode=WAL")
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS task_results (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                task_id TEXT NOT NULL UNIQUE,
+                description TEXT,
+                language TEXT NOT NULL,
+                status TEXT NOT NULL,
+                generated_code BLOB,
+                code_compressed INTEGER DEFAULT 0,
+                test_results TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # فهارس للتصفية مع ترقيم الصفحات بالمفتاح (id)
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_task_results_status ON task_results (status, id)"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_task_results_language ON task_results (language, id)"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_task_results_language_status "
+            "ON task_results (language, status, id)"
+        )
+        
+        conn.commit()
+        conn.close()
+    
+    def _encode_code(self, code: str) -> tuple:
+        """ضغط الكود اختيارياً"""
+        raw = (code or "").encode("utf-8")
+        if self.compress_code and len(raw) >= self.COMPRESSION_THRESHOLD:
+            return zlib.compress(raw), 1
+        return raw, 0
+    
+    @staticmethod
+    def _decode_code(blob, compressed: int) -> str:
+        """فك ضغط الكود"""
+        if blob is None:
+            return ""
+        if compressed:
+            blob = zlib.decompress(blob)
+        return blob.decode("utf-8") if isinstance(blob, bytes) else blob
+    
+    def save(self, task: ProgrammingTask):
+        """حفظ نتيجة مهمة أو تحديثها"""
+        self.save_many([task])
+    
+    def save_many(self, tasks: List[ProgrammingTask]):
+        """حفظ عدة مهام في معاملة واحدة"""
+        conn = connect_db(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.executemany('''
+            INSERT INTO task_results
+            (task_id, description, language, status, generated_code, code_compressed, test_results)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(task_id) DO UPDATE SET
+                status = excluded.status,
+                generated_code = excluded.generated_code,
+                code_compressed = excluded.code_compressed,
+                test_results = excluded.test_results,
+                updated_at = CURRENT_TIMESTAMP
+        ''', [self._to_row(task) for task in tasks])
+        
+        conn.commit()
+        conn.close()
+    
+    def _to_row(self, task: ProgrammingTask) -> tuple:
+        """تحويل مهمة إلى صف"""
+        code_blob, compressed = self._encode_code(task.generated_code)
+        return (
+            task.task_id, task.description, task.language, task.status,
+            code_blob, compressed,
+            json.dumps(task.test_results, ensure_ascii=False) if task.test_results is not None else None
+        )
+    
+    def _row_to_dict(self, row: sqlite3.Row, include_code: bool = True) -> Dict[str, Any]:
+        """تحويل صف إلى قاموس"""
+        result = {
+            "id": row["id"],
+            "task_id": row["task_id"],
+            "description": row["description"],
+            "language": row["language"],
+            "status": row["status"],
+            "test_results": json.loads(row["test_results"]) if row["test_results"] else None,
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"]
+        }
+        if include_code:
+            result["generated_code"] = self._decode_code(row["generated_code"], row["code_compressed"])
+        return result
+    
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """استرجاع نتيجة مهمة عبر معرفها"""
+        conn = connect_db(self.db_path)
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT * FROM task_results WHERE task_id = ?", (task_id,))
+        row = cursor.fetchone()
+        conn.close()
+        
+        return self._row_to_dict(row) if row else None
+    
+    def query(self, status: Optional[str] = None, language: Optional[str] = None,
+              before_id: Optional[int] = None, limit: int = 50) -> Dict[str, Any]:
+        """استعلام النتائج مع ترقيم الصفحات بالمفتاح (الأحدث أولاً)"""
+        limit = max(1, min(limit, self.MAX_PAGE_SIZE))
+        conditions = []
+        params: List[Any] = []
+        
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
+        if language:
+            conditions.append("language = ?")
+            params.append(language)
+        if before_id is not None:
+            conditions.append("id < ?")
+            params.append(before_id)
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        
+        conn = connect_db(self.db_path)
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        
+        # الكود لا يُعاد في القوائم لتبقى الصفحات خفيفة
+        cursor.execute(f'''
+            SELECT id, task_id, description, language, status, test_results, created_at, updated_at
+            FROM task_results {where}
+            ORDER BY id DESC LIMIT ?
+        ''', (*params, limit))
+        rows = cursor.fetchall()
+        conn.close()
+        
+        items = [self._row_to_dict(row, include_code=False) for row in rows]
+        return {
+            "items": items,
+            "next_cursor": items[-1]["id"] if len(items) == limit else None
+        }
+
 class InternetLearner:
     """وحدة التعلم من الإنترنت"""
     
@@ -215,9 +491,8 @@ class InternetLearner:
                 "per_page": max_results
             }
             
-            response = requests.get(self.search_engines["github"], params=params, timeout=10)
-            if response.status_code == 200:
-                return response.json().get("items", [])
+            data = await self._fetch_json(self.search_engines["github"], params)
+            return data.get("items", [])
         except Exception as e:
             logger.error(f"خطأ في البحث في GitHub: {e}")
         
@@ -233,203 +508,180 @@ class InternetLearner:
                 "sort": "votes"
             }
             
-            response = requests.get(self.search_engines["stackoverflow"], params=params, timeout=10)
-            if response.status_code == 200:
-                return response.json().get("items", [])
+            data = await self._fetch_json(self.search_engines["stackoverflow"], params)
+            return data.get("items", [])
         except Exception as e:
             logger.error(f"خطأ في البحث في Stack Overflow: {e}")
         
         return []
+    
+    async def _fetch_json(self, url: str, params: Dict[str, Any]) -> Dict:
+        """طلب HTTP غير متزامن (إلغاء المهمة يغلق الاتصال فوراً)"""
+        metrics = current_task_metrics.get()
+        if metrics is not None:
+            metrics.http_calls += 1
+        
+        timeout = aiohttp.ClientTimeout(total=10)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with session.get(url, params=params) as response:
+                if response.status == 200:
+                    return await response.json()
+        return {}
+
+def task_signature(language: str, description: str, requirements: List[str],
+                   upstream: Dict[str, Dict[str, Any]] = None, generator_version: str = "") -> str:
+    """توقيع موحد لمدخلات التوليد (تجاهل حالة اللغة والمسافات وترتيب المتطلبات)
+    
+    أكواد ومعرفة المهام السابقة تدخل في الكود المولد للمهام التابعة، وإصدار
+    إضافة اللغة وقالبها يحدد شكله، فيدخل كلاهما في التوقيع.
+    """
+    canonical = json.dumps([
+        language.strip().lower(),
+        " ".join(description.split()),
+        sorted({" ".join(req.split()).lower() for req in requirements if req.strip()}),
+        [
+            [task_id, result["generated_code"], result["knowledge"]]
+            for task_id, result in sorted((upstream or {}).items())
+        ],
+        generator_version
+    ], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
 
 class CodeGenerator:
     """مولد الأكواد الذكي"""
     
-    def __init__(self, knowledge_base: KnowledgeBase):
+    # عدد الأكواد المحفوظة في الذاكرة قبل الرجوع إلى قاعدة البيانات
+    CACHE_SIZE = 1024
+    
+    def __init__(self, knowledge_base: KnowledgeBase, cache_size: int = CACHE_SIZE,
+                 registry: Optional[LanguageRegistry] = None):
         self.kb = knowledge_base
-        self.supported_languages = {
-            "python": self._generate_python_code,
-            "javascript": self._generate_javascript_code,
-            "java": self._generate_java_code,
-            "cpp": self._generate_cpp_code,
-            "html": self._generate_html_code,
-            "css": self._generate_css_code,
-            "sql": self._generate_sql_code,
-            "bash": self._generate_bash_code
-        }
+        self.cache_size = cache_size
+        self.code_cache: "OrderedDict[str, str]" = OrderedDict()
+        self.cache_hits = {"memory": 0, "database": 0, "miss": 0}
+        # إضافات اللغات تُستورد وتُترجم قوالبها عند أول طلب للغة
+        self.registry = registry or LanguageRegistry()
+    
+    @property
+    def supported_languages(self) -> List[str]:
+        """اللغات المدعومة (المدمجة والمسجلة عبر نقاط الدخول)"""
+        return self.registry.available()
         
     async def generate_code(self, task: ProgrammingTask) -> str:
         """توليد كود بناءً على المهمة المطلوبة"""
         logger.info(f"بدء توليد كود للمهمة: {task.description}")
         
-        # البحث في قاعدة المعرفة
-        relevant_knowledge = self.kb.get_knowledge(task.description)
+        signature = self.signature(task)
+        code = self._cached_code(signature)
+        if code is not None:
+            return code
         
-        # اختيار مولد الكود المناسب
-        if task.language.lower() in self.supported_languages:
-            generator = self.supported_languages[task.language.lower()]
-            code = await generator(task, relevant_knowledge)
+        # المهام التابعة تستخدم معرفة وأكواد المهام السابقة بدلاً من الاستعلام
+        if task.upstream:
+            relevant_knowledge = task.knowledge + [
+                {"topic": "upstream_code", "source": task_id, "content": upstream["generated_code"]}
+                for task_id, upstream in task.upstream.items()
+            ]
         else:
-            code = await self._generate_generic_code(task, relevant_knowledge)
+            # البحث في قاعدة المعرفة
+            relevant_knowledge = self.kb.get_knowledge(task.description)
+        
+        # اللغات غير المدعومة تستخدم القالب العام
+        code = self.registry.render(
+            task.language,
+            task.description,
+            task.requirements,
+            created=self._created_header(),
+            knowledge=relevant_knowledge
+        )
         
         # حفظ الكود المولد
-        await self._save_generated_code(task, code)
+        await self._save_generated_code(task, code, signature)
+        self._remember(signature, code)
         
         return code
     
-    async def _generate_python_code(self, task: ProgrammingTask, knowledge: List[Dict]) -> str:
-        """توليد كود Python"""
-        template = f'''#!/usr/bin/env python3
-"""
-{task.description}
-Generated by NexoraTrix AI Programmer
-Created: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
-"""
-
-import os
-import sys
-import json
-from typing import List, Dict, Any, Optional
-from datetime import datetime
-
-class {self._generate_class_name(task.description)}:
-    """
-    {task.description}
-    """
+    def signature(self, task: ProgrammingTask) -> str:
+        """مفتاح ذاكرة التوليد للمهمة"""
+        return task_signature(
+            task.language, task.description, task.requirements,
+            task.upstream, self.registry.version(task.language)
+        )
     
-    def __init__(self):
-        self.initialized = True
-        self.created_at = datetime.now()
+    def _cached_code(self, signature: str) -> Optional[str]:
+        """البحث عن كود سابق بنفس التوقيع في الذاكرة ثم في قاعدة البيانات"""
+        code = self.code_cache.get(signature)
+        if code is not None:
+            self.code_cache.move_to_end(signature)
+            self.cache_hits["memory"] += 1
+            return code
         
-    def main_function(self):
-        """الوظيفة الرئيسية"""
+        conn = connect_db(self.kb.db_path)
         try:
-            # TODO: تنفيذ المنطق الأساسي هنا
-            result = self._process_task()
-            return result
-        except Exception as e:
-            print(f"خطأ في التنفيذ: {{e}}")
+            row = conn.execute(
+                "SELECT code FROM generated_codes WHERE hash = ?", (signature,)
+            ).fetchone()
+        finally:
+            conn.close()
+        
+        if row is None:
+            self.cache_hits["miss"] += 1
             return None
-    
-    def _process_task(self):
-        """معالجة المهمة"""
-        # تنفيذ المنطق بناءً على المتطلبات
-        {self._generate_requirements_code(task.requirements)}
         
-        return "تم تنفيذ المهمة بنجاح"
-
-if __name__ == "__main__":
-    app = {self._generate_class_name(task.description)}()
-    result = app.main_function()
-    print(result)
-'''
-        return template
-    
-    async def _generate_javascript_code(self, task: ProgrammingTask, knowledge: List[Dict]) -> str:
-        """توليد كود JavaScript"""
-        template = f'''/**
- * {task.description}
- * Generated by NexoraTrix AI Programmer
- * Created: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
- */
-
-class {self._generate_class_name(task.description)} {{
-    constructor() {{
-        this.initialized = true;
-        this.createdAt = new Date();
-    }}
-    
-    async mainFunction() {{
-        try {{
-            const result = await this.processTask();
-            return result;
-        }} catch (error) {{
-            console.error('خطأ في التنفيذ:', error);
-            return null;
-        }}
-    }}
-    
-    async processTask() {{
-        // تنفيذ المنطق بناءً على المتطلبات
-        {self._generate_js_requirements_code(task.requirements)}
-        
-        return 'تم تنفيذ المهمة بنجاح';
-    }}
-}}
-
-// تشغيل التطبيق
-const app = new {self._generate_class_name(task.description)}();
-app.mainFunction().then(result => console.log(result));
-'''
-        return template
-    
-    def _generate_class_name(self, description: str) -> str:
-        """توليد اسم كلاس من الوصف"""
-        words = description.replace(" ", "_").replace("-", "_")
-        return "".join(word.capitalize() for word in words.split("_") if word)[:50] + "Handler"
-    
-    def _generate_requirements_code(self, requirements: List[str]) -> str:
-        """توليد كود بناءً على المتطلبات"""
-        code_lines = []
-        for req in requirements:
-            if "database" in req.lower():
-                code_lines.append("        # إعداد قاعدة البيانات")
-                code_lines.append("        # db_connection = sqlite3.connect('app.db')")
-            elif "api" in req.lower():
-                code_lines.append("        # إعداد API")
-                code_lines.append("        # response = requests.get('https://api.example.com')")
-            elif "file" in req.lower():
-                code_lines.append("        # معالجة الملفات")
-                code_lines.append("        # with open('file.txt', 'r') as f: data = f.read()")
-        
-        return "\n".join(code_lines) if code_lines else "        pass"
-    
-    def _generate_js_requirements_code(self, requirements: List[str]) -> str:
-        """توليد كود JavaScript بناءً على المتطلبات"""
-        code_lines = []
-        for req in requirements:
-            if "database" in req.lower():
-                code_lines.append("        // إعداد قاعدة البيانات")
-                code_lines.append("        // const db = await connectToDatabase();")
-            elif "api" in req.lower():
-                code_lines.append("        // إعداد API")
-                code_lines.append("        // const response = await fetch('https://api.example.com');")
-        
-        return "\n".join(code_lines) if code_lines else "        // TODO: تنفيذ المنطق"
-    
-    async def _generate_generic_code(self, task: ProgrammingTask, knowledge: List[Dict]) -> str:
-        """توليد كود عام لأي لغة"""
-        return f"""
-// {task.description}
-// Generated by NexoraTrix AI Programmer
-// Language: {task.language}
-// Created: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
-
-// TODO: تنفيذ المنطق الأساسي
-// Requirements: {', '.join(task.requirements)}
-
-main() {{
-    // بدء التنفيذ
-    processTask();
-}}
-
-processTask() {{
-    // معالجة المهمة
-    return "تم تنفيذ المهمة بنجاح";
-}}
-"""
+        self.cache_hits["database"] += 1
+        self._remember(signature, row[0])
+        return row[0]
+    
+    def _remember(self, signature: str, code: str):
+        """إضافة كود إلى ذاكرة LRU"""
+        self.code_cache[signature] = code
+        self.code_cache.move_to_end(signature)
+        while len(self.code_cache) > self.cache_size:
+            self.code_cache.popitem(last=False)
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """إحصائيات ذاكرة التوليد ونسب الإصابة"""
+        total = sum(self.cache_hits.values())
+        return {
+            **self.cache_hits,
+            "cached": len(self.code_cache),
+            "memory_hit_ratio": self.cache_hits["memory"] / total if total else 0.0,
+            "hit_ratio": (self.cache_hits["memory"] + self.cache_hits["database"]) / total if total else 0.0
+        }
+    
+    def record_outcome(self, signature: str, success: bool):
+        """تسجيل نتيجة اختبار كود وتحديث نسبة نجاحه"""
+        conn = connect_db(self.kb.db_path)
+        try:
+            conn.execute(
+                "INSERT INTO code_outcomes (hash, success) VALUES (?, ?)",
+                (signature, int(success))
+            )
+            conn.execute('''
+                UPDATE generated_codes SET success_rate = (
+                    SELECT AVG(success) FROM code_outcomes WHERE hash = ?
+                ) WHERE hash = ?
+            ''', (signature, signature))
+            conn.commit()
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def _created_header() -> str:
+        """تاريخ الإنشاء بدون وقت حتى يبقى الناتج ثابتاً لنفس المدخلات"""
+        return datetime.now().strftime("%Y-%m-%d")
     
-    async def _save_generated_code(self, task: ProgrammingTask, code: str):
-        """حفظ الكود المولد في قاعدة البيانات"""
-        conn = sqlite3.connect(self.kb.db_path)
+    async def _save_generated_code(self, task: ProgrammingTask, code: str, signature: str):
+        """حفظ الكود المولد في قاعدة البيانات (عمود hash يحمل توقيع المدخلات)"""
+        conn = connect_db(self.kb.db_path)
         cursor = conn.cursor()
         
-        code_hash = hashlib.md5(code.encode()).hexdigest()
-        
+        # IGNORE بدلاً من REPLACE حتى لا يُحذف الصف ويُعاد إدراجه مع نسبة نجاحه
         cursor.execute('''
-            INSERT OR REPLACE INTO generated_codes 
+            INSERT OR IGNORE INTO generated_codes 
             (language, description, code, hash)
             VALUES (?, ?, ?, ?)
-        ''', (task.language, task.description, code, code_hash))
+        ''', (task.language, task.description, code, signature))
         
         conn.commit()
         conn.close()
@@ -437,14 +689,137 @@ processTask() {{
 class SelfImprovementEngine:
     """محرك التحسين الذاتي"""
     
+    # عدد الأكواد في كل دفعة تُرسل لعملية فرعية، والحد الأقصى للنتائج في كل دورة
+    MINING_CHUNK_SIZE = 200
+    MINING_BATCH_LIMIT = 20000
+    # عمليات التعدين تُنشأ عند الحاجة حتى هذا الحد وتبقى بين الدورات
+    MINING_WORKERS = os.cpu_count() or 1
+    
+    # طول فترة كل تجميع بالثواني
+    ROLLUP_RESOLUTIONS = {"hour": 3600, "day": 86400}
+    # مدة الاحتفاظ بالقيم الخام وبالتجميعات الساعية (بالثواني)
+    RAW_RETENTION = 7 * 86400
+    HOURLY_RETENTION = 90 * 86400
+    
     def __init__(self, knowledge_base: KnowledgeBase, code_generator: CodeGenerator):
         self.kb = knowledge_base
         self.code_gen = code_generator
-        self.improvement_cycles = 0
+        self.improvement_cycles = self._load_cycle_count()
+        self._mining_pool: Optional[ProcessPoolExecutor] = None
+        self._mining_pool_lock = threading.Lock()
+    
+    def _load_cycle_count(self) -> int:
+        """عدد الدورات المسجلة سابقاً"""
+        conn = connect_db(self.kb.db_path)
+        try:
+            row = conn.execute('''
+                SELECT MAX(last_value) FROM improvement_rollups
+                WHERE resolution = 'day' AND metric = 'improvement_cycles'
+            ''').fetchone()
+        finally:
+            conn.close()
+        return int(row[0] or 0)
+    
+    def record_cycle_metrics(self, metrics: Dict[str, Any], timestamp: Optional[int] = None):
+        """إلحاق مقاييس دورة بالسلسلة الزمنية وتحديث التجميعات في نفس المعاملة"""
+        ts = int(timestamp if timestamp is not None else time.time())
+        values = [
+            (name, float(value)) for name, value in metrics.items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool)
+        ]
+        conn = connect_db(self.kb.db_path)
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO improvement_metrics (metric, ts, value) VALUES (?, ?, ?)",
+                [(name, ts, value) for name, value in values]
+            )
+            for resolution, seconds in self.ROLLUP_RESOLUTIONS.items():
+                conn.executemany('''
+                    INSERT INTO improvement_rollups
+                    (resolution, metric, bucket, count, total, min_value, max_value, last_value)
+                    VALUES (?, ?, ?, 1, ?, ?, ?, ?)
+                    ON CONFLICT(resolution, metric, bucket) DO UPDATE SET
+                        count = count + 1,
+                        total = total + excluded.total,
+                        min_value = MIN(min_value, excluded.min_value),
+                        max_value = MAX(max_value, excluded.max_value),
+                        last_value = excluded.last_value
+                ''', [
+                    (resolution, name, ts - ts % seconds, value, value, value, value)
+                    for name, value in values
+                ])
+            
+            # الاستعلامات تقرأ التجميعات فقط، فلا حاجة للاحتفاظ بالتاريخ الخام كاملاً
+            conn.execute("DELETE FROM improvement_metrics WHERE ts < ?", (ts - self.RAW_RETENTION,))
+            conn.execute(
+                "DELETE FROM improvement_rollups WHERE resolution = 'hour' AND bucket < ?",
+                (ts - self.HOURLY_RETENTION,)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def metric_trends(self, resolution: str = "hour", limit: int = 24,
+                      metrics: Optional[List[str]] = None) -> Dict[str, Any]:
+        """اتجاهات المقاييس من التجميعات: النقاط والقيمة الأخيرة والفرق عن بداية الفترة"""
+        if resolution not in self.ROLLUP_RESOLUTIONS:
+            raise ValueError(f"الدقة يجب أن تكون إحدى: {', '.join(self.ROLLUP_RESOLUTIONS)}")
+        limit = max(1, min(limit, 1000))
+        
+        conn = connect_db(self.kb.db_path)
+        try:
+            names = metrics or [row[0] for row in conn.execute(
+                "SELECT DISTINCT metric FROM improvement_rollups WHERE resolution = ?",
+                (resolution,)
+            )]
+            trends = {}
+            for name in names:
+                rows = conn.execute('''
+                    SELECT bucket, count, total, min_value, max_value, last_value
+                    FROM improvement_rollups
+                    WHERE resolution = ? AND metric = ?
+                    ORDER BY bucket DESC LIMIT ?
+                ''', (resolution, name, limit)).fetchall()
+                if not rows:
+                    continue
+                rows.reverse()
+                first, last = rows[0][5], rows[-1][5]
+                trends[name] = {
+                    "points": [
+                        {
+                            "bucket": datetime.fromtimestamp(bucket).isoformat(),
+                            "avg": total / count,
+                            "min": min_value,
+                            "max": max_value,
+                            "last": last_value
+                        }
+                        for bucket, count, total, min_value, max_value, last_value in rows
+                    ],
+                    "latest": last,
+                    "delta": last - first,
+                    "delta_pct": (last - first) / abs(first) * 100 if first else None
+                }
+        finally:
+            conn.close()
+        
+        return {"resolution": resolution, "metrics": trends}
         
+    def watermarks(self) -> Dict[str, int]:
+        """آخر معرف في كل جدول يُغذي التحسين (لا تغير = لا حاجة لدورة جديدة)"""
+        conn = connect_db(self.kb.db_path)
+        try:
+            row = conn.execute('''
+                SELECT (SELECT COALESCE(MAX(id), 0) FROM knowledge),
+                       (SELECT COALESCE(MAX(id), 0) FROM code_outcomes),
+                       (SELECT COALESCE(MAX(id), 0) FROM learning_sessions)
+            ''').fetchone()
+        finally:
+            conn.close()
+        return {"knowledge": row[0], "code_outcomes": row[1], "learning_sessions": row[2]}
+    
     async def analyze_performance(self) -> Dict[str, Any]:
         """تحليل الأداء الحالي"""
-        conn = sqlite3.connect(self.kb.db_path)
+        conn = connect_db(self.kb.db_path)
         cursor = conn.cursor()
         
         # إحصائيات المعرفة
@@ -504,40 +879,110 @@ class SelfImprovementEngine:
         self.improvement_cycles += 1
     
     async def _improve_code_generation(self):
-        """تحسين توليد الأكواد"""
-        # تحليل الأكواد الناجحة وتعلم الأنماط
-        conn = sqlite3.connect(self.kb.db_path)
-        cursor = conn.cursor()
+        """تحسين توليد الأكواد باستخراج أنماط الأكواد الناجحة
         
-        cursor.execute('''
-            SELECT code, success_rate FROM generated_codes 
-            WHERE success_rate > 0.8 
-            ORDER BY success_rate DESC LIMIT 10
-        ''')
+        تُعالج فقط نتائج الاختبار المضافة بعد آخر معرف محفوظ، وتُدمج
+        أعداد الأنماط في جدول code_patterns.
+        """
+        conn = connect_db(self.kb.db_path)
+        try:
+            row = conn.execute(
+                "SELECT value FROM mining_state WHERE name = 'code_patterns'"
+            ).fetchone()
+            watermark = row[0] if row else 0
+            
+            # الكود يُقرأ للنتائج الناجحة فقط، والفاشلة تُقدم العلامة فقط
+            rows = conn.execute('''
+                SELECT o.id,
+                       CASE WHEN o.success = 1 AND g.language = 'python' THEN g.code END
+                FROM code_outcomes o
+                LEFT JOIN generated_codes g ON g.hash = o.hash
+                WHERE o.id > ?
+                ORDER BY o.id
+                LIMIT ?
+            ''', (watermark, self.MINING_BATCH_LIMIT)).fetchall()
+        finally:
+            conn.close()
+        
+        if not rows:
+            return
+        
+        codes = [code for _, code in rows if code]
+        pattern_counts = await self._mine_patterns(codes) if codes else {}
+        
+        conn = connect_db(self.kb.db_path)
+        try:
+            known = {
+                pattern for (pattern,) in conn.execute("SELECT pattern FROM code_patterns")
+            }
+            conn.executemany('''
+                INSERT INTO code_patterns (pattern, occurrences, codes)
+                VALUES (?, ?, ?)
+                ON CONFLICT(pattern) DO UPDATE SET
+                    occurrences = occurrences + excluded.occurrences,
+                    codes = codes + excluded.codes,
+                    updated_at = CURRENT_TIMESTAMP
+            ''', [(pattern, counts[0], counts[1]) for pattern, counts in pattern_counts.items()])
+            conn.execute('''
+                INSERT INTO mining_state (name, value) VALUES ('code_patterns', ?)
+                ON CONFLICT(name) DO UPDATE SET value = excluded.value
+            ''', (rows[-1][0],))
+            conn.commit()
+        finally:
+            conn.close()
         
-        successful_codes = cursor.fetchall()
-        
-        # استخراج الأنماط الناجحة
-        patterns = []
-        for code, rate in successful_codes:
-            # تحليل بسيط للأنماط
-            if "try:" in code and "except:" in code:
-                patterns.append("error_handling")
-            if "class " in code:
-                patterns.append("object_oriented")
-            if "async def" in code:
-                patterns.append("asynchronous")
-        
-        # حفظ الأنماط المكتشفة
-        for pattern in set(patterns):
+        logger.info(f"تعدين الأنماط: {len(rows)} نتيجة جديدة، {len(codes)} كود ناجح")
+        
+        # تُضاف المعرفة للأنماط المكتشفة لأول مرة فقط
+        for pattern in sorted(set(pattern_counts) - known):
             self.kb.add_knowledge(
                 topic="successful_patterns",
                 content=f"Pattern: {pattern}",
                 source="self_analysis",
                 confidence=0.9
             )
+    
+    async def _mine_patterns(self, codes: List[str]) -> Dict[str, List[int]]:
+        """تحليل الأكواد على دفعات في عمليات منفصلة"""
+        chunks = [
+            codes[i:i + self.MINING_CHUNK_SIZE]
+            for i in range(0, len(codes), self.MINING_CHUNK_SIZE)
+        ]
+        if len(chunks) == 1:
+            # لا تستحق دفعة واحدة تكلفة تشغيل عمليات جديدة
+            return count_patterns(chunks[0])
         
-        conn.close()
+        loop = asyncio.get_running_loop()
+        pool = self._mining_executor()
+        try:
+            results = await asyncio.gather(*(
+                loop.run_in_executor(pool, count_patterns, chunk) for chunk in chunks
+            ))
+        except BrokenProcessPool:
+            # عملية انتهت فجأة: يُستبدل المجمع في الدورة التالية
+            self.close()
+            raise
+        return merge_pattern_counts(results)
+    
+    def _mining_executor(self) -> ProcessPoolExecutor:
+        """مجمع عمليات التعدين، يُنشأ مرة واحدة ويُعاد استخدامه بين الدورات"""
+        with self._mining_pool_lock:
+            if self._mining_pool is None:
+                # spawn لأن العملية الرئيسية متعددة الخيوط. الدالة المنفذة من
+                # pattern_mining التي لا تستورد شيئاً من التطبيق، فلا يُنشأ في
+                # العمليات الفرعية إلا ما تنشئه الوحدة الرئيسية عند استيرادها
+                self._mining_pool = ProcessPoolExecutor(
+                    max_workers=self.MINING_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._mining_pool
+    
+    def close(self):
+        """إيقاف مجمع التعدين دون انتظار عملياته (لا يحجب حلقة الأحداث)"""
+        with self._mining_pool_lock:
+            pool, self._mining_pool = self._mining_pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
     
     async def _improve_learning_sources(self):
         """تحسين مصادر التعلم"""
@@ -581,19 +1026,466 @@ class SelfImprovementEngine:
                 confidence=0.7
             )
 
+class ImprovementTrigger:
+    """قرار تشغيل دورة التحسين من المقاييس المتدفقة بدلاً من جدول ثابت
+    
+    الدورة تُطلب عند انخفاض نسبة النجاح عن خط الأساس، أو تتابع الإخفاقات،
+    أو نمو قاعدة المعرفة. الطلبات المتقاربة تُجمع خلال فترة debounce، ولا
+    تعمل دورتان خلال أقل من min_interval، وتُتخطى الدورة إذا لم تتحرك
+    العلامات المائية لمدخلاتها منذ الدورة السابقة.
+    """
+    
+    def __init__(self, window: int = 50, min_samples: int = 10, success_drop: float = 0.15,
+                 failure_burst: int = 5, burst_window: float = 60.0, knowledge_growth: int = 100,
+                 debounce: float = 30.0, min_interval: float = 300.0, clock=time.monotonic):
+        self.outcomes: deque = deque(maxlen=window)
+        self.min_samples = min_samples
+        self.success_drop = success_drop
+        self.failures: deque = deque(maxlen=failure_burst)
+        self.failure_burst = failure_burst
+        self.burst_window = burst_window
+        self.knowledge_growth = knowledge_growth
+        self.debounce = debounce
+        self.min_interval = min_interval
+        self.clock = clock
+        
+        self.baseline: Optional[float] = None
+        self.pending_since: Optional[float] = None
+        self.last_run: Optional[float] = None
+        self.last_watermarks: Optional[Dict[str, int]] = None
+        self.last_reasons: List[str] = []
+        self.skipped = 0
+    
+    def record_outcome(self, success: bool):
+        """تسجيل نتيجة مهمة"""
+        self.outcomes.append(success)
+        if not success:
+            self.failures.append(self.clock())
+        if self.baseline is None and len(self.outcomes) >= self.min_samples:
+            self.baseline = self.success_rate()
+    
+    def success_rate(self) -> Optional[float]:
+        """نسبة النجاح في نافذة النتائج الأخيرة"""
+        if not self.outcomes:
+            return None
+        return sum(self.outcomes) / len(self.outcomes)
+    
+    def reasons(self, watermarks: Dict[str, int]) -> List[str]:
+        """أسباب طلب دورة تحسين الآن"""
+        reasons = []
+        rate = self.success_rate()
+        if self.baseline is not None and len(self.outcomes) >= self.min_samples \
+                and self.baseline - rate >= self.success_drop:
+            reasons.append("success_rate_drop")
+        
+        if len(self.failures) == self.failure_burst \
+                and self.failures[-1] - self.failures[0] <= self.burst_window:
+            reasons.append("failure_burst")
+        
+        previous = (self.last_watermarks or {}).get("knowledge", 0)
+        if watermarks.get("knowledge", 0) - previous >= self.knowledge_growth:
+            reasons.append("knowledge_growth")
+        return reasons
+    
+    def poll(self, watermarks: Dict[str, int]) -> List[str]:
+        """الأسباب إذا حان وقت الدورة، وإلا قائمة فارغة"""
+        if watermarks == self.last_watermarks:
+            # لا جديد في المدخلات، فلا فائدة من دورة
+            self.pending_since = None
+            return []
+        
+        reasons = self.reasons(watermarks)
+        if not reasons:
+            self.pending_since = None
+            return []
+        
+        now = self.clock()
+        if self.pending_since is None:
+            self.pending_since = now
+        if now - self.pending_since < self.debounce:
+            return []
+        if self.last_run is not None and now - self.last_run < self.min_interval:
+            self.skipped += 1
+            return []
+        return reasons
+    
+    def mark_run(self, watermarks: Dict[str, int], reasons: List[str]):
+        """تسجيل تنفيذ دورة (العلامات تُقرأ بعد الدورة حتى لا تطلب الدورة نفسها دورة أخرى)"""
+        self.last_run = self.clock()
+        self.last_watermarks = watermarks
+        self.last_reasons = reasons
+        self.pending_since = None
+        self.failures.clear()
+        self.baseline = self.success_rate() if len(self.outcomes) >= self.min_samples else None
+    
+    def status(self) -> Dict[str, Any]:
+        """حالة المحفز للعرض"""
+        now = self.clock()
+        return {
+            "success_rate": self.success_rate(),
+            "baseline": self.baseline,
+            "pending": self.pending_since is not None,
+            "seconds_since_last_run": now - self.last_run if self.last_run is not None else None,
+            "last_reasons": self.last_reasons,
+            "rate_limited": self.skipped
+        }
+
+class EventSubscription:
+    """اشتراك في ناقل الأحداث"""
+    
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.closed = False
+
+class TaskEventBus:
+    """ناقل أحداث المهام: نشر واحد يصل إلى جميع المشتركين"""
+    
+    def __init__(self, subscriber_queue_size: int = 256):
+        self.subscriber_queue_size = subscriber_queue_size
+        self.subscribers = set()
+        self.last_event_id = 0
+        
+    def subscribe(self) -> EventSubscription:
+        """إنشاء اشتراك جديد"""
+        subscription = EventSubscription(self.subscriber_queue_size)
+        self.subscribers.add(subscription)
+        return subscription
+    
+    def unsubscribe(self, subscription: EventSubscription):
+        """إلغاء اشتراك"""
+        subscription.closed = True
+        self.subscribers.discard(subscription)
+        
+    def publish(self, event_type: str, data: Dict[str, Any]):
+        """نشر حدث (يُسلسل مرة واحدة لجميع المشتركين)"""
+        self.last_event_id += 1
+        if not self.subscribers:
+            return
+        
+        event = (self.last_event_id, event_type, json.dumps(data, ensure_ascii=False, default=str))
+        for subscription in list(self.subscribers):
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # المشترك البطيء يُفصل ليعيد الاتصال ويستلم لقطة جديدة
+                self.unsubscribe(subscription)
+
+class TenantQuotaExceeded(Exception):
+    """تجاوز العميل حد المهام المنتظرة"""
+    
+    def __init__(self, client_id: str, retry_after: int):
+        super().__init__(f"تجاوز العميل {client_id} حد المهام المنتظرة")
+        self.client_id = client_id
+        self.retry_after = retry_after
+
+class FairTaskQueue:
+    """طابور إدخال عادل بين العملاء بخوارزمية Deficit Round-Robin الموزونة
+    
+    لكل عميل كومة مهام مرتبة بالأولوية ثم الموعد النهائي الأقرب (EDF) ثم
+    ترتيب الوصول. يُحجز مكان المهمة عند قبولها (reserve) ويُحرر عند سحبها،
+    ويُحتسب العميل مشغولاً حتى تُستدعى release عند انتهاء المهمة.
+    """
+    
+    def __init__(self, maxsize: int = 0, weights: Dict[str, float] = None,
+                 max_pending_per_client: int = 5000, max_running_per_client: int = 8):
+        # وزن غير موجب لا يرفع رصيد العميل أبداً فيدور _next بلا نهاية
+        for client_id, weight in (weights or {}).items():
+            if not weight > 0:
+                raise ValueError(f"وزن العميل {client_id} يجب أن يكون أكبر من صفر")
+        self.maxsize = maxsize
+        self.weights = weights or {}
+        self.max_pending_per_client = max_pending_per_client
+        self.max_running_per_client = max_running_per_client
+        self._heaps: Dict[str, List] = {}
+        self._round = deque()
+        self._deficit: Dict[str, float] = {}
+        self._pending: Dict[str, int] = {}
+        self._running: Dict[str, set] = {}
+        self._size = 0
+        self._counter = itertools.count()
+        self._changed = asyncio.Condition()
+        
+    def qsize(self) -> int:
+        return self._size
+    
+    def pending(self, client_id: str) -> int:
+        """عدد المهام المقبولة التي لم تُسحب بعد للعميل"""
+        return self._pending.get(client_id, 0)
+    
+    def running(self, client_id: str) -> int:
+        """عدد المهام قيد التنفيذ للعميل"""
+        return len(self._running.get(client_id, ()))
+    
+    def reserve(self, client_id: str, count: int = 1, retry_after: int = 1):
+        """قبول مهام جديدة للعميل أو رفعها TenantQuotaExceeded"""
+        if self.pending(client_id) + count > self.max_pending_per_client:
+            raise TenantQuotaExceeded(client_id, retry_after)
+        self._pending[client_id] = self.pending(client_id) + count
+        
+    def unreserve(self, client_id: str, count: int = 1):
+        """تحرير حجز مهام لم تدخل الطابور"""
+        self._pending[client_id] = max(0, self.pending(client_id) - count)
+    
+    async def put(self, task: ProgrammingTask):
+        """إدخال مهمة محجوزة (ينتظر إذا امتلأ الطابور)"""
+        async with self._changed:
+            while self.maxsize and self._size >= self.maxsize:
+                await self._changed.wait()
+            
+            client_id = task.client_id
+            deadline = task.deadline.timestamp() if task.deadline else math.inf
+            heap = self._heaps.setdefault(client_id, [])
+            if not heap:
+                self._round.append(client_id)
+                self._deficit[client_id] = 0.0
+            heapq.heappush(heap, (task.priority, deadline, next(self._counter), task))
+            self._size += 1
+            self._changed.notify_all()
+            
+    async def get(self) -> ProgrammingTask:
+        """سحب المهمة التالية حسب الدور العادل"""
+        async with self._changed:
+            while (task := self._next()) is None:
+                await self._changed.wait()
+            self._changed.notify_all()
+            return task
+    
+    def _next(self) -> Optional[ProgrammingTask]:
+        """اختيار المهمة التالية (None إذا كان كل العملاء المنتظرين عند حدهم)"""
+        if not any(self.running(client_id) < self.max_running_per_client for client_id in self._round):
+            return None
+        
+        while True:
+            client_id = self._round[0]
+            if self.running(client_id) >= self.max_running_per_client:
+                self._round.rotate(-1)
+                continue
+            
+            if self._deficit[client_id] < 1:
+                self._deficit[client_id] += self.weights.get(client_id, 1.0)
+            if self._deficit[client_id] < 1:
+                self._round.rotate(-1)
+                continue
+            
+            heap = self._heaps[client_id]
+            task = heapq.heappop(heap)[-1]
+            self._deficit[client_id] -= 1
+            self._size -= 1
+            self.unreserve(client_id)
+            self._running.setdefault(client_id, set()).add(task.task_id)
+            
+            if not heap:
+                # عميل بلا مهام يخرج من الدور ويفقد رصيده
+                self._round.popleft()
+                del self._deficit[client_id]
+            elif self._deficit[client_id] < 1:
+                self._round.rotate(-1)
+            return task
+    
+    async def discard(self, task: ProgrammingTask) -> bool:
+        """إزالة مهمة منتظرة من الطابور (عند إلغائها)"""
+        async with self._changed:
+            heap = self._heaps.get(task.client_id, [])
+            for index, entry in enumerate(heap):
+                if entry[-1] is task:
+                    heap.pop(index)
+                    heapq.heapify(heap)
+                    self._size -= 1
+                    self.unreserve(task.client_id)
+                    if not heap:
+                        self._round.remove(task.client_id)
+                        del self._deficit[task.client_id]
+                    self._changed.notify_all()
+                    return True
+            return False
+    
+    def clients(self) -> Dict[str, Dict[str, int]]:
+        """حالة طوابير العملاء"""
+        client_ids = set(self._pending) | set(self._running)
+        return {
+            client_id: {"pending": self.pending(client_id), "running": self.running(client_id)}
+            for client_id in client_ids
+            if self.pending(client_id) or self.running(client_id)
+        }
+    
+    async def release(self, task: ProgrammingTask):
+        """تحرير مكان المهمة المنتهية من حد تزامن العميل"""
+        async with self._changed:
+            self._running.get(task.client_id, set()).discard(task.task_id)
+            self._changed.notify_all()
+
+class PipelineStage:
+    """مرحلة في خط معالجة المهام لها طابور محدود وحد تزامن خاص"""
+    
+    def __init__(self, name: str, handler, concurrency: int = 1, queue_size: int = 50,
+                 queue=None):
+        self.name = name
+        self.handler = handler
+        self.concurrency = max(1, concurrency)
+        self.queue = queue if queue is not None else asyncio.Queue(maxsize=queue_size)
+        self.active = 0
+        self.processed = 0
+        self.failed = 0
+        self.busy_time = 0.0
+        
+    def metrics(self, elapsed: float) -> Dict[str, Any]:
+        """مقاييس استخدام المرحلة"""
+        capacity = self.concurrency * elapsed
+        return {
+            "concurrency": self.concurrency,
+            "queue_depth": self.queue.qsize(),
+            "queue_size": self.queue.maxsize,
+            "active": self.active,
+            "processed": self.processed,
+            "failed": self.failed,
+            "avg_service_time": self.busy_time / self.processed if self.processed else 0.0,
+            "utilization": min(1.0, self.busy_time / capacity) if capacity > 0 else 0.0
+        }
+
+class TaskPipeline:
+    """خط معالجة متعدد المراحل تربطه طوابير محدودة
+    
+    كل مرحلة تعمل بعدد عمّالها الخاص، وعند امتلاء طابور المرحلة التالية
+    ينتظر العامل، فينتقل الضغط العكسي حتى دالة submit.
+    """
+    
+    def __init__(self, stages: List[PipelineStage], on_error=None):
+        self.stages = stages
+        self.on_error = on_error
+        self.workers: List[asyncio.Task] = []
+        self.started_at: Optional[float] = None
+        
+    async def submit(self, task: ProgrammingTask):
+        """إدخال مهمة في المرحلة الأولى (ينتظر إذا كان الطابور ممتلئاً)"""
+        await self.stages[0].queue.put(task)
+        
+    def start(self):
+        """تشغيل عمّال جميع المراحل"""
+        self.started_at = time.perf_counter()
+        for index, stage in enumerate(self.stages):
+            next_stage = self.stages[index + 1] if index + 1 < len(self.stages) else None
+            for _ in range(stage.concurrency):
+                self.workers.append(asyncio.create_task(self._worker(stage, next_stage)))
+                
+    async def stop(self):
+        """إيقاف العمّال"""
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        
+    async def _worker(self, stage: PipelineStage, next_stage: Optional[PipelineStage]):
+        """عامل يسحب المهام من طابور المرحلة ويمررها للمرحلة التالية"""
+        while True:
+            task = await stage.queue.get()
+            stage.active += 1
+            started = time.perf_counter()
+            proceed = True
+            
+            try:
+                proceed = await stage.handler(task) is not False
+            except Exception as e:
+                stage.failed += 1
+                proceed = False
+                logger.error(f"خطأ في مرحلة {stage.name} للمهمة {task.task_id}: {e}")
+                if self.on_error:
+                    await self.on_error(task, e)
+            finally:
+                stage.busy_time += time.perf_counter() - started
+                stage.active -= 1
+                stage.processed += 1
+            
+            if proceed and next_stage is not None:
+                await next_stage.queue.put(task)
+                
+    def estimated_time(self, stage_names: List[str]) -> float:
+        """تقدير زمن المراحل المحددة من متوسط زمن خدمتها"""
+        return sum(
+            stage.busy_time / stage.processed
+            for stage in self.stages
+            if stage.name in stage_names and stage.processed
+        )
+    
+    def metrics(self) -> Dict[str, Any]:
+        """مقاييس المراحل مع تحديد عنق الزجاجة"""
+        elapsed = time.perf_counter() - self.started_at if self.started_at else 0.0
+        stages = {stage.name: stage.metrics(elapsed) for stage in self.stages}
+        bottleneck = max(stages, key=lambda name: stages[name]["utilization"]) if stages else None
+        
+        return {
+            "stages": stages,
+            "bottleneck": bottleneck
+        }
+
 class AutonomousProgrammer:
     """المبرمج المستقل - النواة الرئيسية"""
     
-    def __init__(self):
+    # حدود التزامن الافتراضية: التعلم مرتبط بالشبكة والاختبار بالمعالج والحفظ بالقرص
+    DEFAULT_STAGE_CONCURRENCY = {
+        "learn": 4,
+        "generate": 2,
+        "test": os.cpu_count() or 2,
+        "save": 1
+    }
+    
+    STAGE_ORDER = ["learn", "generate", "test", "save"]
+    
+    # المهلة القصوى لكل مرحلة (بالثواني)، وتُقلص حسب الوقت المتبقي للموعد النهائي
+    STAGE_TIMEOUTS = {
+        "learn": 30,
+        "generate": 30,
+        "test": 60,
+        "save": 30
+    }
+    
+    # مراحل لا يوقف فشلها أو انتهاء مهلتها المهمة
+    OPTIONAL_STAGES = {"learn"}
+    # مراحل تمر بها المهمة دون تنفيذ إذا أُعيد استخدام كود مهمة مشابهة
+    REUSE_SKIPPED_STAGES = {"generate", "test"}
+    
+    # عدد العينات المحفوظة لحساب مئينات زمن المراحل
+    LATENCY_SAMPLES = 1000
+    # الفاصل بين فحوص محفز التحسين (بالثواني)
+    IMPROVEMENT_CHECK_INTERVAL = 5
+    
+    # الفاصل بين نشر ملخصات الحالة للمشتركين (بالثواني)
+    STATUS_PUBLISH_INTERVAL = 15
+    
+    def __init__(self, stage_concurrency: Dict[str, int] = None, queue_size: int = 100,
+                 client_weights: Dict[str, float] = None, max_pending_per_client: int = 5000,
+                 max_running_per_client: int = 8, reuse_similar: bool = True,
+                 similarity_threshold: float = 0.8):
         self.knowledge_base = KnowledgeBase()
         self.internet_learner = InternetLearner(self.knowledge_base)
         self.code_generator = CodeGenerator(self.knowledge_base)
         self.improvement_engine = SelfImprovementEngine(self.knowledge_base, self.code_generator)
+        self.result_store = TaskResultStore()
+        self.event_bus = TaskEventBus()
+        # المهام المكتملة تُفهرس للعثور على المهام المكررة بصياغة مختلفة
+        self.similarity_index = MinHashLSHIndex(threshold=similarity_threshold)
+        # عند التعطيل تُعرض المهام المشابهة في النتيجة دون إعادة استخدامها
+        self.reuse_similar = reuse_similar
         
         self.is_running = False
-        self.task_queue = []
+        self.active_tasks: Dict[str, ProgrammingTask] = {}
+        self.running_stages: Dict[str, asyncio.Task] = {}
+        # مهام تنتظر اكتمال ما تعتمد عليه، وعدد اعتماداتها المتبقية، والمهام التابعة لكل مهمة
+        self.waiting_tasks: Dict[str, ProgrammingTask] = {}
+        self.pending_dependencies: Dict[str, int] = {}
+        self.dependents: Dict[str, List[str]] = {}
+        self.stage_latency = {name: deque(maxlen=self.LATENCY_SAMPLES) for name in self.STAGE_ORDER}
+        self.intake = FairTaskQueue(
+            maxsize=queue_size,
+            weights=client_weights,
+            max_pending_per_client=max_pending_per_client,
+            max_running_per_client=max_running_per_client
+        )
+        self.pipeline = self._build_pipeline(
+            {**self.DEFAULT_STAGE_CONCURRENCY, **(stage_concurrency or {})},
+            queue_size
+        )
+        self.improvement_trigger = ImprovementTrigger()
         self.learning_thread = None
-        self.improvement_thread = None
         
         logger.info("تم تهيئة المبرمج المستقل بنجاح")
     
@@ -602,77 +1494,643 @@ class AutonomousProgrammer:
         self.is_running = True
         logger.info("🚀 بدء تشغيل المبرمج المستقل")
         
-        # بدء خيوط التعلم والتحسين
+        # بدء خيط التعلم (التحسين يُشغل من المحفز في _process_tasks)
         self.learning_thread = threading.Thread(target=self._continuous_learning)
-        self.improvement_thread = threading.Thread(target=self._continuous_improvement)
-        
         self.learning_thread.start()
-        self.improvement_thread.start()
         
         # بدء معالجة المهام
         await self._process_tasks()
     
+    def _build_pipeline(self, concurrency: Dict[str, int], queue_size: int) -> TaskPipeline:
+        """بناء مراحل خط المعالجة"""
+        # طوابير ما بين المراحل أصغر من طابور الإدخال حتى يظهر الضغط العكسي مبكراً
+        inner_queue_size = max(1, queue_size // 5)
+        handlers = {
+            "learn": self._stage_learn,
+            "generate": self._stage_generate,
+            "test": self._stage_test,
+            "save": self._stage_save
+        }
+        stages = [
+            PipelineStage(
+                name,
+                functools.partial(self._run_stage, name, handlers[name]),
+                concurrency[name],
+                inner_queue_size,
+                # المرحلة الأولى تسحب من طابور الإدخال العادل بين العملاء
+                queue=self.intake if index == 0 else None
+            )
+            for index, name in enumerate(self.STAGE_ORDER)
+        ]
+        return TaskPipeline(stages, on_error=self._handle_task_error)
+    
     def stop(self):
         """إيقاف النظام"""
         self.is_running = False
+        self.improvement_engine.close()
         logger.info("⏹️ تم إيقاف المبرمج المستقل")
     
+    @staticmethod
+    def _new_task_id() -> str:
+        """توليد معرف فريد للمهمة"""
+        return f"task_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    
+    @staticmethod
+    def build_task(spec: Dict[str, Any]) -> ProgrammingTask:
+        """التحقق من وصف مهمة وبناؤها (يرفع ValueError عند عدم الصلاحية)"""
+        if not isinstance(spec, dict):
+            raise ValueError("يجب أن تكون المهمة كائن JSON")
+        
+        description = spec.get("description")
+        if not isinstance(description, str) or not description.strip():
+            raise ValueError("الوصف مطلوب")
+        
+        language = spec.get("language", "python")
+        complexity = spec.get("complexity", "medium")
+        if not isinstance(language, str) or not language.strip():
+            raise ValueError("لغة البرمجة غير صالحة")
+        if not isinstance(complexity, str):
+            raise ValueError("مستوى التعقيد غير صالح")
+        
+        requirements = spec.get("requirements", [])
+        if isinstance(requirements, str):
+            requirements = [req.strip() for req in requirements.split(",") if req.strip()]
+        elif not isinstance(requirements, list) or not all(isinstance(req, str) for req in requirements):
+            raise ValueError("المتطلبات يجب أن تكون قائمة نصوص")
+        
+        deadline = spec.get("deadline")
+        if deadline is not None:
+            try:
+                deadline = datetime.fromisoformat(deadline)
+            except (TypeError, ValueError):
+                raise ValueError("الموعد النهائي يجب أن يكون بصيغة ISO 8601")
+        
+        priority = spec.get("priority", 0)
+        if not isinstance(priority, int) or isinstance(priority, bool):
+            raise ValueError("الأولوية يجب أن تكون عدداً صحيحاً")
+        
+        client_id = spec.get("client_id", "default")
+        if not isinstance(client_id, str) or not client_id.strip():
+            raise ValueError("معرف العميل غير صالح")
+        
+        depends_on = spec.get("depends_on", [])
+        if not isinstance(depends_on, list) or not all(isinstance(dep, str) for dep in depends_on):
+            raise ValueError("الاعتمادات يجب أن تكون قائمة معرفات مهام")
+        
+        return ProgrammingTask(
+            task_id=AutonomousProgrammer._new_task_id(),
+            description=description.strip(),
+            language=language.strip(),
+            complexity=complexity,
+            requirements=requirements,
+            deadline=deadline,
+            priority=priority,
+            client_id=client_id.strip(),
+            depends_on=list(dict.fromkeys(depends_on))
+        )
+    
+    @classmethod
+    def build_batch(cls, specs: List[Any]) -> tuple:
+        """بناء دفعة مهام مع ربط الاعتمادات الداخلية
+        
+        يمكن لأي عنصر أن يحمل مفتاحاً "key" تشير إليه عناصر أخرى في
+        depends_on بدلاً من معرف المهمة. تُرجع (المهام، الأخطاء).
+        """
+        tasks, errors, keys = [], [], {}
+        for index, spec in enumerate(specs):
+            try:
+                task = cls.build_task(spec)
+                key = spec.get("key")
+                if key is not None:
+                    if not isinstance(key, str) or key in keys:
+                        raise ValueError("المفتاح يجب أن يكون نصاً فريداً في الدفعة")
+                    keys[key] = task.task_id
+                tasks.append(task)
+            except ValueError as e:
+                errors.append({"index": index, "error": str(e)})
+        if errors:
+            return [], errors
+        
+        for task in tasks:
+            task.depends_on = [keys.get(dep, dep) for dep in task.depends_on]
+        
+        # رفض الدورات داخل الدفعة (خوارزمية Kahn)
+        batch = {task.task_id: task for task in tasks}
+        indegree = {
+            task.task_id: sum(1 for dep in task.depends_on if dep in batch) for task in tasks
+        }
+        children: Dict[str, List[str]] = {}
+        for task in tasks:
+            for dep in task.depends_on:
+                if dep in batch:
+                    children.setdefault(dep, []).append(task.task_id)
+        ready = [task_id for task_id, degree in indegree.items() if degree == 0]
+        visited = 0
+        while ready:
+            task_id = ready.pop()
+            visited += 1
+            for child in children.get(task_id, []):
+                indegree[child] -= 1
+                if indegree[child] == 0:
+                    ready.append(child)
+        if visited != len(tasks):
+            return [], [{"index": None, "error": "الاعتمادات تحتوي على دورة"}]
+        
+        return tasks, []
+    
+    def _check_dependencies(self, task: ProgrammingTask, batch_ids: set = frozenset()):
+        """التأكد من أن جميع الاعتمادات مهام معروفة"""
+        for dep_id in task.depends_on:
+            if dep_id == task.task_id:
+                raise ValueError("لا يمكن للمهمة أن تعتمد على نفسها")
+            if dep_id not in batch_ids and dep_id not in self.active_tasks \
+                    and self.result_store.get(dep_id) is None:
+                raise ValueError(f"اعتماد على مهمة غير معروفة: {dep_id}")
+    
+    def _link_dependencies(self, task: ProgrammingTask) -> Optional[str]:
+        """ربط المهمة بالمهام التي تعتمد عليها
+        
+        المهام السابقة المنتهية تُنقل نتائجها مباشرة، والجارية يُسجل لها
+        تابع. تُرجع سبب الفشل إذا كانت إحدى المهام السابقة قد فشلت.
+        """
+        remaining = 0
+        for dep_id in task.depends_on:
+            if dep_id in self.active_tasks:
+                self.dependents.setdefault(dep_id, []).append(task.task_id)
+                remaining += 1
+                continue
+            
+            result = self.result_store.get(dep_id)
+            if result["status"] != "completed":
+                return f"فشلت المهمة السابقة {dep_id}"
+            task.upstream[dep_id] = {
+                "language": result["language"],
+                "generated_code": result["generated_code"],
+                "knowledge": []
+            }
+        
+        if remaining:
+            self.pending_dependencies[task.task_id] = remaining
+            self.waiting_tasks[task.task_id] = task
+            task.status = "waiting"
+        return None
+    
+    def _on_task_finished(self, task: ProgrammingTask):
+        """تمرير نتيجة المهمة المنتهية إلى المهام التابعة لها"""
+        for dependent_id in self.dependents.pop(task.task_id, []):
+            dependent = self.waiting_tasks.get(dependent_id)
+            if dependent is None:
+                # أُلغيت أو فشلت بسبب مهمة سابقة أخرى
+                continue
+            
+            if task.status != "completed":
+                self._release_waiting(dependent)
+                self.intake.unreserve(dependent.client_id)
+                asyncio.create_task(self._finalize_task(
+                    dependent, "failed", f"فشلت المهمة السابقة {task.task_id}"
+                ))
+                continue
+            
+            dependent.upstream[task.task_id] = {
+                "language": task.language,
+                "generated_code": task.generated_code,
+                "knowledge": task.knowledge
+            }
+            self.pending_dependencies[dependent_id] -= 1
+            if self.pending_dependencies[dependent_id] == 0:
+                self._release_waiting(dependent)
+                self._set_status(dependent, "pending")
+                # لا ننتظر هنا حتى لا تُحجب مرحلة الحفظ إذا امتلأ طابور الإدخال
+                asyncio.create_task(self.pipeline.submit(dependent))
+    
+    def _release_waiting(self, task: ProgrammingTask):
+        """إخراج مهمة من قائمة الانتظار"""
+        self.waiting_tasks.pop(task.task_id, None)
+        self.pending_dependencies.pop(task.task_id, None)
+    
+    def _retry_after(self, client_id: str) -> int:
+        """تقدير الوقت اللازم لتفريغ مهام العميل المنتظرة (بالثواني)"""
+        per_task = self.pipeline.estimated_time(self.STAGE_ORDER)
+        rounds = self.intake.pending(client_id) / max(1, self.intake.max_running_per_client)
+        return max(1, min(300, math.ceil(per_task * rounds)))
+    
     async def add_task(self, description: str, language: str = "python", 
-                      requirements: List[str] = None, complexity: str = "medium") -> str:
-        """إضافة مهمة برمجية جديدة"""
-        task_id = f"task_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+                      requirements: List[str] = None, complexity: str = "medium",
+                      deadline: Optional[datetime] = None, priority: int = 0,
+                      client_id: str = "default", depends_on: List[str] = None) -> str:
+        """إضافة مهمة برمجية جديدة
         
+        ترفع TenantQuotaExceeded عند تجاوز حد العميل وValueError عند
+        الاعتماد على مهمة غير معروفة.
+        """
         task = ProgrammingTask(
-            task_id=task_id,
+            task_id=self._new_task_id(),
             description=description,
             language=language,
             complexity=complexity,
-            requirements=requirements or []
+            requirements=requirements or [],
+            deadline=deadline,
+            priority=priority,
+            client_id=client_id,
+            depends_on=list(dict.fromkeys(depends_on or []))
         )
+        self._check_dependencies(task)
+        self.intake.reserve(client_id, retry_after=self._retry_after(client_id))
+        
+        self.active_tasks[task.task_id] = task
+        failure = self._link_dependencies(task)
+        self._publish_task_event(task)
+        logger.info(f"تم إضافة مهمة جديدة: {task.task_id}")
+        
+        if failure:
+            self.intake.unreserve(client_id)
+            await self._finalize_task(task, "failed", failure)
+        elif task.task_id not in self.waiting_tasks:
+            # ينتظر هنا إذا كان خط المعالجة ممتلئاً (ضغط عكسي)
+            await self.pipeline.submit(task)
+        
+        return task.task_id
+    
+    async def add_tasks(self, tasks: List[ProgrammingTask]) -> List[str]:
+        """إضافة دفعة مهام مُتحقق منها
+        
+        تُسجل الدفعة كاملة في معاملة واحدة ثم تُغذى لخط المعالجة في الخلفية
+        مع احترام الضغط العكسي.
+        """
+        batch_ids = {task.task_id for task in tasks}
+        for task in tasks:
+            self._check_dependencies(task, batch_ids)
+        
+        # التحقق من حدود جميع العملاء قبل حجز أي مكان
+        counts: Dict[str, int] = {}
+        for task in tasks:
+            counts[task.client_id] = counts.get(task.client_id, 0) + 1
+        for client_id, count in counts.items():
+            if self.intake.pending(client_id) + count > self.intake.max_pending_per_client:
+                raise TenantQuotaExceeded(client_id, self._retry_after(client_id))
+        for client_id, count in counts.items():
+            self.intake.reserve(client_id, count)
         
-        self.task_queue.append(task)
-        logger.info(f"تم إضافة مهمة جديدة: {task_id}")
+        await asyncio.to_thread(self.result_store.save_many, tasks)
         
-        return task_id
+        for task in tasks:
+            self.active_tasks[task.task_id] = task
+        
+        # تُربط الاعتمادات بعد تسجيل الدفعة كاملة حتى تُرى الاعتمادات الداخلية
+        ready, failed = [], []
+        for task in tasks:
+            failure = self._link_dependencies(task)
+            if failure:
+                failed.append((task, failure))
+            elif task.task_id not in self.waiting_tasks:
+                ready.append(task)
+            self._publish_task_event(task)
+        
+        for task, failure in failed:
+            self.intake.unreserve(task.client_id)
+            await self._finalize_task(task, "failed", failure)
+        
+        asyncio.create_task(self._feed_pipeline(ready))
+        logger.info(f"تم إضافة دفعة من {len(tasks)} مهمة")
+        
+        return [task.task_id for task in tasks]
+    
+    async def _feed_pipeline(self, tasks: List[ProgrammingTask]):
+        """تغذية خط المعالجة بمهام الدفعة"""
+        for task in tasks:
+            if task.status in TERMINAL_STATUSES:
+                # أُلغيت قبل دخولها الطابور
+                self.intake.unreserve(task.client_id)
+                continue
+            await self.pipeline.submit(task)
+    
+    async def watch_tasks(self, task_ids: List[str], subscription: EventSubscription):
+        """إرجاع نتائج المهام فور انتهائها
+        
+        يجب إنشاء الاشتراك قبل إضافة المهام حتى لا تفوت أي أحداث. إذا فُصل
+        الاشتراك لبطء المستهلك يُكمل الانتظار بالاستعلام من مخزن النتائج.
+        """
+        pending = set(task_ids)
+        try:
+            while pending and not subscription.closed:
+                try:
+                    _, event_type, data = await asyncio.wait_for(subscription.queue.get(), timeout=1)
+                except asyncio.TimeoutError:
+                    continue
+                if event_type != "task":
+                    continue
+                
+                event = json.loads(data)
+                if event["task_id"] in pending and event["status"] in TERMINAL_STATUSES:
+                    pending.discard(event["task_id"])
+                    yield await asyncio.to_thread(self.result_store.get, event["task_id"])
+            
+            while pending:
+                for task_id in list(pending):
+                    result = await asyncio.to_thread(self.result_store.get, task_id)
+                    if result and result["status"] in TERMINAL_STATUSES:
+                        pending.discard(task_id)
+                        yield result
+                if pending:
+                    await asyncio.sleep(1)
+        finally:
+            self.event_bus.unsubscribe(subscription)
     
     async def _process_tasks(self):
-        """معالجة المهام في القائمة"""
+        """تشغيل خط معالجة المهام حتى إيقاف النظام"""
+        self.pipeline.start()
+        status_publisher = asyncio.create_task(self._publish_status_updates())
+        improvement_watcher = asyncio.create_task(self._watch_improvement_triggers())
+        try:
+            while self.is_running:
+                await asyncio.sleep(1)
+        finally:
+            status_publisher.cancel()
+            improvement_watcher.cancel()
+            await self.pipeline.stop()
+    
+    def _publish_task_event(self, task: ProgrammingTask):
+        """نشر تغير حالة مهمة"""
+        self.event_bus.publish("task", {
+            **self._task_summary(task),
+            "tasks_in_queue": len(self.active_tasks)
+        })
+    
+    def _set_status(self, task: ProgrammingTask, status: str):
+        """تحديث حالة المهمة ونشرها"""
+        task.status = status
+        self._publish_task_event(task)
+    
+    async def _publish_status_updates(self):
+        """نشر ملخص الحالة دورياً عند تغيره (استعلام واحد لجميع المشتركين)"""
+        last_published = None
         while self.is_running:
-            if self.task_queue:
-                task = self.task_queue.pop(0)
-                await self._execute_task(task)
+            await asyncio.sleep(self.STATUS_PUBLISH_INTERVAL)
+            if not self.event_bus.subscribers:
+                continue
+            
+            status = await self.get_status()
+            fingerprint = json.dumps(
+                [status["performance"], status["tasks_in_queue"]], sort_keys=True, default=str
+            )
+            if fingerprint != last_published:
+                last_published = fingerprint
+                self.event_bus.publish("status", status)
+    
+    def _remaining_budget(self, task: ProgrammingTask) -> Optional[float]:
+        """الوقت المتبقي حتى الموعد النهائي (بالثواني)"""
+        if task.deadline is None:
+            return None
+        return (task.deadline - datetime.now(task.deadline.tzinfo)).total_seconds()
+    
+    async def _run_stage(self, name: str, handler, task: ProgrammingTask) -> bool:
+        """تنفيذ مرحلة مع مهلة مشتقة من الموعد النهائي وقابلية للإلغاء"""
+        if task.finalized:
+            # مهمة أُلغيت أو انتهت مهلتها أثناء انتظارها في الطابور
+            return False
+        if task.reused and name in self.REUSE_SKIPPED_STAGES:
+            # حالتها مكتملة بالفعل فتمر إلى مرحلة الحفظ
+            return True
+        if name != "save" and task.status in TERMINAL_STATUSES:
+            return False
+        
+        timeout = self.STAGE_TIMEOUTS[name]
+        deadline_bound = False
+        budget = self._remaining_budget(task)
+        if budget is not None and name != "save":
+            index = self.STAGE_ORDER.index(name)
+            # إسقاط مسبق للمهمة التي لا يمكن إنهاؤها قبل موعدها
+            if budget <= 0 or budget < self.pipeline.estimated_time(self.STAGE_ORDER[index:]):
+                await self._finalize_task(task, "expired", "لا يمكن إنجاز المهمة قبل موعدها النهائي")
+                return False
+            # يُحجز للمراحل اللاحقة زمنها المتوقع
+            stage_budget = budget - self.pipeline.estimated_time(self.STAGE_ORDER[index + 1:])
+            if stage_budget < timeout:
+                timeout, deadline_bound = stage_budget, True
+        
+        metrics = task.metrics
+        started = time.perf_counter()
+        metrics.queue_wait[name] = started - metrics.last_transition
+        
+        # المهمة الفرعية ترث سياق المقاييس فتُحتسب استدعاءات قاعدة البيانات وHTTP
+        token = current_task_metrics.set(metrics)
+        try:
+            job = asyncio.create_task(handler(task))
+        finally:
+            current_task_metrics.reset(token)
+        self.running_stages[task.task_id] = job
+        try:
+            done, _ = await asyncio.wait({job}, timeout=timeout)
+        except asyncio.CancelledError:
+            # إيقاف خط المعالجة نفسه
+            job.cancel()
+            raise
+        finally:
+            self.running_stages.pop(task.task_id, None)
+            metrics.last_transition = time.perf_counter()
+            metrics.stages[name] = metrics.last_transition - started
+            self.stage_latency[name].append(metrics.stages[name])
+        
+        if not done:
+            job.cancel()
+            await asyncio.gather(job, return_exceptions=True)
+            if name in self.OPTIONAL_STAGES:
+                logger.warning(f"انتهت مهلة المرحلة الاختيارية {name} للمهمة {task.task_id}")
+                return True
+            if deadline_bound:
+                await self._finalize_task(task, "expired", f"تجاوزت المرحلة {name} الموعد النهائي")
             else:
-                await asyncio.sleep(1)
+                await self._finalize_task(task, "error", f"انتهت مهلة المرحلة {name}")
+            return False
+        
+        if job.cancelled() or task.finalized:
+            # أُلغيت عبر cancel_task (ولو اكتملت المرحلة قبل وصول الإلغاء) فلا تنتقل لما بعدها
+            return False
+        
+        error = job.exception()
+        if error is not None:
+            raise error
+        # المعالج يُرجع False لإنهاء المهمة دون تمريرها للمراحل التالية
+        return job.result() is not False
+    
+    async def cancel_task(self, task_id: str) -> Optional[bool]:
+        """إلغاء مهمة منتظرة أو قيد التنفيذ
+        
+        تُرجع None إذا كانت المهمة غير معروفة، وFalse إذا كانت قد انتهت.
+        """
+        task = self.active_tasks.get(task_id)
+        if task is None:
+            return None if self.result_store.get(task_id) is None else False
+        if task.status in TERMINAL_STATUSES:
+            return False
+        # الحجز يسبق أي انتظار حتى لا تصل المرحلة الجارية إلى الحفظ أثناءه
+        if not self._mark_finished(task, "cancelled", "أُلغيت المهمة بطلب من المستخدم"):
+            return False
+        
+        # إلغاء المرحلة الجارية ينتشر إلى العملية الفرعية وطلبات HTTP
+        job = self.running_stages.get(task_id)
+        if job is not None:
+            job.cancel()
+        
+        if task.task_id in self.waiting_tasks:
+            # لم تدخل الطابور بعد لأنها تنتظر اعتماداتها
+            self._release_waiting(task)
+            self.intake.unreserve(task.client_id)
+        
+        # المهمة المنتظرة في طابور الإدخال تُزال منه، وفي الطوابير الداخلية تُتجاهل عند سحبها
+        await self.intake.discard(task)
+        await self._store_finished(task)
+        logger.info(f"تم إلغاء المهمة: {task_id}")
+        return True
     
-    async def _execute_task(self, task: ProgrammingTask):
-        """تنفيذ مهمة برمجية"""
+    async def _stage_learn(self, task: ProgrammingTask):
+        """مرحلة التعلم حول موضوع المهمة"""
         logger.info(f"بدء تنفيذ المهمة: {task.task_id}")
+        self._set_status(task, "learning")
         
-        try:
-            # التعلم حول الموضوع أولاً
-            await self.internet_learner.search_and_learn(task.description, max_results=5)
-            
-            # توليد الكود
-            generated_code = await self.code_generator.generate_code(task)
-            task.generated_code = generated_code
-            
-            # اختبار الكود
-            test_results = await self._test_generated_code(task)
-            task.test_results = test_results
-            
-            # تحديث حالة المهمة
-            task.status = "completed" if test_results.get("success", False) else "failed"
-            
-            logger.info(f"تم إنجاز المهمة: {task.task_id} - الحالة: {task.status}")
+        # المعرفة المكتسبة في المهام السابقة تُمرر دون إعادة البحث
+        upstream_knowledge = [
+            item for upstream in task.upstream.values() for item in upstream["knowledge"]
+        ]
+        if upstream_knowledge:
+            task.knowledge = upstream_knowledge
+            return
+        
+        if not task.upstream and await self._reuse_similar_task(task):
+            # خط المعالجة يتخطى التوليد والاختبار ويحفظها في مرحلة الحفظ
+            return
+        
+        sessions = await self.internet_learner.search_and_learn(task.description, max_results=5)
+        task.knowledge = [
+            {
+                "topic": session.topic,
+                "source": session.source,
+                "content": session.knowledge_gained,
+                "confidence": session.confidence_score
+            }
+            for session in sessions
+        ]
+    
+    async def _reuse_similar_task(self, task: ProgrammingTask) -> bool:
+        """البحث عن مهمة مكتملة مشابهة وإعادة استخدام كودها إذا كان مسموحاً
+        
+        حقول المهمة تُضبط معاً بعد آخر انتظار، فلا تترك مهلة مرحلة التعلم
+        مهمة معاد استخدامها جزئياً.
+        """
+        task.similar_tasks = self.similarity_index.query(
+            task.language, task_text(task.description, task.requirements)
+        )
+        if not self.reuse_similar:
+            return False
+        
+        for match in task.similar_tasks:
+            previous = await asyncio.to_thread(self.result_store.get, match["task_id"])
+            if previous is None or previous["status"] != "completed":
+                continue
             
-            # حفظ النتائج
+            task.generated_code = previous["generated_code"]
+            previous_results = previous["test_results"] or {}
+            task.test_results = {
+                **{key: value for key, value in previous_results.items()
+                   if key not in ("performance", "similar_tasks")},
+                "reused_from": match["task_id"],
+                "similarity": match["similarity"]
+            }
+            task.status = "completed"
+            task.reused = True
+            logger.info(f"إعادة استخدام كود المهمة {match['task_id']} للمهمة {task.task_id}")
+            return True
+        return False
+    
+    async def _stage_generate(self, task: ProgrammingTask):
+        """مرحلة توليد الكود"""
+        self._set_status(task, "generating")
+        task.generated_code = await self.code_generator.generate_code(task)
+    
+    async def _stage_test(self, task: ProgrammingTask):
+        """مرحلة اختبار الكود"""
+        self._set_status(task, "testing")
+        task.test_results = await self._test_generated_code(task, timeout=self.STAGE_TIMEOUTS["test"])
+        # الحالة النهائية تُنشر بعد الحفظ حتى تكون النتيجة متاحة عبر API
+        task.status = "completed" if task.test_results.get("success", False) else "failed"
+        if task.similar_tasks:
+            task.test_results["similar_tasks"] = task.similar_tasks
+        self.improvement_trigger.record_outcome(task.status == "completed")
+        await asyncio.to_thread(
+            self.code_generator.record_outcome,
+            self.code_generator.signature(task),
+            task.status == "completed"
+        )
+        logger.info(f"تم إنجاز المهمة: {task.task_id} - الحالة: {task.status}")
+    
+    async def _stage_save(self, task: ProgrammingTask):
+        """مرحلة حفظ النتائج"""
+        if not self._claim_finalization(task):
+            return False
+        try:
+            self._attach_metrics(task)
             await self._save_task_results(task)
-            
-        except Exception as e:
-            logger.error(f"خطأ في تنفيذ المهمة {task.task_id}: {e}")
-            task.status = "error"
+            if task.status == "completed" and not task.reused:
+                await asyncio.to_thread(
+                    self.similarity_index.add,
+                    task.task_id, task.language, task_text(task.description, task.requirements)
+                )
+        finally:
+            await self._release_finished(task)
     
-    async def _test_generated_code(self, task: ProgrammingTask) -> Dict[str, Any]:
+    async def _handle_task_error(self, task: ProgrammingTask, error: Exception):
+        """تسجيل المهمة الفاشلة بخطأ غير متوقع"""
+        await self._finalize_task(task, "error", str(error))
+    
+    @staticmethod
+    def _attach_metrics(task: ProgrammingTask):
+        """إرفاق مقاييس المراحل بنتائج المهمة قبل حفظها"""
+        if task.test_results is None:
+            task.test_results = {}
+        task.test_results["performance"] = {
+            **task.test_results.get("performance", {}),
+            **task.metrics.as_dict()
+        }
+    
+    @staticmethod
+    def _claim_finalization(task: ProgrammingTask) -> bool:
+        """حجز إنهاء المهمة قبل أي انتظار (الإلغاء والمهلة والحفظ قد تتسابق عليه)"""
+        if task.finalized:
+            return False
+        task.finalized = True
+        return True
+    
+    async def _release_finished(self, task: ProgrammingTask):
+        """تحرير المهمة المنتهية ونشر حالتها النهائية وتمريرها للمهام التابعة"""
+        self.active_tasks.pop(task.task_id, None)
+        await self.intake.release(task)
+        self._publish_task_event(task)
+        self._on_task_finished(task)
+    
+    def _mark_finished(self, task: ProgrammingTask, status: str, message: str) -> bool:
+        """حجز إنهاء المهمة خارج المسار الطبيعي وتعيين حالتها النهائية دون انتظار"""
+        if not self._claim_finalization(task):
+            return False
+        task.status = status
+        if status == "error":
+            self.improvement_trigger.record_outcome(False)
+        task.test_results = {"success": False, "errors": [message]}
+        return True
+    
+    async def _store_finished(self, task: ProgrammingTask):
+        """حفظ مهمة حُجز إنهاؤها بـ _mark_finished"""
+        self._attach_metrics(task)
+        try:
+            await self._save_task_results(task)
+        finally:
+            await self._release_finished(task)
+    
+    async def _finalize_task(self, task: ProgrammingTask, status: str, message: str):
+        """إنهاء مهمة خارج المسار الطبيعي وحفظها (مرة واحدة فقط)"""
+        if self._mark_finished(task, status, message):
+            await self._store_finished(task)
+    
+    async def _test_generated_code(self, task: ProgrammingTask, timeout: float = 30) -> Dict[str, Any]:
         """اختبار الكود المولد"""
         results = {
             "success": False,
@@ -685,7 +2143,8 @@ class AutonomousProgrammer:
             if task.language.lower() == "python":
                 # اختبار بناء الجملة
                 try:
-                    ast.parse(task.generated_code)
+                    # التحليل مشترك مع المحسن والماسح (يُحلل كل كود مرة واحدة)
+                    get_parsed_source(task.generated_code).tree
                     results["syntax_valid"] = True
                 except SyntaxError as e:
                     results["errors"].append(f"خطأ في بناء الجملة: {e}")
@@ -698,21 +2157,24 @@ class AutonomousProgrammer:
                     with open(temp_file, 'w', encoding='utf-8') as f:
                         f.write(task.generated_code)
                     
-                    # تشغيل الكود
-                    result = subprocess.run([sys.executable, temp_file], 
-                                          capture_output=True, text=True, timeout=30)
+                    # تشغيل الكود دون حجب حلقة الأحداث مع قياس موارده
+                    try:
+                        run = await run_process_async([sys.executable, temp_file], timeout=timeout)
+                    finally:
+                        # حذف الملف المؤقت
+                        os.remove(temp_file)
+                    
+                    results["performance"] = run["resources"]
+                    task.metrics.sandbox = run["resources"]
                     
-                    if result.returncode == 0:
+                    if run["timed_out"]:
+                        results["errors"].append("انتهت مهلة التنفيذ")
+                    elif run["returncode"] == 0:
                         results["success"] = True
-                        results["output"] = result.stdout
+                        results["output"] = run["stdout"]
                     else:
-                        results["errors"].append(result.stderr)
+                        results["errors"].append(run["stderr"])
                     
-                    # حذف الملف المؤقت
-                    os.remove(temp_file)
-                    
-                except subprocess.TimeoutExpired:
-                    results["errors"].append("انتهت مهلة التنفيذ")
                 except Exception as e:
                     results["errors"].append(f"خطأ في التنفيذ: {e}")
             
@@ -723,20 +2185,35 @@ class AutonomousProgrammer:
     
     async def _save_task_results(self, task: ProgrammingTask):
         """حفظ نتائج المهمة"""
-        # حفظ في ملف JSON
-        results_file = f"task_results_{task.task_id}.json"
-        task_data = {
+        await asyncio.to_thread(self.result_store.save, task)
+    
+    def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """البحث عن مهمة في القائمة ثم في مخزن النتائج"""
+        task = self.active_tasks.get(task_id)
+        if task is not None:
+            return self._task_summary(task)
+        
+        return self.result_store.get(task_id)
+    
+    @staticmethod
+    def _task_summary(task: ProgrammingTask) -> Dict[str, Any]:
+        """ملخص المهمة للعرض"""
+        return {
             "task_id": task.task_id,
             "description": task.description,
             "language": task.language,
             "status": task.status,
-            "generated_code": task.generated_code,
-            "test_results": task.test_results,
-            "timestamp": datetime.now().isoformat()
+            "depends_on": task.depends_on
         }
-        
-        with open(results_file, 'w', encoding='utf-8') as f:
-            json.dump(task_data, f, ensure_ascii=False, indent=2)
+    
+    def find_similar_tasks(self, description: str, language: str = "python",
+                           requirements: List[str] = None) -> List[Dict[str, Any]]:
+        """المهام المكتملة المشابهة لوصف معين (لعرضها قبل إضافة مهمة)"""
+        return self.similarity_index.query(language, task_text(description, requirements or []))
+    
+    def list_active_tasks(self) -> List[Dict[str, Any]]:
+        """قائمة المهام قيد المعالجة"""
+        return [self._task_summary(task) for task in self.active_tasks.values()]
     
     def _continuous_learning(self):
         """التعلم المستمر في الخلفية"""
@@ -770,40 +2247,60 @@ class AutonomousProgrammer:
                 logger.error(f"خطأ في التعلم المستمر: {e}")
                 time.sleep(60)
     
-    def _continuous_improvement(self):
-        """التحسين المستمر في الخلفية"""
+    async def _watch_improvement_triggers(self):
+        """تشغيل دورة التحسين عندما يطلبها المحفز"""
+        trigger = self.improvement_trigger
         while self.is_running:
             try:
-                # تحليل الأداء والتحسين كل ساعة
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                
-                # تحليل الأداء
-                performance = loop.run_until_complete(
-                    self.improvement_engine.analyze_performance()
-                )
+                await asyncio.sleep(self.IMPROVEMENT_CHECK_INTERVAL)
+                watermarks = await asyncio.to_thread(self.improvement_engine.watermarks)
+                reasons = trigger.poll(watermarks)
+                if not reasons:
+                    continue
                 
-                # تحديد مجالات التحسين
-                improvements = loop.run_until_complete(
-                    self.improvement_engine.identify_improvement_areas()
+                logger.info(f"بدء دورة تحسين بسبب: {', '.join(reasons)}")
+                # الدورة تعمل في خيط منفصل حتى لا تحجب خط المعالجة
+                await asyncio.to_thread(self._run_improvement_cycle)
+                trigger.mark_run(
+                    await asyncio.to_thread(self.improvement_engine.watermarks), reasons
                 )
-                
-                # تنفيذ التحسينات
-                if improvements:
-                    loop.run_until_complete(
-                        self.improvement_engine.implement_improvements(improvements)
-                    )
-                
-                loop.close()
-                
                 logger.info("تم تنفيذ دورة تحسين")
-                
-                # انتظار ساعة قبل التحسين التالي
-                time.sleep(3600)  # ساعة واحدة
-                
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
                 logger.error(f"خطأ في التحسين المستمر: {e}")
-                time.sleep(300)
+    
+    def _run_improvement_cycle(self):
+        """تحليل الأداء وتحديد مجالات التحسين وتنفيذها ثم تسجيل مقاييس الدورة"""
+        async def cycle():
+            started = time.perf_counter()
+            engine = self.improvement_engine
+            improvements = await engine.identify_improvement_areas()
+            if improvements:
+                await engine.implement_improvements(improvements)
+            
+            performance = await engine.analyze_performance()
+            engine.record_cycle_metrics({
+                **performance,
+                "improvement_areas": len(improvements),
+                "cycle_duration": time.perf_counter() - started
+            })
+        
+        asyncio.run(cycle())
+    
+    def stage_latency_percentiles(self) -> Dict[str, Dict[str, float]]:
+        """مئينات زمن كل مرحلة (p50/p95/p99) من آخر العينات"""
+        latency = {}
+        for name, samples in self.stage_latency.items():
+            ordered = sorted(samples)
+            latency[name] = {
+                "count": len(ordered),
+                **{
+                    label: percentile(ordered, fraction) if ordered else 0.0
+                    for label, fraction in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))
+                }
+            }
+        return latency
     
     async def get_status(self) -> Dict[str, Any]:
         """الحصول على حالة النظام"""
@@ -811,8 +2308,14 @@ class AutonomousProgrammer:
         
         status = {
             "is_running": self.is_running,
-            "tasks_in_queue": len(self.task_queue),
+            "tasks_in_queue": len(self.active_tasks),
             "performance": performance,
+            "pipeline": self.pipeline.metrics(),
+            "stage_latency": self.stage_latency_percentiles(),
+            "clients": self.intake.clients(),
+            "code_cache": self.code_generator.cache_stats(),
+            "similarity_index_size": len(self.similarity_index),
+            "improvement": self.improvement_trigger.status(),
             "uptime": "متاح قريباً",
             "last_learning": "متاح قريباً",
             "last_improvement": "متاح قريباً"
@@ -0,0 +1,135 @@
+"""
+إحصاءات القياس وخطوط الأساس
+Benchmark sample statistics, regression testing and persisted baselines
+
+العينات أزمنة بالنانوثانية من micro_benchmark.py. المقارنة بين تشغيلين
+باختبار Mann-Whitney U (لا يفترض توزيعاً طبيعياً للأزمنة، وهي عادة ملتوية
+بذيل طويل)، ولا يُعد التباطؤ تراجعاً إلا إذا كان دالاً إحصائياً وتجاوز حداً
+أدنى للحجم.
+"""
+
+import contextlib
+import json
+import math
+import sqlite3
+import statistics
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+BASELINE_PATH = "ai_benchmarks.db"
+SIGNIFICANCE_LEVEL = 0.01
+# أقل نسبة تباطؤ في الوسيط تُعد تراجعاً (الفروق الأصغر ضوضاء عملياً)
+MIN_REGRESSION = 0.05
+
+
+def percentile(sorted_samples: List[float], fraction: float) -> float:
+    """المئين بالاستيفاء الخطي بين أقرب رتبتين"""
+    if not sorted_samples:
+        raise ValueError("لا توجد عينات")
+    position = (len(sorted_samples) - 1) * fraction
+    lower = math.floor(position)
+    upper = min(lower + 1, len(sorted_samples) - 1)
+    return sorted_samples[lower] + (sorted_samples[upper] - sorted_samples[lower]) * (position - lower)
+
+
+def summarize(samples: List[int]) -> Dict[str, float]:
+    """ملخص العينات: الأدنى والوسيط و p95 والمتوسط والانحراف المعياري"""
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "min_ns": ordered[0],
+        "median_ns": statistics.median(ordered),
+        "p95_ns": percentile(ordered, 0.95),
+        "mean_ns": statistics.fmean(ordered),
+        "stdev_ns": statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+    }
+
+
+def mann_whitney_greater(current: List[float], baseline: List[float]) -> float:
+    """قيمة p لفرضية أن أزمنة current أكبر من baseline (تقريب طبيعي مع تصحيح التعادل)"""
+    n1, n2 = len(current), len(baseline)
+    if not n1 or not n2:
+        return 1.0
+    combined = sorted([(value, 0) for value in current] + [(value, 1) for value in baseline])
+
+    # الرتب مع متوسط رتب القيم المتعادلة
+    rank_sum = 0.0
+    tie_term = 0
+    index = 0
+    while index < len(combined):
+        end = index
+        while end + 1 < len(combined) and combined[end + 1][0] == combined[index][0]:
+            end += 1
+        average_rank = (index + end) / 2 + 1
+        group = end - index + 1
+        tie_term += group ** 3 - group
+        rank_sum += average_rank * sum(1 for _, source in combined[index:end + 1] if source == 0)
+        index = end + 1
+
+    n = n1 + n2
+    u = rank_sum - n1 * (n1 + 1) / 2
+    mean = n1 * n2 / 2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (u - mean - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def compare_runs(current: List[int], baseline: List[int], alpha: float = SIGNIFICANCE_LEVEL,
+                 min_regression: float = MIN_REGRESSION) -> Dict[str, Any]:
+    """مقارنة تشغيل بخط الأساس"""
+    current_median = statistics.median(current)
+    baseline_median = statistics.median(baseline)
+    change = current_median / baseline_median - 1 if baseline_median else 0.0
+    p_value = mann_whitney_greater(current, baseline)
+    return {
+        "baseline_median_ns": baseline_median,
+        "median_change": change,
+        "p_value": p_value,
+        "regression": p_value < alpha and change > min_regression,
+    }
+
+
+class BaselineStore:
+    """آخر خط أساس مقبول لكل مفتاح (بصمة الكود أو اسم يحدده المستخدم)"""
+
+    def __init__(self, db_path: str = BASELINE_PATH):
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS benchmark_baselines (
+                    key TEXT PRIMARY KEY,
+                    code_hash TEXT NOT NULL,
+                    samples TEXT NOT NULL,
+                    summary TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """اتصال يُثبت عند النجاح ويُغلق دائماً (with conn وحده لا يغلقه)"""
+        with contextlib.closing(sqlite3.connect(self.db_path, timeout=30)) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT code_hash, samples, summary, updated_at FROM benchmark_baselines WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"code_hash": row[0], "samples": json.loads(row[1]), "summary": json.loads(row[2]), "updated_at": row[3]}
+
+    def put(self, key: str, code_hash: str, samples: List[int], summary: Dict[str, float]):
+        with self._connect() as conn:
+            conn.execute(
+                """INSERT INTO benchmark_baselines (key, code_hash, samples, summary, updated_at)
+                   VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT(key) DO UPDATE SET code_hash = excluded.code_hash, samples = excluded.samples,
+                       summary = excluded.summary, updated_at = excluded.updated_at""",
+                (key, code_hash, json.dumps(samples), json.dumps(summary), time.time())
+            )
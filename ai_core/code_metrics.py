@@ -0,0 +1,309 @@
+"""
+حساب مقاييس الكود في مرور واحد
+Single-pass code metrics (Python tokenize and a small JavaScript lexer)
+
+المصدر يُقرأ سطراً بسطر، فيمكن تمرير ملف مفتوح دون تحميله كاملاً في الذاكرة.
+الكلمات المفتاحية والأقواس داخل النصوص والتعليقات لا تُحتسب.
+"""
+
+import io
+import keyword
+import tokenize
+from typing import Dict, Iterable, Iterator, Union, TextIO
+
+from parsed_source import get_parsed_source
+
+# نقاط القرار التي تزيد التعقيد الدوري (McCabe)
+PYTHON_DECISIONS = {"if", "elif", "for", "while", "except", "and", "or", "assert"}
+JS_DECISIONS = {"if", "for", "while", "case", "catch"}
+JS_DECISION_OPERATORS = ("&&", "||", "??")
+# كلمات يليها تعبير جديد، فتبدأ / بعدها تعبيراً نمطياً لا قسمة
+JS_REGEX_KEYWORDS = {
+    "return", "typeof", "instanceof", "in", "of", "new", "delete", "void",
+    "throw", "case", "do", "else", "yield", "await",
+}
+# رموز تنهي قيمة، فتكون / بعدها قسمة
+JS_OPERAND_END = ")]}"
+
+OPENING_BRACKETS = "([{"
+
+Source = Union[str, TextIO, Iterable[str]]
+
+
+class _LineCounter:
+    """تمرير الأسطر مع حساب مقاييسها أثناء القراءة"""
+
+    def __init__(self, source: Source):
+        if isinstance(source, str):
+            source = io.StringIO(source)
+        self._lines: Iterator[str] = iter(source)
+        self.metrics = {
+            "lines": 0,
+            "non_empty_lines": 0,
+            "total_line_length": 0,
+            "characters": 0,
+        }
+
+    def readline(self) -> str:
+        line = next(self._lines, "")
+        if line:
+            self._count(line)
+        return line
+
+    def __iter__(self):
+        while True:
+            line = self.readline()
+            if not line:
+                return
+            yield line
+
+    def drain(self):
+        """قراءة ما تبقى من الأسطر (بعد خطأ في التحليل)"""
+        for _ in self:
+            pass
+
+    def _count(self, line: str):
+        metrics = self.metrics
+        metrics["lines"] += 1
+        metrics["characters"] += len(line)
+        stripped = line.rstrip("\r\n")
+        if stripped.strip():
+            metrics["non_empty_lines"] += 1
+            metrics["total_line_length"] += len(stripped)
+
+
+def _empty_metrics(counter: _LineCounter) -> Dict[str, int]:
+    return {
+        **counter.metrics,
+        "comment_lines": 0,
+        "brackets": 0,
+        "functions": 0,
+        "classes": 0,
+        "cyclomatic_complexity": 1,
+    }
+
+
+def _safe_tokens(readline) -> Iterator[tokenize.TokenInfo]:
+    """رموز Python حتى أول خطأ (كود غير مكتمل)"""
+    try:
+        yield from tokenize.generate_tokens(readline)
+    except (tokenize.TokenError, SyntaxError):
+        return
+
+
+def python_metrics(source: Source) -> Dict[str, int]:
+    """مقاييس كود Python من مرور tokenize واحد
+
+    النص الكامل يُؤخذ ترميزه من الذاكرة المشتركة (parsed_source)، أما الملفات
+    فتُقرأ سطراً بسطر.
+    """
+    counter = _LineCounter(source)
+    metrics = _empty_metrics(counter)
+    if isinstance(source, str):
+        tokens = get_parsed_source(source).tokens
+    else:
+        tokens = _safe_tokens(counter.readline)
+
+    last_code_row = 0
+    for token in tokens:
+        kind, text, (row, _) = token.type, token.string, token.start
+        if kind == tokenize.COMMENT:
+            if row != last_code_row:
+                metrics["comment_lines"] += 1
+            continue
+        if kind in (tokenize.NL, tokenize.NEWLINE, tokenize.INDENT, tokenize.DEDENT, tokenize.ENDMARKER):
+            continue
+        last_code_row = token.end[0]
+        if kind == tokenize.OP:
+            if text in OPENING_BRACKETS:
+                metrics["brackets"] += 1
+        elif kind == tokenize.NAME and keyword.iskeyword(text):
+            if text == "def":
+                metrics["functions"] += 1
+            elif text == "class":
+                metrics["classes"] += 1
+            elif text in PYTHON_DECISIONS:
+                metrics["cyclomatic_complexity"] += 1
+    # الأسطر التي لم تُقرأ بعد (نص كامل، أو خطأ في الترميز)
+    counter.drain()
+    metrics.update(counter.metrics)
+    return metrics
+
+
+def javascript_metrics(source: Source) -> Dict[str, int]:
+    """مقاييس كود JavaScript من محلل بسيط بالحالة (نصوص، قوالب، تعليقات، تعابير نمطية)"""
+    counter = _LineCounter(source)
+    metrics = _empty_metrics(counter)
+    # أنواع الحالة: None (كود)، "block" تعليق متعدد الأسطر، حرف الاقتباس، أو "/" تعبير نمطي
+    state = None
+    # عمق الأقواس داخل ${...} لكل قالب مفتوح
+    template_depths = []
+    # / تبدأ تعبيراً نمطياً إلا بعد قيمة (اسم، رقم، نص، أو قوس إغلاق) فتكون قسمة
+    regex_allowed = True
+    regex_class = False
+
+    for line in counter:
+        has_code = has_comment = False
+        index, length = 0, len(line)
+        word_start = None
+        while index < length:
+            char = line[index]
+            if state == "block":
+                has_comment = True
+                end = line.find("*/", index)
+                if end == -1:
+                    break
+                state, index = None, end + 2
+                continue
+            if state in ("'", '"'):
+                if char == "\\":
+                    index += 2
+                    continue
+                if char == state or char == "\n":
+                    state = None
+                index += 1
+                continue
+            if state == "/":
+                if char == "\\":
+                    index += 2
+                    continue
+                if char == "[":
+                    regex_class = True
+                elif char == "]":
+                    regex_class = False
+                elif (char == "/" and not regex_class) or char == "\n":
+                    state = None
+                index += 1
+                continue
+            if state == "`":
+                if char == "\\":
+                    index += 2
+                    continue
+                if char == "`":
+                    state = None
+                elif line.startswith("${", index):
+                    state, regex_allowed = None, True
+                    template_depths.append(0)
+                    index += 2
+                    continue
+                index += 1
+                continue
+
+            # حالة الكود
+            if char.isalnum() or char in "_$":
+                if word_start is None:
+                    word_start = index
+                index += 1
+                continue
+            if word_start is not None:
+                word = line[word_start:index]
+                _count_js_word(word, metrics)
+                regex_allowed = word in JS_REGEX_KEYWORDS
+                word_start = None
+
+            if char.isspace():
+                index += 1
+                continue
+            if line.startswith("//", index):
+                has_comment = True
+                break
+            if line.startswith("/*", index):
+                has_comment, state = True, "block"
+                index += 2
+                continue
+
+            has_code = True
+            # الرمز التالي يبدأ تعبيراً جديداً ما لم يكن هذا نهاية قيمة
+            allow_regex_after = char not in JS_OPERAND_END
+            if char in "'\"`":
+                state = char
+                allow_regex_after = False
+            elif char == "/" and regex_allowed:
+                state, regex_class = "/", False
+                allow_regex_after = False
+            elif char in OPENING_BRACKETS:
+                metrics["brackets"] += 1
+                if char == "{" and template_depths:
+                    template_depths[-1] += 1
+            elif char == "}" and template_depths:
+                if template_depths[-1] == 0:
+                    template_depths.pop()
+                    state = "`"
+                else:
+                    template_depths[-1] -= 1
+            elif line.startswith(JS_DECISION_OPERATORS, index):
+                metrics["cyclomatic_complexity"] += 1
+                regex_allowed = True
+                index += 2
+                continue
+            elif line.startswith("=>", index):
+                metrics["functions"] += 1
+                regex_allowed = True
+                index += 2
+                continue
+            elif char == "?" and not line.startswith("?.", index):
+                # عامل الشرط الثلاثي
+                metrics["cyclomatic_complexity"] += 1
+            regex_allowed = allow_regex_after
+            index += 1
+
+        if word_start is not None:
+            word = line[word_start:index]
+            _count_js_word(word, metrics)
+            regex_allowed = word in JS_REGEX_KEYWORDS
+        if has_comment and not has_code:
+            metrics["comment_lines"] += 1
+
+    metrics.update(counter.metrics)
+    return metrics
+
+
+def _count_js_word(word: str, metrics: Dict[str, int]):
+    if word == "function":
+        metrics["functions"] += 1
+    elif word == "class":
+        metrics["classes"] += 1
+    elif word in JS_DECISIONS:
+        metrics["cyclomatic_complexity"] += 1
+
+
+def compute_code_metrics(source: Source, language: str) -> Dict[str, int]:
+    """مقاييس الكود للغة المطلوبة (اللغات الأخرى تُحلل بمحلل JavaScript لتشابه صيغتها)"""
+    if language.lower() == "python":
+        return python_metrics(source)
+    return javascript_metrics(source)
+
+
+def readability_score(metrics: Dict[str, int]) -> float:
+    """قابلية القراءة من طول الأسطر وكثافة الأقواس ونسبة التعليقات"""
+    non_empty_lines = metrics["non_empty_lines"]
+
+    # طول الأسطر
+    avg_line_length = metrics["total_line_length"] / non_empty_lines if non_empty_lines else 0
+    line_length_score = max(0, 1 - (avg_line_length - 80) / 80) if avg_line_length > 80 else 1
+
+    # التعقيد (عدد الأقواس خارج النصوص والتعليقات)
+    complexity_score = max(0, 1 - metrics["brackets"] / (metrics["characters"] / 10)) if metrics["characters"] else 1
+
+    # التعليقات
+    comment_score = min(1, metrics["comment_lines"] / (non_empty_lines / 5)) if non_empty_lines else 0
+
+    return (line_length_score + complexity_score + comment_score) / 3
+
+
+def maintainability_score(metrics: Dict[str, int]) -> float:
+    """قابلية الصيانة من طول الدوال والتنظيم والتعقيد الدوري"""
+    function_count = metrics["functions"]
+
+    # طول الدوال (تقدير)
+    avg_function_length = metrics["lines"] / max(1, function_count)
+    function_length_score = max(0, 1 - (avg_function_length - 20) / 20) if avg_function_length > 20 else 1
+
+    # التنظيم (وجود دوال وكلاسات)
+    organization_score = min(1, (function_count + metrics["classes"]) / 5)
+
+    # التعقيد الدوري لكل دالة (حتى 10 مقبول)
+    avg_complexity = metrics["cyclomatic_complexity"] / max(1, function_count)
+    complexity_score = max(0, 1 - (avg_complexity - 10) / 10) if avg_complexity > 10 else 1
+
+    return (function_length_score + organization_score + complexity_score) / 3
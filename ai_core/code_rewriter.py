@@ -0,0 +1,512 @@
+"""
+محرك إعادة كتابة أكواد Python المبني على شجرة AST
+AST-based rewrite engine for Python code
+
+التحويلات تُطبق على النص الأصلي بالمواضع التي تحددها الشجرة، فتبقى
+التعليقات والتنسيق خارج المقاطع المعدلة كما هي. كل تحويل محافظ: يُتخطى
+إذا احتمل تغيير سلوك الكود.
+"""
+
+import ast
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from parsed_source import ParsedSource, get_parsed_source
+
+# دوال تستهلك المكرر بالكامل فيمكن تمرير generator لها بدلاً من قائمة
+CONSUMING_BUILTINS = {"sum", "min", "max", "sorted", "tuple", "frozenset"}
+# دوال قد تتوقف مبكراً فلا يُسمح إلا بتعابير بلا استدعاءات
+SHORT_CIRCUIT_BUILTINS = {"any", "all"}
+# دوال بلا آثار جانبية يُسمح بنقلها خارج الحلقة
+PURE_BUILTINS = {"len", "abs", "min", "max", "round", "int", "float", "str", "bool"}
+# عوامل قد ترفع استثناء بحسب القيم، فلا تُنقل خارج الحلقة
+RAISING_OPERATORS = (ast.Div, ast.FloorDiv, ast.Mod, ast.Pow)
+# دوال لا تعدل وسائطها، فيبقى ما يقرؤه التعبير المنقول كما هو
+NON_MUTATING_BUILTINS = PURE_BUILTINS | {"print", "repr", "isinstance", "range"}
+# استدعاءات تنشئ حاوية جديدة لا يشير إليها اسم آخر
+FRESH_CONSTRUCTORS = {"list", "dict", "set"}
+
+MAX_PASSES = 3
+
+
+@dataclass
+class Rewrite:
+    """تعديل واحد: مقاطع (بداية، نهاية، نص) بالبايت في المصدر"""
+    name: str
+    line: int
+    edits: List[Tuple[int, int, str]] = field(default_factory=list)
+
+    @property
+    def span(self) -> Tuple[int, int]:
+        return min(edit[0] for edit in self.edits), max(edit[1] for edit in self.edits)
+
+
+def _names(node: ast.AST) -> List[ast.Name]:
+    return [child for child in ast.walk(node) if isinstance(child, ast.Name)]
+
+
+def _name_ids(node: ast.AST) -> Set[str]:
+    return {name.id for name in _names(node)}
+
+
+def _has(node: ast.AST, types) -> bool:
+    return any(isinstance(child, types) for child in ast.walk(node))
+
+
+def _scope_names(scope: ast.AST) -> List[ast.Name]:
+    """الأسماء المرئية في النطاق، ومنها ما تقرؤه الدوال المتداخلة منه"""
+    result = []
+    stack = list(ast.iter_child_nodes(scope))
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+            # الأسماء المحلية للدالة المتداخلة لا تخص هذا النطاق
+            local = {arg.arg for arg in ast.walk(node.args) if isinstance(arg, ast.arg)}
+            local |= {name.id for name in _names(node) if not isinstance(name.ctx, ast.Load)}
+            result.extend(name for name in _names(node) if name.id not in local)
+            continue
+        if isinstance(node, (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)):
+            # متغيرات الـ comprehension محلية لها أيضاً
+            local = {name for generator in node.generators for name in _name_ids(generator.target)}
+            result.extend(name for name in _names(node) if name.id not in local)
+            continue
+        if isinstance(node, ast.Name):
+            result.append(node)
+        stack.extend(ast.iter_child_nodes(node))
+    return result
+
+
+def _declared_names(scope: ast.AST) -> Set[str]:
+    """الأسماء المعلنة global أو nonlocal في النطاق أو في دوال متداخلة فيه"""
+    return {name for node in ast.walk(scope) if isinstance(node, (ast.Global, ast.Nonlocal)) for name in node.names}
+
+
+def _other_bindings(scope: ast.AST) -> Set[str]:
+    """أسماء تُربط بغير الإسناد (معاملات، import، def، class، except ... as)"""
+    names = set()
+    for node in ast.walk(scope):
+        if isinstance(node, ast.arg):
+            names.add(node.arg)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            names.update((alias.asname or alias.name).split(".")[0] for alias in node.names)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, ast.ExceptHandler) and node.name:
+            names.add(node.name)
+        elif isinstance(node, (ast.MatchAs, ast.MatchStar)) and node.name:
+            names.add(node.name)
+    return names
+
+
+def _is_fresh_value(value: ast.expr) -> bool:
+    if isinstance(value, (ast.List, ast.Dict, ast.Set, ast.Tuple, ast.Constant,
+                          ast.ListComp, ast.SetComp, ast.DictComp)):
+        return True
+    return (isinstance(value, ast.Call) and isinstance(value.func, ast.Name)
+            and value.func.id in FRESH_CONSTRUCTORS and not value.keywords)
+
+
+def _fresh_containers(scope: ast.AST, scope_names: List[ast.Name]) -> Set[str]:
+    """أسماء تُسند دائماً إلى قيم جديدة ولا تُمرر قيمتها إلى أي كود آخر
+
+    تعديل حاوية كهذه (append أو إسناد عنصر) لا يمكن أن يغير كائناً يقرؤه
+    تعبير آخر عبر اسم مستعار.
+    """
+    parents = {id(child): node for node in ast.walk(scope) for child in ast.iter_child_nodes(node)}
+    body = getattr(scope, "body", [])
+
+    def fresh_use(node: ast.Name) -> bool:
+        parent = parents.get(id(node))
+        if isinstance(node.ctx, ast.Store):
+            if isinstance(parent, ast.Assign):
+                return len(parent.targets) == 1 and parent.targets[0] is node and _is_fresh_value(parent.value)
+            return isinstance(parent, ast.AugAssign)
+        if isinstance(node.ctx, ast.Del):
+            return False
+        if isinstance(parent, ast.Attribute) and parent.value is node:
+            # استدعاء دالة من دوال الحاوية، لا الاحتفاظ بها
+            call = parents.get(id(parent))
+            return isinstance(call, ast.Call) and call.func is parent
+        if isinstance(parent, ast.Subscript) and parent.value is node:
+            return True
+        if isinstance(parent, (ast.For, ast.comprehension)) and parent.iter is node:
+            return True
+        if isinstance(parent, ast.Call) and isinstance(parent.func, ast.Name) and parent.func.id == "len":
+            return True
+        # الإرجاع في آخر الدالة لا يترك كوداً يعمل بعده في هذا النطاق
+        while isinstance(parent, ast.Tuple):
+            parent = parents.get(id(parent))
+        return isinstance(parent, ast.Return) and any(parent is statement for statement in body)
+
+    excluded = _declared_names(scope) | _other_bindings(scope)
+    uses: Dict[str, List[ast.Name]] = {}
+    for node in scope_names:
+        uses.setdefault(node.id, []).append(node)
+    return {
+        name for name, nodes in uses.items()
+        if name not in excluded and all(fresh_use(node) for node in nodes)
+    }
+
+
+def _mutates_only(statements: List[ast.stmt], fresh: Set[str]) -> bool:
+    """الجمل لا تعدل إلا حاويات جديدة ولا تستدعي كوداً قد يعدل غيرها
+
+    العوامل وبروتوكول التكرار تُفترض بلا آثار جانبية كما في _is_pure.
+    """
+    for statement in statements:
+        for node in ast.walk(statement):
+            if isinstance(node, (ast.Yield, ast.YieldFrom, ast.Await, ast.FunctionDef, ast.AsyncFunctionDef,
+                                 ast.Lambda, ast.ClassDef, ast.Global, ast.Nonlocal, ast.With,
+                                 ast.AsyncWith, ast.Delete, ast.Import, ast.ImportFrom)):
+                return False
+            if isinstance(node, ast.Call):
+                function = node.func
+                if isinstance(function, ast.Name):
+                    if function.id not in NON_MUTATING_BUILTINS or any(
+                            not isinstance(keyword.value, ast.Constant) for keyword in node.keywords):
+                        return False
+                elif not (isinstance(function, ast.Attribute) and isinstance(function.value, ast.Name)
+                          and function.value.id in fresh):
+                    return False
+            elif isinstance(node, (ast.Subscript, ast.Attribute)) and not isinstance(node.ctx, ast.Load):
+                if not (isinstance(node, ast.Subscript) and isinstance(node.value, ast.Name)
+                        and node.value.id in fresh):
+                    return False
+            elif isinstance(node, ast.AugAssign) and isinstance(node.target, ast.Name) \
+                    and node.target.id not in fresh:
+                # += على قائمة يعدلها في مكانها، وقد يشير إليها اسم آخر
+                return False
+    return True
+
+
+class _Source:
+    """المصدر بالبايت مع جدول بدايات الأسطر (مواضع AST بالبايت وفق UTF-8)"""
+
+    def __init__(self, parsed: ParsedSource):
+        self.data = parsed.code.encode("utf-8")
+        self.line_starts = parsed.byte_line_offsets
+        self.comment_lines = parsed.comment_lines
+
+    def offset(self, line: int, col: int) -> int:
+        return self.line_starts[line - 1] + col
+
+    def start(self, node: ast.AST) -> int:
+        return self.offset(node.lineno, node.col_offset)
+
+    def end(self, node: ast.AST) -> int:
+        return self.offset(node.end_lineno, node.end_col_offset)
+
+    def segment(self, node: ast.AST) -> str:
+        return self.data[self.start(node):self.end(node)].decode("utf-8")
+
+    def has_comments(self, first: ast.AST, last: ast.AST) -> bool:
+        return any(line in self.comment_lines for line in range(first.lineno, last.end_lineno + 1))
+
+    def line_start(self, node: ast.AST) -> Optional[int]:
+        """بداية سطر العقدة إذا لم يسبقها على السطر سوى مسافات"""
+        line_start = self.line_starts[node.lineno - 1]
+        if self.data[line_start:self.start(node)].strip():
+            return None
+        return line_start
+
+    def line_bounds(self, node: ast.AST) -> Optional[Tuple[int, int]]:
+        """بداية سطر العقدة ونهاية سطرها الأخير إذا كانت تشغل أسطرها وحدها"""
+        line_start = self.line_start(node)
+        if line_start is None:
+            return None
+        end = self.end(node)
+        line_end = self.data.find(b"\n", end)
+        line_end = len(self.data) if line_end == -1 else line_end + 1
+        if self.data[end:line_end].strip():
+            return None
+        return line_start, line_end
+
+
+class _Rewriter:
+    """جمع التحويلات الممكنة في مرور واحد على الشجرة"""
+
+    def __init__(self, code: str):
+        parsed = get_parsed_source(code)
+        self.tree = parsed.tree
+        self.source = _Source(parsed)
+        self.rewrites: List[Rewrite] = []
+
+    def collect(self) -> List[Rewrite]:
+        self._visit_scope(self.tree, is_class=False)
+        for node in ast.walk(self.tree):
+            if isinstance(node, ast.Call):
+                self._generator_argument(node)
+        return self.rewrites
+
+    def _visit_scope(self, scope: ast.AST, is_class: bool):
+        """زيارة كتل نطاق واحد (وحدة أو دالة أو كلاس) ثم النطاقات المتداخلة"""
+        scope_names = _scope_names(scope)
+        declared = _declared_names(scope)
+        shadowed = {node.id for node in scope_names if not isinstance(node.ctx, ast.Load)}
+        shadowed |= declared | _other_bindings(scope)
+        fresh = _fresh_containers(scope, scope_names)
+        blocks = list(self._blocks(scope))
+        scope_loops = [statement for block in blocks for statement in block if isinstance(statement, ast.For)]
+        for block in blocks:
+            for index, statement in enumerate(block):
+                if isinstance(statement, ast.For):
+                    if index > 0 and not is_class:
+                        self._loop_to_comprehension(block[index - 1], statement, scope_names, scope_loops,
+                                                    declared)
+                    self._hoist_invariants(statement, fresh, shadowed)
+                elif isinstance(statement, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                    self._visit_scope(statement, is_class=isinstance(statement, ast.ClassDef))
+
+    @staticmethod
+    def _blocks(scope: ast.AST):
+        """قوائم الجمل في النطاق دون الدخول في النطاقات المتداخلة"""
+        stack = [scope]
+        while stack:
+            node = stack.pop()
+            for name in ("body", "orelse", "finalbody"):
+                block = getattr(node, name, None)
+                if isinstance(block, list) and block and isinstance(block[0], ast.stmt):
+                    yield block
+                    stack.extend(
+                        child for child in block
+                        if not isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+                    )
+            for handler in getattr(node, "handlers", []):
+                stack.append(handler)
+            for case in getattr(node, "cases", []):
+                stack.append(case)
+
+    def _loop_to_comprehension(self, init: ast.stmt, loop: ast.For, scope_names: List[ast.Name],
+                               scope_loops: List[ast.For], declared: Set[str]):
+        """x = [] ثم for ...: x.append(e) ← x = [e for ...] (ومثلها للقواميس والمجموعات والنصوص)"""
+        if not (isinstance(init, ast.Assign) and len(init.targets) == 1
+                and isinstance(init.targets[0], ast.Name)):
+            return
+        if loop.orelse or len(loop.body) != 1:
+            return
+        name = init.targets[0].id
+
+        statement, conditions = loop.body[0], []
+        if isinstance(statement, ast.If) and not statement.orelse and len(statement.body) == 1:
+            conditions, statement = [statement.test], statement.body[0]
+
+        generators = [ast.comprehension(target=loop.target, iter=loop.iter, ifs=conditions, is_async=0)]
+        value, kind = init.value, None
+        if isinstance(value, ast.List) and not value.elts and self._is_method_call(statement, name, "append"):
+            element = statement.value.args[0]
+            new_value, kind = ast.ListComp(elt=element, generators=generators), "list_comprehension"
+        elif isinstance(value, ast.Call) and isinstance(value.func, ast.Name) and value.func.id == "set" \
+                and not value.args and not value.keywords and self._is_method_call(statement, name, "add"):
+            element = statement.value.args[0]
+            new_value, kind = ast.SetComp(elt=element, generators=generators), "set_comprehension"
+        elif isinstance(value, ast.Dict) and not value.keys and isinstance(statement, ast.Assign) \
+                and len(statement.targets) == 1 and isinstance(statement.targets[0], ast.Subscript) \
+                and isinstance(statement.targets[0].value, ast.Name) and statement.targets[0].value.id == name:
+            element = ast.Tuple(elts=[statement.targets[0].slice, statement.value], ctx=ast.Load())
+            new_value, kind = ast.DictComp(
+                key=statement.targets[0].slice, value=statement.value, generators=generators
+            ), "dict_comprehension"
+        elif isinstance(value, ast.Constant) and value.value == "" and isinstance(statement, ast.AugAssign) \
+                and isinstance(statement.op, ast.Add) and isinstance(statement.target, ast.Name) \
+                and statement.target.id == name:
+            element = statement.value
+            new_value = ast.GeneratorExp(elt=element, generators=generators)
+            kind = "string_join"
+        if kind is None:
+            return
+
+        # المتغير نفسه لا يُقرأ داخل الحلقة، ولا توجد تعابير تغير النطاق أو التدفق
+        parts = [element, loop.iter, loop.target, *conditions]
+        if any(name in _name_ids(part) for part in parts):
+            return
+        if any(_has(part, (ast.NamedExpr, ast.Yield, ast.YieldFrom, ast.Await, ast.Lambda)) for part in parts):
+            return
+        # متغير الحلقة لا يبقى بعد الـ comprehension، فيجب ألا يُستخدم خارجها
+        # ولا أن يكون متغيراً عاماً يقرؤه كود آخر
+        target_ids = _name_ids(loop.target)
+        if (target_ids | {name}) & declared:
+            return
+        # الإشارات في هدف وجسم حلقة أخرى تعيد ربط الاسم نفسه لا تقرأ قيمته القديمة
+        # (بخلاف iter و else اللذين يُقيّمان قبل إعادة الربط أو دونها)
+        allowed = {id(node) for node in _names(loop)}
+        for other in scope_loops:
+            other_ids = _name_ids(other.target)
+            if other is not loop and target_ids & other_ids:
+                allowed.update(id(node) for part in [other.target, *other.body] for node in _names(part)
+                               if node.id in other_ids)
+        if any(node.id in target_ids and id(node) not in allowed for node in scope_names):
+            return
+        if self.source.has_comments(init, loop):
+            return
+
+        value_text = ast.unparse(new_value)
+        if kind == "string_join":
+            # GeneratorExp تُطبع بين قوسين، وتكفي أقواس الاستدعاء
+            value_text = f"''.join({value_text[1:-1]})"
+        replacement = f"{name} = {value_text}"
+        self.rewrites.append(Rewrite(kind, init.lineno, [
+            (self.source.start(init), self.source.end(loop), replacement)
+        ]))
+
+    @staticmethod
+    def _is_method_call(statement: ast.stmt, name: str, method: str) -> bool:
+        return (isinstance(statement, ast.Expr) and isinstance(statement.value, ast.Call)
+                and isinstance(statement.value.func, ast.Attribute)
+                and statement.value.func.attr == method
+                and isinstance(statement.value.func.value, ast.Name)
+                and statement.value.func.value.id == name
+                and len(statement.value.args) == 1 and not statement.value.keywords
+                and not isinstance(statement.value.args[0], ast.Starred))
+
+    def _generator_argument(self, call: ast.Call):
+        """sum([e for ...]) ← sum(e for ...) دون بناء قائمة وسيطة"""
+        if not (isinstance(call.func, ast.Name) and len(call.args) == 1 and not call.keywords
+                and isinstance(call.args[0], ast.ListComp)):
+            return
+        if call.func.id in SHORT_CIRCUIT_BUILTINS:
+            if _has(call.args[0], ast.Call):
+                return
+        elif call.func.id not in CONSUMING_BUILTINS:
+            return
+
+        comprehension = call.args[0]
+        start, end = self.source.start(comprehension), self.source.end(comprehension)
+        inner = self.source.data[start + 1:end - 1].decode("utf-8")
+        self.rewrites.append(Rewrite("generator_expression", call.lineno, [(start, end, inner)]))
+
+    def _hoist_invariants(self, loop: ast.For, fresh: Set[str], shadowed: Set[str]):
+        """نقل حساب لا يتغير بين التكرارات إلى ما قبل الحلقة
+
+        يُنقل أول جمل الجسم فقط، ومن حلقة تُنفذ مرة واحدة على الأقل، فيُقيّم
+        التعبير في نفس الموضع من التنفيذ كما في التكرار الأول (المرور التالي
+        ينقل الجملة التي تليها). والجسم لا يعدل إلا حاويات جديدة، فلا يتغير
+        ما يقرؤه التعبير عبر اسم مستعار أو استدعاء.
+        """
+        if len(loop.body) < 2 or not self._runs_at_least_once(loop, shadowed):
+            return
+        if not _mutates_only(loop.body, fresh):
+            return
+        loop_start = self.source.line_start(loop)
+        if loop_start is None:
+            return
+        target_ids = _name_ids(loop.target)
+        body_names = [name for statement in loop.body for name in _names(statement)]
+
+        statement = loop.body[0]
+        if not (isinstance(statement, ast.Assign) and len(statement.targets) == 1
+                and isinstance(statement.targets[0], ast.Name)):
+            return
+        variable = statement.targets[0].id
+        expression = statement.value
+        if not self._is_pure(expression) or not _has(expression, (ast.BinOp, ast.Call, ast.Compare)):
+            return
+
+        used = _name_ids(expression)
+        if used & target_ids or variable in used:
+            return
+        # كل إشارة داخل الحلقة لأسماء التعبير يجب أن تكون في التعبير نفسه
+        expression_names = {id(node) for node in _names(expression)}
+        if any(node.id in used and id(node) not in expression_names for node in body_names):
+            return
+        # المتغير يُسند مرة واحدة ويُقرأ فقط بعد ذلك
+        references = [node for node in body_names if node.id == variable]
+        assignments = [node for node in references if isinstance(node.ctx, ast.Store)]
+        if len(assignments) != 1 or any(isinstance(node.ctx, ast.Del) for node in references):
+            return
+
+        bounds = self.source.line_bounds(statement)
+        if bounds is None or self.source.has_comments(statement, statement):
+            return
+        indent = self.source.data[loop_start:self.source.start(loop)].decode("utf-8")
+        hoisted = f"{indent}{ast.unparse(statement)}\n"
+        self.rewrites.append(Rewrite("hoist_invariant", statement.lineno, [
+            (loop_start, loop_start, hoisted),
+            (bounds[0], bounds[1], "")
+        ]))
+
+    @staticmethod
+    def _runs_at_least_once(loop: ast.For, shadowed: Set[str]) -> bool:
+        """حلقة على مجموعة ثابتة غير فارغة أو range بحدود ثابتة، وهدفها اسم بسيط
+
+        تقييم مجموعة كهذه وربط الهدف بلا آثار، فنقل التعبير قبلهما لا يغير
+        ترتيب ما يحدث.
+        """
+        if not isinstance(loop.target, ast.Name):
+            return False
+        iterable = loop.iter
+        if isinstance(iterable, ast.Constant):
+            return isinstance(iterable.value, (str, bytes)) and len(iterable.value) > 0
+        if isinstance(iterable, (ast.List, ast.Tuple, ast.Set)):
+            return bool(iterable.elts) and all(isinstance(element, ast.Constant) for element in iterable.elts)
+        if isinstance(iterable, ast.Call) and isinstance(iterable.func, ast.Name) \
+                and iterable.func.id == "range" and "range" not in shadowed and not iterable.keywords \
+                and 1 <= len(iterable.args) <= 3:
+            bounds = [argument.value for argument in iterable.args if isinstance(argument, ast.Constant)]
+            if len(bounds) != len(iterable.args) or not all(type(bound) is int for bound in bounds):
+                return False
+            if len(bounds) == 3 and bounds[2] == 0:
+                return False
+            return len(range(*bounds)) > 0
+        return False
+
+    @staticmethod
+    def _is_pure(expression: ast.expr) -> bool:
+        """تعبير من ثوابت وأسماء وعمليات ودوال بلا آثار جانبية فقط"""
+        for node in ast.walk(expression):
+            if isinstance(node, ast.Call):
+                if not (isinstance(node.func, ast.Name) and node.func.id in PURE_BUILTINS
+                        and not node.keywords):
+                    return False
+            elif isinstance(node, ast.BinOp):
+                if isinstance(node.op, RAISING_OPERATORS):
+                    return False
+            elif not isinstance(node, (ast.Constant, ast.Name, ast.Load, ast.UnaryOp, ast.Compare,
+                                       ast.BoolOp, ast.Tuple, ast.operator, ast.unaryop,
+                                       ast.cmpop, ast.boolop)):
+                return False
+        return True
+
+
+def _apply(code: str, rewrites: List[Rewrite]) -> Tuple[str, List[Rewrite]]:
+    """تطبيق التعديلات غير المتداخلة من آخر المصدر إلى أوله"""
+    accepted, taken = [], []
+    for rewrite in sorted(rewrites, key=lambda item: item.span):
+        start, end = rewrite.span
+        if any(start < taken_end and taken_start < end or start == taken_start
+               for taken_start, taken_end in taken):
+            continue
+        accepted.append(rewrite)
+        taken.append((start, end))
+
+    data = code.encode("utf-8")
+    edits = sorted((edit for rewrite in accepted for edit in rewrite.edits), key=lambda edit: edit[0],
+                   reverse=True)
+    for start, end, text in edits:
+        data = data[:start] + text.encode("utf-8") + data[end:]
+    return data.decode("utf-8"), accepted
+
+
+def rewrite_python(code: str) -> Tuple[str, List[Dict[str, int]]]:
+    """تطبيق التحويلات حتى الثبات
+
+    تُرجع الكود الجديد وقائمة التحويلات المطبقة. الكود الذي لا يمكن تحليله
+    يُرجع كما هو.
+    """
+    applied = []
+    for _ in range(MAX_PASSES):
+        try:
+            rewrites = _Rewriter(code).collect()
+        except SyntaxError:
+            break
+        if not rewrites:
+            break
+        new_code, accepted = _apply(code, rewrites)
+        try:
+            # التحليل يُحفظ في الذاكرة المشتركة فيُستخدم في المرور التالي وعند التقييم
+            get_parsed_source(new_code).tree
+        except SyntaxError:
+            # لا يُفترض حدوثه، لكن الكود الأصلي أولى من كود معطوب
+            break
+        code = new_code
+        applied.extend({"name": rewrite.name, "line": rewrite.line} for rewrite in accepted)
+    return code, applied
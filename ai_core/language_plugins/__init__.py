@@ -0,0 +1,198 @@
+"""
+سجل إضافات لغات توليد الأكواد
+Lazily loaded language generator plugin registry
+"""
+
+import hashlib
+import importlib
+import json
+import threading
+from dataclasses import dataclass, field
+from importlib.metadata import entry_points
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Union
+
+from jinja2 import ChoiceLoader, DictLoader, Environment, FileSystemBytecodeCache, FileSystemLoader, Template
+
+# مجموعة نقاط الدخول التي تُسجل بها الحزم الخارجية لغات جديدة
+ENTRY_POINT_GROUP = "nexoratrix.languages"
+
+TEMPLATES_DIR = Path(__file__).parent / "templates"
+
+# اللغات المدمجة (تُستورد وحداتها عند أول طلب فقط)
+BUILTIN_PLUGINS = {
+    "python": "language_plugins.python:PLUGIN",
+    "javascript": "language_plugins.javascript:PLUGIN",
+    "java": "language_plugins.java:PLUGIN",
+    "cpp": "language_plugins.cpp:PLUGIN",
+    "html": "language_plugins.html:PLUGIN",
+    "css": "language_plugins.css:PLUGIN",
+    "sql": "language_plugins.sql:PLUGIN",
+    "bash": "language_plugins.bash:PLUGIN",
+    "generic": "language_plugins.generic:PLUGIN",
+}
+
+# اللغة المستخدمة عندما لا توجد إضافة للغة المطلوبة
+FALLBACK_LANGUAGE = "generic"
+
+
+@dataclass
+class LanguagePlugin:
+    """إضافة لغة: قالب Jinja2 ومقتطفات المتطلبات"""
+    name: str
+    template: str
+    # الكلمة المفتاحية في المتطلب -> أسطر الكود المقابلة
+    requirement_snippets: Dict[str, List[str]] = field(default_factory=dict)
+    default_snippet: List[str] = field(default_factory=list)
+    indent: str = ""
+    # مصدر القالب للإضافات الخارجية التي لا تضع ملفاتها في مجلد القوالب
+    template_source: Optional[str] = None
+
+    def requirements_code(self, requirements: List[str]) -> str:
+        """توليد أسطر الكود المقابلة للمتطلبات"""
+        code_lines = []
+        for req in requirements:
+            req = req.lower()
+            for keyword, lines in self.requirement_snippets.items():
+                if keyword in req:
+                    code_lines.extend(lines)
+                    break
+
+        lines = code_lines or self.default_snippet
+        return "\n".join(self.indent + line for line in lines)
+
+
+def generate_class_name(description: str) -> str:
+    """توليد اسم كلاس من الوصف"""
+    words = description.replace(" ", "_").replace("-", "_")
+    return "".join(word.capitalize() for word in words.split("_") if word)[:50] + "Handler"
+
+
+class LanguageRegistry:
+    """سجل اللغات: اكتشاف الإضافات وتحميلها عند الحاجة وتخزين القوالب المترجمة"""
+
+    def __init__(self, bytecode_cache_dir: Optional[str] = None, discover: bool = True):
+        self._sources: Dict[str, Any] = dict(BUILTIN_PLUGINS)
+        self._plugins: Dict[str, LanguagePlugin] = {}
+        self._versions: Dict[str, str] = {}
+        self._templates: Dict[str, Template] = {}
+        self._inline_templates: Dict[str, str] = {}
+        self._bytecode_cache_dir = bytecode_cache_dir
+        self._environment: Optional[Environment] = None
+        self._discovered = not discover
+        self._lock = threading.Lock()
+
+    def _discover(self):
+        """قراءة نقاط الدخول دون استيراد الإضافات نفسها"""
+        if self._discovered:
+            return
+        self._discovered = True
+        for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+            self._sources[entry_point.name.lower()] = entry_point
+
+    def register(self, name: str, plugin: Union[LanguagePlugin, str]):
+        """تسجيل إضافة (كائن أو مسار "module:attribute" يُستورد عند أول طلب)"""
+        name = name.lower()
+        with self._lock:
+            self._sources[name] = plugin
+            self._plugins.pop(name, None)
+            self._versions.pop(name, None)
+            # قالب الإضافة السابقة مترجم هنا وفي ذاكرة بيئة Jinja2 (auto_reload معطل)،
+            # والتخزين على القرص مفهرس ببصمة المصدر فلا يُعاد منه قالب قديم
+            self._templates.clear()
+            self._environment = None
+
+    def available(self) -> List[str]:
+        """أسماء اللغات المتاحة"""
+        self._discover()
+        return sorted(name for name in self._sources if name != FALLBACK_LANGUAGE)
+
+    def loaded(self) -> List[str]:
+        """أسماء اللغات التي استُوردت إضافاتها فعلاً"""
+        return sorted(self._plugins)
+
+    def _resolve(self, language: str) -> str:
+        """اسم الإضافة التي تخدم اللغة المطلوبة"""
+        self._discover()
+        name = language.lower()
+        return name if name in self._sources else FALLBACK_LANGUAGE
+
+    def get(self, language: str) -> LanguagePlugin:
+        """إضافة اللغة المطلوبة، أو الإضافة العامة إذا لم تكن مدعومة"""
+        name = self._resolve(language)
+        plugin = self._plugins.get(name)
+        if plugin is not None:
+            return plugin
+
+        with self._lock:
+            plugin = self._plugins.get(name)
+            if plugin is None:
+                plugin = self._load(self._sources[name])
+                if plugin.template_source is not None:
+                    self._inline_templates[plugin.template] = plugin.template_source
+                self._plugins[name] = plugin
+        return plugin
+
+    def version(self, language: str) -> str:
+        """بصمة الإضافة التي تخدم اللغة ومصدر قالبها (تتغير بتغير أي منهما)"""
+        name = self._resolve(language)
+        version = self._versions.get(name)
+        if version is None:
+            plugin = self.get(name)
+            source, _, _ = self.environment.loader.get_source(self.environment, plugin.template)
+            canonical = json.dumps([
+                plugin.template, source, plugin.requirement_snippets, plugin.default_snippet, plugin.indent
+            ], ensure_ascii=False, sort_keys=True)
+            version = hashlib.blake2b(canonical.encode("utf-8"), digest_size=8).hexdigest()
+            self._versions[name] = version
+        return version
+
+    @staticmethod
+    def _load(source: Any) -> LanguagePlugin:
+        """استيراد الإضافة من مصدرها"""
+        if isinstance(source, LanguagePlugin):
+            return source
+        if isinstance(source, str):
+            module_name, _, attribute = source.partition(":")
+            return getattr(importlib.import_module(module_name), attribute)
+        # نقطة دخول
+        return source.load()
+
+    @property
+    def environment(self) -> Environment:
+        """بيئة Jinja2 مع تخزين القوالب المترجمة على القرص"""
+        if self._environment is None:
+            self._environment = Environment(
+                loader=ChoiceLoader([
+                    FileSystemLoader(str(TEMPLATES_DIR)),
+                    DictLoader(self._inline_templates)
+                ]),
+                bytecode_cache=FileSystemBytecodeCache(self._bytecode_cache_dir),
+                keep_trailing_newline=True,
+                trim_blocks=True,
+                lstrip_blocks=True,
+                auto_reload=False
+            )
+        return self._environment
+
+    def template(self, plugin: LanguagePlugin) -> Template:
+        """القالب المترجم للإضافة (يُترجم مرة واحدة لكل عملية)"""
+        template = self._templates.get(plugin.template)
+        if template is None:
+            template = self.environment.get_template(plugin.template)
+            self._templates[plugin.template] = template
+        return template
+
+    def render(self, language: str, description: str, requirements: List[str],
+               created: str, knowledge: List[Dict] = None) -> str:
+        """توليد الكود للغة المطلوبة"""
+        plugin = self.get(language)
+        return self.template(plugin).render(
+            description=description,
+            language=language,
+            created=created,
+            class_name=generate_class_name(description),
+            requirements=requirements,
+            requirements_code=plugin.requirements_code(requirements),
+            knowledge=knowledge or []
+        )
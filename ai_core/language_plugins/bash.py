@@ -0,0 +1,20 @@
+"""إضافة لغة Bash"""
+
+from language_plugins import LanguagePlugin
+
+PLUGIN = LanguagePlugin(
+    name="bash",
+    template="bash.sh.j2",
+    requirement_snippets={
+        "file": [
+            "# معالجة الملفات",
+            "# data=$(cat file.txt)"
+        ],
+        "api": [
+            "# إعداد API",
+            "# response=$(curl -s https://api.example.com)"
+        ]
+    },
+    default_snippet=[":"],
+    indent="    "
+)
@@ -0,0 +1,20 @@
+"""إضافة لغة C++"""
+
+from language_plugins import LanguagePlugin
+
+PLUGIN = LanguagePlugin(
+    name="cpp",
+    template="cpp.cpp.j2",
+    requirement_snippets={
+        "database": [
+            "// إعداد قاعدة البيانات",
+            "// sqlite3_open(\"app.db\", &db);"
+        ],
+        "file": [
+            "// معالجة الملفات",
+            "// std::ifstream file(\"file.txt\");"
+        ]
+    },
+    default_snippet=["// TODO: تنفيذ المنطق"],
+    indent="        "
+)
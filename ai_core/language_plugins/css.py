@@ -0,0 +1,20 @@
+"""إضافة لغة CSS"""
+
+from language_plugins import LanguagePlugin
+
+PLUGIN = LanguagePlugin(
+    name="css",
+    template="css.css.j2",
+    requirement_snippets={
+        "responsive": [
+            "@media (max-width: 768px) {",
+            "    .container { padding: 0.5rem; }",
+            "}"
+        ],
+        "dark": [
+            "@media (prefers-color-scheme: dark) {",
+            "    body { background: #111; color: #eee; }",
+            "}"
+        ]
+    }
+)
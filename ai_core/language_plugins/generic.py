@@ -0,0 +1,5 @@
+"""القالب العام للغات غير المدعومة"""
+
+from language_plugins import LanguagePlugin
+
+PLUGIN = LanguagePlugin(name="generic", template="generic.txt.j2")
@@ -0,0 +1,22 @@
+"""إضافة لغة HTML"""
+
+from language_plugins import LanguagePlugin
+
+PLUGIN = LanguagePlugin(
+    name="html",
+    template="html.html.j2",
+    requirement_snippets={
+        "form": [
+            "<form>",
+            "    <!-- حقول النموذج -->",
+            "</form>"
+        ],
+        "table": [
+            "<table>",
+            "    <!-- صفوف الجدول -->",
+            "</table>"
+        ]
+    },
+    default_snippet=["<p>تم تنفيذ المهمة بنجاح</p>"],
+    indent="        "
+)
@@ -0,0 +1,24 @@
+"""إضافة لغة Java"""
+
+from language_plugins import LanguagePlugin
+
+PLUGIN = LanguagePlugin(
+    name="java",
+    template="java.java.j2",
+    requirement_snippets={
+        "database": [
+            "// إعداد قاعدة البيانات",
+            "// Connection connection = DriverManager.getConnection(\"jdbc:sqlite:app.db\");"
+        ],
+        "api": [
+            "// إعداد API",
+            "// HttpResponse<String> response = client.send(request, BodyHandlers.ofString());"
+        ],
+        "file": [
+            "// معالجة الملفات",
+            "// String data = Files.readString(Path.of(\"file.txt\"));"
+        ]
+    },
+    default_snippet=["// TODO: تنفيذ المنطق"],
+    indent="        "
+)
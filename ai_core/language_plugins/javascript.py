@@ -0,0 +1,20 @@
+"""إضافة لغة JavaScript"""
+
+from language_plugins import LanguagePlugin
+
+PLUGIN = LanguagePlugin(
+    name="javascript",
+    template="javascript.js.j2",
+    requirement_snippets={
+        "database": [
+            "// إعداد قاعدة البيانات",
+            "// const db = await connectToDatabase();"
+        ],
+        "api": [
+            "// إعداد API",
+            "// const response = await fetch('https://api.example.com');"
+        ]
+    },
+    default_snippet=["// TODO: تنفيذ المنطق"],
+    indent="        "
+)
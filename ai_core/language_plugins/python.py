@@ -0,0 +1,24 @@
+"""إضافة لغة Python"""
+
+from language_plugins import LanguagePlugin
+
+PLUGIN = LanguagePlugin(
+    name="python",
+    template="python.py.j2",
+    requirement_snippets={
+        "database": [
+            "# إعداد قاعدة البيانات",
+            "# db_connection = sqlite3.connect('app.db')"
+        ],
+        "api": [
+            "# إعداد API",
+            "# response = requests.get('https://api.example.com')"
+        ],
+        "file": [
+            "# معالجة الملفات",
+            "# with open('file.txt', 'r') as f: data = f.read()"
+        ]
+    },
+    default_snippet=["pass"],
+    indent="        "
+)
@@ -0,0 +1,17 @@
+"""إضافة لغة SQL"""
+
+from language_plugins import LanguagePlugin
+
+PLUGIN = LanguagePlugin(
+    name="sql",
+    template="sql.sql.j2",
+    requirement_snippets={
+        "index": ["CREATE INDEX IF NOT EXISTS idx_records_created_at ON records (created_at);"],
+        "user": [
+            "CREATE TABLE IF NOT EXISTS users (",
+            "    id INTEGER PRIMARY KEY,",
+            "    name TEXT NOT NULL",
+            ");"
+        ]
+    }
+)
@@ -0,0 +1,101 @@
+"""
+قياس أداء معزول لنسخ مختلفة من نفس الكود
+Isolated micro-benchmark runner, executed in a child process:
+
+    python micro_benchmark.py spec.json
+
+يقرأ {"variants": {name: source}, "repeat": n, "warmup": n, "compare": bool,
+"memory_limit_mb": n, "cpu_limit": n} ويطبع {"samples": {name: [ns, ...]}}
+أو {"error": ...} بصيغة JSON. حدود الذاكرة ووقت CPU تُطبق قبل تنفيذ أي نسخة
+كما في profile_runner.py.
+
+مع compare تُشغل كل نسخة مرة واحدة قبل القياس وتُقارن مخرجاتها واستثناؤها
+وقيمها العامة، فتُرفض نسخ يختلف سلوكها ({"error": ..., "mismatch": true}).
+"""
+
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+from profile_runner import apply_limits
+
+# أنواع تُقارن قيمها بين النسخ عبر repr (بقية الكائنات تحمل عناوين ذاكرة)
+PLAIN_TYPES = (int, float, complex, str, bytes, bool, type(None), list, tuple, dict, set, frozenset)
+
+
+def observe_variant(source: str, name: str) -> Dict[str, Any]:
+    """تنفيذ النسخة مرة واحدة وتسجيل مخرجاتها واستثنائها وقيمها العامة"""
+    namespace = {"__name__": "__main__", "__builtins__": __builtins__}
+    output = io.StringIO()
+    error = None
+    with contextlib.redirect_stdout(output):
+        try:
+            exec(compile(source, f"<{name}>", "exec"), namespace)
+        except BaseException as e:
+            error = f"{type(e).__name__}: {e}"
+    state = {
+        key: repr(value) for key, value in namespace.items()
+        if not key.startswith("__") and isinstance(value, PLAIN_TYPES)
+    }
+    return {"output": output.getvalue(), "error": error, "state": state}
+
+
+def compare_variants(variants: Dict[str, str]) -> Dict[str, Any]:
+    """{} إذا تطابق سلوك كل النسخ، وإلا وصف أول اختلاف
+
+    القيم تُقارن للأسماء المشتركة فقط: متغير حلقة تحولت إلى comprehension
+    يختفي، واستخدامه بعدها كان سيظهر استثناءً.
+    """
+    observed = {name: observe_variant(source, name) for name, source in variants.items()}
+    for name, result in observed.items():
+        if result["error"] is not None:
+            return {"error": f"{name}: {result['error']}"}
+    (first_name, first), *others = observed.items()
+    for name, result in others:
+        if result["output"] != first["output"]:
+            return {"error": f"اختلفت مخرجات {name} عن {first_name}", "mismatch": True}
+        for key in first["state"].keys() & result["state"].keys():
+            if first["state"][key] != result["state"][key]:
+                return {"error": f"اختلفت قيمة {key} بين {first_name} و {name}", "mismatch": True}
+    return {}
+
+
+def run_variants(variants: Dict[str, str], repeat: int = 5, warmup: int = 1) -> Dict[str, List[int]]:
+    """تنفيذ كل نسخة كوحدة __main__ جديدة وقياس زمنها بالنانوثانية
+
+    النسخ تُنفذ بالتناوب في كل تكرار حتى يتوزع أثر الضوضاء عليها بالتساوي.
+    """
+    compiled = {name: compile(source, f"<{name}>", "exec") for name, source in variants.items()}
+    samples: Dict[str, List[int]] = {name: [] for name in compiled}
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for iteration in range(warmup + repeat):
+            for name, code in compiled.items():
+                namespace = {"__name__": "__main__", "__builtins__": __builtins__}
+                started = time.perf_counter_ns()
+                exec(code, namespace)
+                elapsed = time.perf_counter_ns() - started
+                if iteration >= warmup:
+                    samples[name].append(elapsed)
+    return samples
+
+
+def main():
+    with open(sys.argv[1], "r", encoding="utf-8") as spec_file:
+        spec = json.load(spec_file)
+    apply_limits(spec.get("memory_limit_mb", 0), spec.get("cpu_limit", 0))
+    try:
+        result = compare_variants(spec["variants"]) if spec.get("compare") else {}
+        if not result:
+            result = {"samples": run_variants(spec["variants"], spec.get("repeat", 5), spec.get("warmup", 1))}
+    except BaseException as e:
+        result = {"error": f"{type(e).__name__}: {e}"}
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+نتائج تحليل الكود المشتركة بين المحللات
+Content-addressed parse artifacts shared by the tester, optimizer, scanner and profiler
+
+كل نص كود فريد يُحلل مرة واحدة: الشجرة والرموز ومواضع الأسطر وكائن الكود
+تُحسب عند أول طلب وتُحفظ في ذاكرة LRU محدودة. الشجرة مشتركة بين المستخدمين
+فلا يجوز تعديلها.
+"""
+
+import ast
+import bisect
+import hashlib
+import io
+import threading
+import tokenize
+from collections import OrderedDict
+from types import CodeType
+from typing import Dict, List, Optional, Set
+
+PARSED_SOURCE_CACHE_SIZE = 256
+
+_MISSING = object()
+
+
+class ParsedSource:
+    """نتائج تحليل نص كود واحد تُحسب عند الطلب"""
+
+    def __init__(self, code: str, filename: str = "<generated>"):
+        self.code = code
+        self.filename = filename
+        self.content_hash = content_hash(code)
+        self._lock = threading.Lock()
+        self._tree = _MISSING
+        self._syntax_error: Optional[SyntaxError] = None
+        self._tokens: Optional[List[tokenize.TokenInfo]] = None
+        self._line_offsets: Optional[List[int]] = None
+        self._byte_line_offsets: Optional[List[int]] = None
+        self._comment_lines: Optional[Set[int]] = None
+        self._code_object: Optional[CodeType] = None
+
+    @property
+    def tree(self) -> ast.Module:
+        """شجرة AST (تُرفع SyntaxError نفسها في كل طلب إذا تعذر التحليل)"""
+        with self._lock:
+            if self._tree is _MISSING:
+                try:
+                    self._tree = ast.parse(self.code, self.filename)
+                except (SyntaxError, ValueError) as e:
+                    # ValueError: بايت صفري في الكود
+                    self._tree = None
+                    self._syntax_error = e if isinstance(e, SyntaxError) else SyntaxError(str(e))
+        if self._tree is None:
+            raise self._syntax_error
+        return self._tree
+
+    @property
+    def syntax_error(self) -> Optional[SyntaxError]:
+        """خطأ بناء الجملة أو None إذا كان الكود صالحاً"""
+        try:
+            self.tree
+        except SyntaxError as e:
+            return e
+        return None
+
+    @property
+    def tokens(self) -> List[tokenize.TokenInfo]:
+        """رموز Python حتى أول خطأ في الترميز"""
+        with self._lock:
+            if self._tokens is None:
+                tokens = []
+                try:
+                    for token in tokenize.generate_tokens(io.StringIO(self.code).readline):
+                        tokens.append(token)
+                except (tokenize.TokenError, SyntaxError):
+                    pass
+                self._tokens = tokens
+        return self._tokens
+
+    @property
+    def comment_lines(self) -> Set[int]:
+        """أرقام الأسطر التي تحتوي تعليقات"""
+        if self._comment_lines is None:
+            self._comment_lines = {token.start[0] for token in self.tokens if token.type == tokenize.COMMENT}
+        return self._comment_lines
+
+    @property
+    def line_offsets(self) -> List[int]:
+        """موضع بداية كل سطر بالأحرف"""
+        if self._line_offsets is None:
+            offsets = [0]
+            index = self.code.find("\n")
+            while index != -1:
+                offsets.append(index + 1)
+                index = self.code.find("\n", index + 1)
+            self._line_offsets = offsets
+        return self._line_offsets
+
+    @property
+    def byte_line_offsets(self) -> List[int]:
+        """موضع بداية كل سطر بالبايت وفق UTF-8 (مواضع AST بالبايت)"""
+        if self._byte_line_offsets is None:
+            data = self.code.encode("utf-8")
+            offsets = [0]
+            index = data.find(b"\n")
+            while index != -1:
+                offsets.append(index + 1)
+                index = data.find(b"\n", index + 1)
+            self._byte_line_offsets = offsets
+        return self._byte_line_offsets
+
+    @property
+    def code_object(self) -> CodeType:
+        """كائن الكود المُجمّع من الشجرة"""
+        tree = self.tree
+        with self._lock:
+            if self._code_object is None:
+                self._code_object = compile(tree, self.filename, "exec")
+        return self._code_object
+
+    def line_of(self, offset: int) -> int:
+        """رقم السطر (يبدأ من 1) لموضع بالأحرف"""
+        return bisect.bisect_right(self.line_offsets, offset)
+
+
+def content_hash(code: str) -> str:
+    """بصمة نص الكود"""
+    return hashlib.blake2b(code.encode("utf-8", errors="surrogatepass"), digest_size=16).hexdigest()
+
+
+class ParsedSourceCache:
+    """ذاكرة LRU محدودة لنتائج التحليل مفهرسة ببصمة المحتوى"""
+
+    def __init__(self, max_size: int = PARSED_SOURCE_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, ParsedSource]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, code: str) -> ParsedSource:
+        parsed = ParsedSource(code)
+        key = parsed.content_hash
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached.code == code:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+            self._entries[key] = parsed
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return parsed
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": len(self._entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+
+_cache = ParsedSourceCache()
+
+
+def get_parsed_source(code: str) -> ParsedSource:
+    """نتائج تحليل الكود المشتركة (يُحلل كل نص فريد مرة واحدة)"""
+    return _cache.get(code)
+
+
+def parsed_source_stats() -> Dict[str, int]:
+    """إحصائيات الذاكرة المشتركة"""
+    return _cache.stats()
@@ -0,0 +1,70 @@
+"""
+استخراج الأنماط البرمجية من الأكواد الناجحة
+AST-based code pattern extraction (imported by worker processes)
+"""
+
+import ast
+from typing import Dict, List
+
+# نوع العقدة -> اسم النمط
+NODE_PATTERNS = {
+    ast.Try: "error_handling",
+    ast.ClassDef: "object_oriented",
+    ast.AsyncFunctionDef: "asynchronous",
+    ast.Await: "asynchronous",
+    ast.With: "context_manager",
+    ast.AsyncWith: "context_manager",
+    ast.ListComp: "comprehension",
+    ast.DictComp: "comprehension",
+    ast.SetComp: "comprehension",
+    ast.GeneratorExp: "generator",
+    ast.Yield: "generator",
+    ast.YieldFrom: "generator",
+    ast.Lambda: "functional",
+    ast.Assert: "assertions",
+}
+
+
+def extract_code_patterns(code: str) -> Dict[str, int]:
+    """عدد مرات ظهور كل نمط في الكود (قاموس فارغ إذا تعذر تحليله)"""
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return {}
+
+    counts: Dict[str, int] = {}
+    for node in ast.walk(tree):
+        pattern = NODE_PATTERNS.get(type(node))
+        if pattern is not None:
+            counts[pattern] = counts.get(pattern, 0) + 1
+
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            if node.decorator_list:
+                counts["decorators"] = counts.get("decorators", 0) + len(node.decorator_list)
+            if node.returns is not None or any(arg.annotation for arg in node.args.args):
+                counts["type_hints"] = counts.get("type_hints", 0) + 1
+            if ast.get_docstring(node):
+                counts["docstrings"] = counts.get("docstrings", 0) + 1
+    return counts
+
+
+def count_patterns(codes: List[str]) -> Dict[str, List[int]]:
+    """تجميع الأنماط لدفعة أكواد: النمط -> [عدد الظهور، عدد الأكواد]"""
+    totals: Dict[str, List[int]] = {}
+    for code in codes:
+        for pattern, occurrences in extract_code_patterns(code).items():
+            total = totals.setdefault(pattern, [0, 0])
+            total[0] += occurrences
+            total[1] += 1
+    return totals
+
+
+def merge_pattern_counts(results: List[Dict[str, List[int]]]) -> Dict[str, List[int]]:
+    """دمج نتائج الدفعات"""
+    merged: Dict[str, List[int]] = {}
+    for result in results:
+        for pattern, (occurrences, codes) in result.items():
+            total = merged.setdefault(pattern, [0, 0])
+            total[0] += occurrences
+            total[1] += codes
+    return merged
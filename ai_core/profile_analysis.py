@@ -0,0 +1,252 @@
+"""
+استخراج نقاط الاختناق من بيانات pstats الخام
+Structured bottleneck extraction from cProfile statistics
+
+Stats.stats: {(file, line, name): (primitive_calls, calls, self_time,
+cumulative_time, {caller: (primitive_calls, calls, self_time, cumulative_time)})}
+
+الدوال تُرتب بالوقت الذاتي والتراكمي، وحواف الاستدعاء بالوقت التراكمي
+للمستدعى من كل مستدعٍ. دوال الكود المولد تُربط بأسطرها في الشجرة المشتركة
+(parsed_source) لاقتراح تحسينات على الأسطر الساخنة نفسها.
+"""
+
+import ast
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from parsed_source import get_parsed_source
+
+GENERATED_FILENAME = "<generated>"
+
+# إدخالات أدوات القياس نفسها
+IGNORED_FUNCTIONS = {
+    "<built-in method builtins.exec>",
+    "<method 'disable' of '_lsprof.Profiler' objects>",
+}
+
+# أقل نسبة من الوقت الكلي تستحق اقتراحاً
+HOT_SHARE = 0.05
+# عدد استدعاءات يجعل كلفة الاستدعاء نفسها مهمة
+MANY_CALLS = 10000
+
+# دوال مدمجة ساخنة -> اقتراح
+BUILTIN_HINTS = {
+    "<method 'append' of 'list' objects>": "بناء القوائم بـ append داخل حلقة: استخدم list comprehension",
+    "<method 'index' of 'list' objects>": "البحث الخطي بـ list.index: استخدم dict للوصول المباشر",
+    "<method 'count' of 'list' objects>": "list.count يمر على القائمة كاملة: استخدم collections.Counter مرة واحدة",
+    "<method 'remove' of 'list' objects>": "list.remove خطي: استخدم set أو dict",
+    "<method 'insert' of 'list' objects>": "الإدراج في بداية القائمة خطي: استخدم collections.deque",
+    "<built-in method builtins.sorted>": "الترتيب المتكرر: رتب مرة واحدة أو استخدم heapq/bisect",
+    "<method 'sort' of 'list' objects>": "الترتيب المتكرر: رتب مرة واحدة أو استخدم heapq/bisect",
+    "<built-in method time.sleep>": "انتظار متزامن بـ time.sleep يستهلك زمن التنفيذ",
+    "<built-in method builtins.len>": "استدعاءات len كثيرة: احفظ الطول في متغير خارج الحلقة",
+}
+
+
+_BUILTIN_NAME = re.compile(r"<(?:method '(\w+)' of .+|built-in method (?:[\w.]+\.)?(\w+)>)")
+
+
+# أسماء كائنات الكود التي يولدها المترجم للتعابير
+_EXPRESSION_NAMES = {
+    ast.ListComp: "<listcomp>",
+    ast.SetComp: "<setcomp>",
+    ast.DictComp: "<dictcomp>",
+    ast.GeneratorExp: "<genexpr>",
+    ast.Lambda: "<lambda>",
+}
+
+
+def _label(key: Tuple[str, int, str]) -> str:
+    filename, line, name = key
+    if filename == "~":
+        return name
+    return f"{name} ({filename}:{line})"
+
+
+def _callable_name(key: Tuple[str, int, str]) -> Optional[str]:
+    """الاسم كما يظهر في موضع الاستدعاء (append من <method 'append' of 'list' objects>)"""
+    filename, _, name = key
+    if filename != "~":
+        return name.rsplit(".", 1)[-1]
+    match = _BUILTIN_NAME.fullmatch(name)
+    return (match.group(1) or match.group(2)) if match else None
+
+
+def _walk_body(node: ast.AST):
+    """عقد الدالة (أو الوحدة) دون الدخول في الدوال والأصناف المتداخلة"""
+    for child in ast.iter_child_nodes(node):
+        yield child
+        if not isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef)):
+            yield from _walk_body(child)
+
+
+class _SourceIndex:
+    """دوال الكود المولد وحلقاتها من الشجرة المشتركة"""
+
+    def __init__(self, code: Optional[str]):
+        self.lines = code.splitlines() if code else []
+        self.functions: Dict[Tuple[int, str], ast.AST] = {}
+        self.module: Optional[ast.Module] = None
+        if not code:
+            return
+        try:
+            self.module = tree = get_parsed_source(code).tree
+        except SyntaxError:
+            return
+        for node in ast.walk(tree):
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                # cProfile يسجل سطر def (أو أول مزخرف)
+                first_line = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+                self.functions[(first_line, node.name)] = node
+                self.functions.setdefault((node.lineno, node.name), node)
+            elif type(node) in _EXPRESSION_NAMES:
+                self.functions.setdefault((node.lineno, _EXPRESSION_NAMES[type(node)]), node)
+
+    def source(self, line: int) -> Optional[str]:
+        if 0 < line <= len(self.lines):
+            return self.lines[line - 1].strip()
+        return None
+
+    def function(self, line: int, name: str) -> Optional[ast.AST]:
+        if name == "<module>":
+            return self.module
+        return self.functions.get((line, name.rsplit(".", 1)[-1]))
+
+    def call_sites(self, caller: Tuple[str, int, str], callee: Tuple[str, int, str]) -> List[int]:
+        """أسطر استدعاء callee داخل جسم caller"""
+        if caller[0] != GENERATED_FILENAME:
+            return []
+        function = self.function(caller[1], caller[2])
+        name = _callable_name(callee)
+        if function is None or name is None:
+            return []
+        lines = set()
+        for node in _walk_body(function):
+            if isinstance(node, ast.Call):
+                target = node.func
+                called = target.attr if isinstance(target, ast.Attribute) else getattr(target, "id", None)
+                if called == name:
+                    lines.add(node.lineno)
+        return sorted(lines)
+
+
+def _loop_hints(function: ast.AST, label: str) -> List[str]:
+    """أنماط مكلفة داخل حلقات الدالة الساخنة، مع أسطرها"""
+    hints = []
+    loops = [node for node in _walk_body(function) if isinstance(node, (ast.For, ast.While, ast.AsyncFor))]
+    reported = set()
+    for loop in loops:
+        for node in _walk_body(loop):
+            if node is not loop and isinstance(node, (ast.For, ast.While, ast.AsyncFor)) \
+                    and ("nested", loop.lineno) not in reported:
+                reported.add(("nested", loop.lineno))
+                hints.append(f"{label}: حلقات متداخلة (السطر {loop.lineno}) - راجع تعقيد الخوارزمية")
+            elif isinstance(node, ast.Compare) and ("member", node.lineno) not in reported and any(
+                    isinstance(op, (ast.In, ast.NotIn)) for op in node.ops) and all(
+                    isinstance(comparator, (ast.Name, ast.Attribute)) for comparator in node.comparators):
+                reported.add(("member", node.lineno))
+                hints.append(f"{label}: اختبار عضوية داخل حلقة (السطر {node.lineno}) - "
+                             "إذا كانت المجموعة قائمة فحولها إلى set مرة واحدة قبل الحلقة")
+            elif isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) \
+                    and node.func.attr == "append" and ("append", node.lineno) not in reported:
+                reported.add(("append", node.lineno))
+                hints.append(f"{label}: append داخل حلقة (السطر {node.lineno}) - "
+                             "ابنِ القائمة بـ list comprehension أو generator")
+    return hints
+
+
+def analyze_stats(stats: Dict[Tuple, Tuple], code: Optional[str] = None, limit: int = 5) -> Dict[str, Any]:
+    """ترتيب الدوال والحواف الساخنة واقتراحات موجهة إليها"""
+    entries = {key: value for key, value in stats.items() if key[2] not in IGNORED_FUNCTIONS}
+    total_time = sum(value[2] for value in entries.values()) or 1e-12
+    index = _SourceIndex(code)
+
+    def describe(key, value) -> Dict[str, Any]:
+        filename, line, name = key
+        primitive_calls, calls, self_time, cumulative_time, _ = value
+        return {
+            "function": name,
+            "file": filename,
+            "line": line,
+            "label": _label(key),
+            "calls": calls,
+            "primitive_calls": primitive_calls,
+            "self_time": self_time,
+            "cumulative_time": cumulative_time,
+            "self_share": self_time / total_time,
+            "cumulative_share": min(1.0, cumulative_time / total_time),
+            "source": index.source(line) if filename == GENERATED_FILENAME and name != "<module>" else None,
+        }
+
+    by_self = sorted(entries.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+    # المستوى الأعلى للوحدة يحوي كل شيء فلا يفيد في الترتيب التراكمي
+    by_cumulative = sorted(
+        ((key, value) for key, value in entries.items() if key[2] != "<module>"),
+        key=lambda item: item[1][3], reverse=True
+    )[:limit]
+
+    edges = []
+    for callee, value in entries.items():
+        # قيم المستدعين في cProfile: (الاستدعاءات الكلية، الأولية، الذاتي، التراكمي)
+        for caller, (calls, _, _, cumulative_time) in value[4].items():
+            if caller[2] in IGNORED_FUNCTIONS:
+                continue
+            edges.append({
+                "caller": _label(caller),
+                "callee": _label(callee),
+                "calls": calls,
+                "time": cumulative_time,
+                "share": min(1.0, cumulative_time / total_time),
+                "call_lines": index.call_sites(caller, callee),
+            })
+    edges.sort(key=lambda edge: edge["time"], reverse=True)
+
+    bottlenecks = [describe(key, value) for key, value in by_self]
+    return {
+        "total_time": total_time,
+        "bottlenecks": bottlenecks,
+        "cumulative": [describe(key, value) for key, value in by_cumulative],
+        "hot_calls": edges[:limit],
+        "suggestions": _suggestions(entries, total_time, index),
+    }
+
+
+def _suggestions(entries: Dict[Tuple, Tuple], total_time: float, index: _SourceIndex) -> List[str]:
+    suggestions = []
+    ranked = sorted(entries.items(), key=lambda item: item[1][2], reverse=True)
+    for key, (primitive_calls, calls, self_time, cumulative_time, callers) in ranked:
+        share = self_time / total_time
+        if share < HOT_SHARE and cumulative_time / total_time < HOT_SHARE * 4:
+            continue
+        filename, line, name = key
+        label = _label(key)
+
+        if filename == "~":
+            hint = BUILTIN_HINTS.get(name)
+            if hint and share >= HOT_SHARE:
+                origins = []
+                for caller in callers:
+                    lines = index.call_sites(caller, key)
+                    origins.append(_label(caller) + (f" السطر {', '.join(map(str, lines))}" if lines else ""))
+                suggestions.append(f"{hint} ({calls} استدعاء من {'، '.join(origins)}، {share:.0%} من الوقت)")
+            continue
+
+        hints = []
+        if calls > primitive_calls and cumulative_time / total_time >= HOT_SHARE:
+            hints.append(f"{label}: استدعاء ذاتي متكرر ({calls} استدعاء) - "
+                         "احفظ النتائج بـ functools.lru_cache أو حوّله إلى حل تكراري")
+        # استدعاءات المولدات والتعابير (<genexpr>) استئناف لها وليست كلفة استدعاء
+        elif calls >= MANY_CALLS and share >= HOT_SHARE and not name.startswith("<"):
+            hints.append(f"{label}: {calls} استدعاء بكلفة صغيرة لكل منها - "
+                         "ادمج الاستدعاءات أو انقل العمل إلى حلقة واحدة")
+
+        if filename == GENERATED_FILENAME and share >= HOT_SHARE:
+            function = index.function(line, name)
+            if function is not None:
+                hints.extend(_loop_hints(function, label))
+            if not hints and name != "<module>":
+                source = index.source(line)
+                hints.append(f"{label}: {share:.0%} من الوقت الذاتي" + (f" - `{source}`" if source else ""))
+        suggestions.extend(hints)
+    return suggestions
+
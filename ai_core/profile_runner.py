@@ -0,0 +1,247 @@
+"""
+تحليل أداء كود في عملية فرعية معزولة
+Isolated profiling runner, executed in a child process:
+
+    python profile_runner.py spec.json
+
+يقرأ {"code", "result", "stats", "mode", "sample_interval", "memory_limit_mb",
+"cpu_limit", "top_allocations"} ويكتب النتيجة بصيغة JSON في مسار result.
+حدود الذاكرة ووقت CPU تُطبق قبل تنفيذ الكود، ومخرجات الكود تبقى في مخرجات
+العملية الفرعية.
+
+- deterministic: cProfile و tracemalloc، وبيانات pstats الخام في مسار stats.
+- sampling: عينات من مكدس الاستدعاءات بإشارة SIGPROF كل sample_interval ثانية
+  من وقت المعالج، دون cProfile أو tracemalloc فيبقى أثر القياس ضئيلاً.
+"""
+
+import cProfile
+import json
+import resource
+import signal
+import sys
+import time
+import tracemalloc
+from types import CodeType
+from typing import Any, Dict, List, Tuple
+
+TOP_ALLOCATIONS = 10
+# 200 عينة في الثانية من وقت المعالج
+DEFAULT_SAMPLE_INTERVAL = 0.005
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+# مكدس مطوي: [[الاسم، الملف، السطر]، ...] من الجذر إلى الورقة مع عدد العينات
+Stack = Tuple[List[List[Any]], int]
+
+
+def apply_limits(memory_limit_mb: int = 0, cpu_limit: int = 0):
+    """حدود صارمة على ذاكرة العملية ووقت CPU (تجاوز CPU ينهي العملية بـ SIGXCPU)"""
+    if memory_limit_mb:
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    if cpu_limit:
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_limit, cpu_limit + 1))
+
+
+def _cpu_seconds(usage) -> Dict[str, float]:
+    return {"user": usage.ru_utime, "system": usage.ru_stime}
+
+
+def _top_allocations(snapshot: tracemalloc.Snapshot, limit: int) -> List[Dict[str, Any]]:
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, cProfile.__file__),
+    ])
+    allocations = []
+    for statistic in snapshot.statistics("lineno")[:limit]:
+        frame = statistic.traceback[0]
+        allocations.append({
+            "file": frame.filename,
+            "line": frame.lineno,
+            "size_kb": statistic.size / 1024,
+            "count": statistic.count
+        })
+    return allocations
+
+
+def profile_code(code: str, stats_path: str, top_allocations: int = TOP_ALLOCATIONS) -> Dict[str, Any]:
+    """تنفيذ الكود كوحدة __main__ تحت cProfile و tracemalloc"""
+    compiled = compile(code, "<generated>", "exec")
+    namespace = {"__name__": "__main__", "__builtins__": __builtins__}
+    profiler = cProfile.Profile()
+    error = None
+
+    tracemalloc.start()
+    usage_before = resource.getrusage(resource.RUSAGE_SELF)
+    started = time.perf_counter()
+    profiler.enable()
+    try:
+        exec(compiled, namespace)
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            error = f"SystemExit: {e.code}"
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        profiler.disable()
+    wall_time = time.perf_counter() - started
+    usage_after = resource.getrusage(resource.RUSAGE_SELF)
+
+    # تحرير كائنات الكود قبل كتابة النتائج (قد تكون الذاكرة عند حدها)
+    namespace.clear()
+    snapshot = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    profiler.dump_stats(stats_path)
+
+    before, after = _cpu_seconds(usage_before), _cpu_seconds(usage_after)
+    return {
+        "error": error,
+        "wall_time": wall_time,
+        "cpu_user": after["user"] - before["user"],
+        "cpu_system": after["system"] - before["system"],
+        # ru_maxrss بالكيلوبايت على Linux
+        "max_rss_kb": usage_after.ru_maxrss,
+        "peak_traced_bytes": peak,
+        "allocations": _top_allocations(snapshot, top_allocations)
+    }
+
+
+class StackSampler:
+    """أخذ عينات من مكدس الخيط الرئيسي عند كل إشارة SIGPROF
+
+    المعالج يسجل كائنات الكود فقط (دون بناء نصوص) حتى يبقى سريعاً، وتُحوّل
+    إلى أسماء مرة واحدة في النهاية.
+    """
+
+    def __init__(self, interval: float, stop_code: CodeType):
+        self.interval = interval
+        self.counts: Dict[Tuple[CodeType, ...], int] = {}
+        self._stop_code = stop_code
+        self._previous_handler = None
+
+    def _sample(self, signum, frame):
+        stack = []
+        while frame is not None and frame.f_code is not self._stop_code:
+            stack.append(frame.f_code)
+            frame = frame.f_back
+        if stack:
+            key = tuple(stack)
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def __enter__(self):
+        self._previous_handler = signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        return self
+
+    def __exit__(self, *exc_info):
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, self._previous_handler)
+        return False
+
+    def stacks(self) -> List[Stack]:
+        """المكدسات المطوية مرتبة تنازلياً حسب عدد العينات"""
+        return [
+            ([[code.co_qualname, code.co_filename, code.co_firstlineno] for code in reversed(key)], count)
+            for key, count in sorted(self.counts.items(), key=lambda item: item[1], reverse=True)
+        ]
+
+
+def sample_code(code: str, interval: float = DEFAULT_SAMPLE_INTERVAL) -> Dict[str, Any]:
+    """تنفيذ الكود كوحدة __main__ مع أخذ عينات من مكدسه"""
+    compiled = compile(code, "<generated>", "exec")
+    namespace = {"__name__": "__main__", "__builtins__": __builtins__}
+    error = None
+
+    usage_before = resource.getrusage(resource.RUSAGE_SELF)
+    started = time.perf_counter()
+    # المكدس يُقطع عند إطار هذه الدالة فلا تظهر إطارات المشغل
+    with StackSampler(interval, sample_code.__code__) as sampler:
+        try:
+            exec(compiled, namespace)
+        except SystemExit as e:
+            if e.code not in (None, 0):
+                error = f"SystemExit: {e.code}"
+        except BaseException as e:
+            error = f"{type(e).__name__}: {e}"
+    wall_time = time.perf_counter() - started
+    usage_after = resource.getrusage(resource.RUSAGE_SELF)
+    namespace.clear()
+
+    before, after = _cpu_seconds(usage_before), _cpu_seconds(usage_after)
+    stacks = sampler.stacks()
+    return {
+        "error": error,
+        "wall_time": wall_time,
+        "cpu_user": after["user"] - before["user"],
+        "cpu_system": after["system"] - before["system"],
+        "max_rss_kb": usage_after.ru_maxrss,
+        "sample_interval": interval,
+        "samples": sum(count for _, count in stacks),
+        "stacks": stacks
+    }
+
+
+def _frame_label(frame: List[Any]) -> str:
+    name, filename, line = frame
+    # الفاصلة المنقوطة تفصل الإطارات في الصيغة المطوية
+    return f"{name} ({filename}:{line})".replace(";", ":")
+
+
+def collapsed_stacks(stacks: List[Stack]) -> str:
+    """الصيغة المطوية (root;child;leaf count) التي تقرؤها flamegraph.pl و speedscope"""
+    return "".join(
+        ";".join(_frame_label(frame) for frame in frames) + f" {count}\n"
+        for frames, count in stacks
+    )
+
+
+def speedscope_profile(stacks: List[Stack], interval: float, name: str = "generated") -> Dict[str, Any]:
+    """ملف speedscope من نوع sampled (وزن كل مكدس = عدد عيناته × الفترة)"""
+    frames: List[Dict[str, Any]] = []
+    frame_index: Dict[Tuple, int] = {}
+    samples, weights = [], []
+    for stack_frames, count in stacks:
+        indices = []
+        for frame in stack_frames:
+            key = tuple(frame)
+            if key not in frame_index:
+                frame_index[key] = len(frames)
+                frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+            indices.append(frame_index[key])
+        samples.append(indices)
+        weights.append(count * interval)
+    return {
+        "$schema": SPEEDSCOPE_SCHEMA,
+        "name": name,
+        "exporter": "nexoratrix",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": name,
+            "unit": "seconds",
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": samples,
+            "weights": weights
+        }]
+    }
+
+
+def main():
+    with open(sys.argv[1], "r", encoding="utf-8") as spec_file:
+        spec = json.load(spec_file)
+    apply_limits(spec.get("memory_limit_mb", 0), spec.get("cpu_limit", 0))
+    try:
+        if spec.get("mode") == "sampling":
+            result = sample_code(spec["code"], spec.get("sample_interval") or DEFAULT_SAMPLE_INTERVAL)
+        else:
+            result = profile_code(spec["code"], spec["stats"], spec.get("top_allocations", TOP_ALLOCATIONS))
+    except BaseException as e:
+        # خطأ في بناء الجملة أو في أدوات القياس نفسها
+        result = {"error": f"{type(e).__name__}: {e}", "failed": True}
+    with open(spec["result"], "w", encoding="utf-8") as result_file:
+        json.dump(result, result_file)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+"""
+تشغيل التحليل على مشروع كامل بالتوازي
+Project-wide parallel runs over directory trees with a content-hash cache
+
+الملفات تُوزع على مجموعة عمليات (spawn) في دفعات، والملفات التي لم يتغير
+محتواها منذ آخر تشغيل تُؤخذ نتيجتها من ذاكرة SQLite دون إعادة تحليل.
+النتائج تُبث سجلاً بسجل (JSON لكل سطر) فور اكتمال كل دفعة.
+
+الاستخدام:
+    python project_runner.py optimize <root> [--cache PATH] [--workers N]
+    python project_runner.py scan <root> [--format ndjson|sarif]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import json
+import multiprocessing
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+import code_metrics
+import code_rewriter
+import parsed_source
+from code_metrics import compute_code_metrics, maintainability_score, readability_score
+from code_rewriter import rewrite_python
+
+# الامتداد -> اللغة
+SOURCE_EXTENSIONS = {
+    ".py": "python",
+    ".js": "javascript",
+    ".mjs": "javascript",
+    ".cjs": "javascript",
+    ".jsx": "javascript",
+    ".ts": "javascript",
+    ".tsx": "javascript",
+}
+
+# مجلدات لا تُفحص (بيئات، تبعيات، مخرجات بناء)
+EXCLUDED_DIRS = {
+    ".git", ".hg", ".svn", "__pycache__", "node_modules",
+    ".venv", "venv", ".tox", ".mypy_cache", ".pytest_cache", "build", "dist",
+}
+
+CACHE_PATH = "ai_project_cache.db"
+CHUNK_SIZE = 16
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def sources_digest(paths: List[str]) -> str:
+    """بصمة مجمعة لمحتوى ملفات المصدر"""
+    digest = hashlib.blake2b(digest_size=8)
+    for path in paths:
+        with open(path, "rb") as source_file:
+            digest.update(source_file.read())
+    return digest.hexdigest()
+
+
+# أي تعديل على التحويلات أو المقاييس (أو على optimize_files هنا) يغير الإصدار
+# فتُبطل النتائج المخزنة، كما في RULESET_VERSION
+OPTIMIZER_VERSION = sources_digest([
+    code_rewriter.__file__, code_metrics.__file__, parsed_source.__file__, __file__
+])
+
+Worker = Callable[[List[Tuple[str, str]]], List[Dict[str, Any]]]
+
+
+def iter_source_files(root: str, extensions: Dict[str, str] = SOURCE_EXTENSIONS) -> Iterator[Tuple[str, str]]:
+    """ملفات المصدر تحت المجلد: (المسار، اللغة) بترتيب ثابت"""
+    for directory, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if d not in EXCLUDED_DIRS and not d.startswith("."))
+        for name in sorted(files):
+            language = extensions.get(os.path.splitext(name)[1].lower())
+            if language:
+                yield os.path.join(directory, name), language
+
+
+def file_hash(path: str) -> str:
+    """بصمة محتوى الملف"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as source_file:
+        for block in iter(lambda: source_file.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_source(path: str) -> Tuple[str, str]:
+    """قراءة الملف مع بصمة ما قُرئ فعلاً (قد يتغير الملف بعد فحص البصمة)"""
+    with open(path, "rb") as source_file:
+        data = source_file.read()
+    return data.decode("utf-8", errors="replace"), hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class ResultCache:
+    """نتائج التحليل مفهرسة ببصمة المحتوى وإصدار القواعد"""
+
+    LOOKUP_BATCH = 500
+
+    def __init__(self, db_path: str = CACHE_PATH):
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS content_results (
+                    namespace TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    version TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, content_hash, version)
+                ) WITHOUT ROWID
+            """)
+
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """اتصال يُثبت عند النجاح ويُغلق دائماً (with conn وحده لا يغلقه)"""
+        with contextlib.closing(sqlite3.connect(self.db_path, timeout=30)) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+
+    def get_many(self, namespace: str, version: str, hashes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """النتائج المخزنة للبصمات المطلوبة"""
+        found = {}
+        unique = list(dict.fromkeys(hashes))
+        with self._connect() as conn:
+            for start in range(0, len(unique), self.LOOKUP_BATCH):
+                batch = unique[start:start + self.LOOKUP_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"""SELECT content_hash, result FROM content_results
+                        WHERE namespace = ? AND version = ? AND content_hash IN ({placeholders})""",
+                    (namespace, version, *batch)
+                )
+                for content_hash, result in rows:
+                    found[content_hash] = json.loads(result)
+        return found
+
+    def put_many(self, namespace: str, version: str, items: List[Tuple[str, Dict[str, Any]]]):
+        """تخزين دفعة نتائج في معاملة واحدة"""
+        if not items:
+            return
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                """INSERT INTO content_results (namespace, content_hash, version, result, updated_at)
+                   VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT(namespace, content_hash, version)
+                   DO UPDATE SET result = excluded.result, updated_at = excluded.updated_at""",
+                [(namespace, content_hash, version, json.dumps(result), now) for content_hash, result in items]
+            )
+
+
+def _scan_tree(root: str, extensions: Dict[str, str]) -> List[Tuple[str, str, Optional[str]]]:
+    """المسار واللغة والبصمة لكل ملف (None إذا تعذرت القراءة)"""
+    files = []
+    for path, language in iter_source_files(root, extensions):
+        try:
+            files.append((path, language, file_hash(path)))
+        except OSError:
+            files.append((path, language, None))
+    return files
+
+
+async def run_project(root: str, worker: Worker, namespace: str, version: str,
+                      cache_path: Optional[str] = CACHE_PATH, max_workers: Optional[int] = None,
+                      chunk_size: int = CHUNK_SIZE,
+                      extensions: Dict[str, str] = SOURCE_EXTENSIONS) -> AsyncIterator[Dict[str, Any]]:
+    """تشغيل worker على ملفات المشروع وبث النتائج
+
+    worker دالة على مستوى الوحدة (تُنقل إلى العمليات الفرعية) تستقبل دفعة
+    [(المسار، اللغة)] وتعيد لكل ملف قاموساً فيه path و content_hash.
+    كل سجل ملف يحمل "type": "file"، وآخر سجل ملخص "type": "summary".
+    """
+    started = time.perf_counter()
+    root = os.path.abspath(root)
+    files = await asyncio.to_thread(_scan_tree, root, extensions)
+    cache = ResultCache(cache_path) if cache_path else None
+
+    summary = {"type": "summary", "root": root, "files": len(files), "cached": 0, "analyzed": 0, "errors": 0}
+
+    def record(path: str, result: Dict[str, Any], cached: bool) -> Dict[str, Any]:
+        if "error" in result:
+            summary["errors"] += 1
+        return {**result, "type": "file", "path": os.path.relpath(path, root), "cached": cached}
+
+    pending = []
+    cached_results = {}
+    if cache:
+        hashes = [content_hash for _, _, content_hash in files if content_hash]
+        cached_results = await asyncio.to_thread(cache.get_many, namespace, version, hashes)
+    for path, language, content_hash in files:
+        if content_hash is None:
+            yield record(path, {"language": language, "error": "تعذرت قراءة الملف"}, False)
+        elif content_hash in cached_results:
+            summary["cached"] += 1
+            yield record(path, {**cached_results[content_hash], "content_hash": content_hash}, True)
+        else:
+            pending.append((path, language))
+
+    if pending:
+        chunks = [pending[start:start + chunk_size] for start in range(0, len(pending), chunk_size)]
+        workers = max(1, min(max_workers or os.cpu_count() or 1, len(chunks)))
+        loop = asyncio.get_running_loop()
+        # spawn: لا ترث العمليات الفرعية أقفال الخيوط العاملة في العملية الرئيسية
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        # الدفعة التي تعالجها كل مهمة، لتحويل فشلها إلى سجلات أخطاء لملفاتها
+        running: Dict[asyncio.Future, List[Tuple[str, str]]] = {}
+
+        def submit(chunk: List[Tuple[str, str]]):
+            try:
+                future = loop.run_in_executor(pool, worker, chunk)
+            except Exception as e:
+                # مجموعة معطلة (BrokenProcessPool) ترفض الدفعات الجديدة فوراً
+                future = loop.create_future()
+                future.set_exception(e)
+            running[future] = chunk
+
+        try:
+            # عدد محدود من الدفعات قيد التنفيذ فلا تتراكم النتائج في الذاكرة
+            queued = iter(chunks)
+            for chunk in queued:
+                submit(chunk)
+                if len(running) >= workers * 2:
+                    break
+
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    chunk = running.pop(future)
+                    try:
+                        results = future.result()
+                    except Exception as e:
+                        # انهيار عملية فرعية لا يُسقط نتائج الدفعات الأخرى
+                        error = f"{type(e).__name__}: {e}"
+                        for path, language in chunk:
+                            summary["analyzed"] += 1
+                            yield record(path, {"language": language, "error": error}, False)
+                        results = []
+                    if cache:
+                        await asyncio.to_thread(cache.put_many, namespace, version, [
+                            (result["content_hash"], {k: v for k, v in result.items() if k not in ("path", "content_hash")})
+                            for result in results if result.get("content_hash") and "error" not in result
+                        ])
+                    for result in results:
+                        summary["analyzed"] += 1
+                        yield record(result["path"], result, False)
+                    next_chunk = next(queued, None)
+                    if next_chunk is not None:
+                        submit(next_chunk)
+        finally:
+            # الخروج من with ينتظر العمليات فيحجب حلقة الأحداث، حتى عند إغلاق المولد مبكراً
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    summary["elapsed"] = time.perf_counter() - started
+    yield summary
+
+
+def optimize_files(files: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    """تقييم دفعة ملفات مع اقتراح تحسيناتها (يعمل داخل العمليات الفرعية، دون قياس الزمن)
+
+    ملفات المشروع لا تُشغل، فلا يُتحقق من تطابق سلوك الكود المعاد كتابته كما في
+    IntelligentCodeOptimizer.optimize_code: التحويلات تُعرض اقتراحات
+    (suggested_optimizations و suggested_code) والمقاييس للملف كما هو.
+    """
+    results = []
+    for path, language in files:
+        try:
+            code, content_hash = read_source(path)
+        except OSError as e:
+            results.append({"path": path, "language": language, "error": str(e)})
+            continue
+
+        result = {"path": path, "language": language, "content_hash": content_hash, "suggested_optimizations": []}
+        try:
+            if language == "python":
+                suggested, changes = rewrite_python(code)
+                if changes:
+                    result["suggested_optimizations"] = changes
+                    result["suggested_code"] = suggested
+            metrics = compute_code_metrics(code, language)
+        except Exception as e:
+            results.append({"path": path, "language": language, "error": f"{type(e).__name__}: {e}"})
+            continue
+
+        result["readability_score"] = readability_score(metrics)
+        result["maintainability_score"] = maintainability_score(metrics)
+        result["metrics"] = metrics
+        results.append(result)
+    return results
+
+
+async def _write_report(records: AsyncIterator[Dict[str, Any]], output_format: str = "ndjson"):
+    if output_format == "sarif":
+        from security_rules import stream_sarif
+
+        async for chunk in stream_sarif(records):
+            sys.stdout.write(chunk)
+            sys.stdout.flush()
+        return
+    async for item in records:
+        sys.stdout.write(json.dumps(item, ensure_ascii=False) + "\n")
+        sys.stdout.flush()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="تحليل مشروع كامل بالتوازي")
+    parser.add_argument("command", choices=["optimize", "scan"])
+    parser.add_argument("root")
+    parser.add_argument("--cache", default=CACHE_PATH, help="قاعدة بيانات النتائج المخزنة")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--format", choices=["ndjson", "sarif"], default="ndjson")
+    args = parser.parse_args(argv)
+    if args.format == "sarif" and args.command != "scan":
+        parser.error("صيغة SARIF متاحة لأمر scan فقط")
+
+    cache_path = None if args.no_cache else args.cache
+    if args.command == "scan":
+        # استيراد متأخر: security_rules يستورد هذه الوحدة
+        from security_rules import RULESET_VERSION, scan_files
+
+        records = run_project(args.root, scan_files, "security", RULESET_VERSION,
+                              cache_path=cache_path, max_workers=args.workers)
+    else:
+        records = run_project(args.root, optimize_files, "optimize", OPTIMIZER_VERSION,
+                              cache_path=cache_path, max_workers=args.workers)
+    asyncio.run(_write_report(records, args.format))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+تشغيل العمليات الفرعية مع قياس الموارد
+Sandboxed subprocess execution with resource accounting
+"""
+
+import asyncio
+import os
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+from typing import Dict, List, Any, Optional
+
+
+def run_process(args: List[str], timeout: float, on_start=None, preexec_fn=None,
+                cwd: Optional[str] = None) -> Dict[str, Any]:
+    """تشغيل عملية فرعية وانتظارها عبر wait4 للحصول على استهلاكها للموارد"""
+    # المخرجات تُكتب في ملفات مؤقتة حتى لا تمتلئ الأنابيب أثناء انتظار wait4
+    with tempfile.TemporaryFile() as stdout_file, tempfile.TemporaryFile() as stderr_file:
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            args, stdin=subprocess.DEVNULL, stdout=stdout_file, stderr=stderr_file,
+            preexec_fn=preexec_fn, cwd=cwd
+        )
+        if on_start:
+            on_start(process)
+
+        timed_out = threading.Event()
+
+        def kill_on_timeout():
+            timed_out.set()
+            process.kill()
+
+        timer = threading.Timer(timeout, kill_on_timeout)
+        timer.start()
+        try:
+            _, status, usage = os.wait4(process.pid, 0)
+        finally:
+            timer.cancel()
+
+        wall_time = time.perf_counter() - started
+        process.returncode = os.waitstatus_to_exitcode(status)
+
+        stdout_file.seek(0)
+        stderr_file.seek(0)
+
+        return {
+            "returncode": process.returncode,
+            "stdout": stdout_file.read().decode("utf-8", errors="replace"),
+            "stderr": stderr_file.read().decode("utf-8", errors="replace"),
+            "timed_out": timed_out.is_set(),
+            "resources": {
+                "wall_time": wall_time,
+                "cpu_user": usage.ru_utime,
+                "cpu_system": usage.ru_stime,
+                # ru_maxrss بالكيلوبايت على Linux
+                "max_rss_kb": usage.ru_maxrss
+            }
+        }
+
+
+def termination_reason(process: Dict[str, Any], timeout_message: str = "انتهت مهلة التنفيذ") -> str:
+    """سبب انتهاء العملية الفرعية دون نتيجة (المهلة أو حدود الموارد أو خطأ)"""
+    if process["timed_out"]:
+        return timeout_message
+    if process["returncode"] == -signal.SIGXCPU:
+        return "تجاوز حد وقت المعالج"
+    if process["returncode"] == -signal.SIGKILL:
+        return "أُنهيت العملية (غالباً لتجاوز حد الذاكرة)"
+    return process["stderr"][-500:] or f"انتهت العملية بالرمز {process['returncode']}"
+
+
+async def run_process_async(args: List[str], timeout: float, **kwargs) -> Dict[str, Any]:
+    """نسخة غير متزامنة من run_process (إلغاء المهمة يقتل العملية)"""
+    started = {}
+
+    def on_start(process):
+        started["process"] = process
+
+    try:
+        return await asyncio.to_thread(run_process, args, timeout, on_start=on_start, **kwargs)
+    except asyncio.CancelledError:
+        process = started.get("process")
+        if process is not None and process.returncode is None:
+            process.kill()
+        raise
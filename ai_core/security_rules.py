@@ -0,0 +1,250 @@
+"""
+قواعد فحص الأمان ومُجمّعها
+Security rules compiled once per language into a single-pass scanner
+
+كل قاعدة تحمل كلمات حرفية (literals) لا يمكن أن تتطابق دونها. تُجمع كلمات
+كل القواعد في تعبير واحد يمر على الكود مرة واحدة، فلا يُشغّل تعبير القاعدة
+إلا إذا ظهرت إحدى كلماتها. أرقام الأسطر تُحسب ببحث ثنائي في مواضع فواصل
+الأسطر المحفوظة في الذاكرة المشتركة (parsed_source).
+"""
+
+import hashlib
+import json
+import re
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from parsed_source import get_parsed_source
+from project_runner import read_source
+
+SECURITY_RULES: Dict[str, List[Dict[str, Any]]] = {
+    "python": [
+        {
+            "rule_id": "SQL_INJECTION",
+            "pattern": r".*execute\(.*%.*\)",
+            "literals": ["execute("],
+            "severity": "HIGH",
+            "description": "احتمالية SQL Injection"
+        },
+        {
+            "rule_id": "HARDCODED_PASSWORD",
+            "pattern": r"password\s*=\s*['\"][^'\"]+['\"]",
+            "literals": ["password"],
+            "severity": "MEDIUM",
+            "description": "كلمة مرور مكتوبة في الكود"
+        },
+        {
+            "rule_id": "UNSAFE_EVAL",
+            "pattern": r"eval\s*\(",
+            "literals": ["eval"],
+            "severity": "HIGH",
+            "description": "استخدام eval() غير آمن"
+        }
+    ],
+    "javascript": [
+        {
+            "rule_id": "XSS_VULNERABILITY",
+            "pattern": r"innerHTML\s*=.*\+",
+            "literals": ["innerhtml"],
+            "severity": "HIGH",
+            "description": "احتمالية XSS"
+        },
+        {
+            "rule_id": "UNSAFE_EVAL",
+            "pattern": r"eval\s*\(",
+            "literals": ["eval"],
+            "severity": "HIGH",
+            "description": "استخدام eval() غير آمن"
+        }
+    ]
+}
+
+FIX_SUGGESTIONS = {
+    "SQL_INJECTION": "استخدم parameterized queries أو prepared statements",
+    "HARDCODED_PASSWORD": "استخدم متغيرات البيئة أو ملفات التكوين الآمنة",
+    "UNSAFE_EVAL": "تجنب استخدام eval() واستخدم بدائل آمنة",
+    "XSS_VULNERABILITY": "استخدم textContent بدلاً من innerHTML أو قم بتنظيف البيانات"
+}
+
+DEFAULT_FIX_SUGGESTION = "راجع الوثائق الأمنية للغة البرمجة"
+
+SEVERITY_WEIGHTS = {
+    "CRITICAL": 30,
+    "HIGH": 20,
+    "MEDIUM": 10,
+    "LOW": 5
+}
+
+# أي تعديل على القواعد يغير الإصدار فتُبطل النتائج المخزنة للفحص
+RULESET_VERSION = hashlib.blake2b(
+    json.dumps([SECURITY_RULES, FIX_SUGGESTIONS], sort_keys=True).encode("utf-8"), digest_size=8
+).hexdigest()
+
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+SARIF_LEVELS = {"CRITICAL": "error", "HIGH": "error", "MEDIUM": "warning", "LOW": "note"}
+
+def fix_suggestion(rule_id: str) -> str:
+    """اقتراح الإصلاح للقاعدة"""
+    return FIX_SUGGESTIONS.get(rule_id, DEFAULT_FIX_SUGGESTION)
+
+
+class RuleSet:
+    """قواعد لغة واحدة مُجمّعة مرة واحدة"""
+
+    FLAGS = re.MULTILINE | re.IGNORECASE
+
+    def __init__(self, rules: List[Dict[str, Any]]):
+        self.rules = rules
+        self._patterns = [re.compile(rule["pattern"], self.FLAGS) for rule in rules]
+
+        # الكلمة الحرفية -> القواعد التي تحتاجها
+        by_literal: Dict[str, set] = {}
+        self._always = set()
+        for index, rule in enumerate(rules):
+            literals = rule.get("literals")
+            if not literals:
+                # قاعدة بلا كلمات حرفية تُشغّل دائماً
+                self._always.add(index)
+                continue
+            for literal in literals:
+                by_literal.setdefault(literal.lower(), set()).add(index)
+
+        # المطابقات لا تتداخل، فالكلمة الأطول تُفعّل أيضاً قواعد ما تحتويه من كلمات
+        self._triggers = {
+            literal: set().union(*(indices for other, indices in by_literal.items() if other in literal))
+            for literal in by_literal
+        }
+        self._prefilter: Optional[re.Pattern] = None
+        if by_literal:
+            alternatives = sorted(by_literal, key=len, reverse=True)
+            self._prefilter = re.compile("|".join(map(re.escape, alternatives)), re.IGNORECASE)
+
+    def _triggered(self, code: str) -> List[int]:
+        """القواعد التي ظهرت كلماتها الحرفية في الكود"""
+        triggered = set(self._always)
+        if self._prefilter is not None:
+            for match in self._prefilter.finditer(code):
+                triggered |= self._triggers[match.group(0).lower()]
+                if len(triggered) == len(self.rules):
+                    break
+        return sorted(triggered)
+
+    def scan(self, code: str) -> List[Dict[str, Any]]:
+        """الثغرات المكتشفة مرتبة حسب القاعدة ثم الموضع"""
+        vulnerabilities = []
+        parsed = None
+        for index in self._triggered(code):
+            rule = self.rules[index]
+            for match in self._patterns[index].finditer(code):
+                if parsed is None:
+                    # مواضع الأسطر من الذاكرة المشتركة (تُحسب مرة لكل نص)
+                    parsed = get_parsed_source(code)
+                vulnerabilities.append({
+                    "rule_id": rule["rule_id"],
+                    "severity": rule["severity"],
+                    "description": rule["description"],
+                    "line_number": parsed.line_of(match.start()),
+                    "code_snippet": match.group(0),
+                    "fix_suggestion": fix_suggestion(rule["rule_id"])
+                })
+        return vulnerabilities
+
+
+_RULE_SETS: Dict[str, RuleSet] = {}
+
+
+def rule_set(language: str) -> Optional[RuleSet]:
+    """مجموعة القواعد المُجمّعة للغة (None إذا لم تكن لها قواعد)"""
+    language = language.lower()
+    if language not in SECURITY_RULES:
+        return None
+    compiled = _RULE_SETS.get(language)
+    if compiled is None:
+        compiled = _RULE_SETS[language] = RuleSet(SECURITY_RULES[language])
+    return compiled
+
+
+def scan_source(code: str, language: str) -> List[Dict[str, Any]]:
+    """فحص كود بقواعد لغته"""
+    compiled = rule_set(language)
+    return compiled.scan(code) if compiled else []
+
+
+def security_score(vulnerabilities: List[Dict[str, Any]]) -> float:
+    """نقاط الأمان: 100 مطروحاً منها وزن خطورة كل ثغرة"""
+    if not vulnerabilities:
+        return 100.0
+    total_deduction = sum(SEVERITY_WEIGHTS.get(vuln["severity"], 5) for vuln in vulnerabilities)
+    return max(0, 100 - total_deduction)
+
+
+def scan_files(files: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    """فحص دفعة ملفات (يعمل داخل العمليات الفرعية لـ project_runner)"""
+    results = []
+    for path, language in files:
+        try:
+            code, content_hash = read_source(path)
+        except OSError as e:
+            results.append({"path": path, "language": language, "error": str(e)})
+            continue
+        vulnerabilities = scan_source(code, language)
+        results.append({
+            "path": path,
+            "language": language,
+            "content_hash": content_hash,
+            "vulnerabilities": vulnerabilities,
+            "security_score": security_score(vulnerabilities)
+        })
+    return results
+
+
+def _sarif_rules() -> List[Dict[str, Any]]:
+    rules = {}
+    for language_rules in SECURITY_RULES.values():
+        for rule in language_rules:
+            rules.setdefault(rule["rule_id"], {
+                "id": rule["rule_id"],
+                "shortDescription": {"text": rule["description"]},
+                "help": {"text": fix_suggestion(rule["rule_id"])},
+                "defaultConfiguration": {"level": SARIF_LEVELS.get(rule["severity"], "warning")}
+            })
+    return list(rules.values())
+
+
+def _sarif_result(path: str, vulnerability: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "ruleId": vulnerability["rule_id"],
+        "level": SARIF_LEVELS.get(vulnerability["severity"], "warning"),
+        "message": {"text": f"{vulnerability['description']} - {vulnerability['fix_suggestion']}"},
+        "locations": [{
+            "physicalLocation": {
+                "artifactLocation": {"uri": path.replace("\\", "/")},
+                "region": {
+                    "startLine": vulnerability["line_number"],
+                    "snippet": {"text": vulnerability["code_snippet"]}
+                }
+            }
+        }]
+    }
+
+
+async def stream_sarif(records: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    """تحويل سجلات فحص المشروع إلى مستند SARIF 2.1.0 يُكتب على أجزاء
+
+    النتائج تُكتب فور وصولها، والملخص يُضاف في خصائص التشغيل في النهاية.
+    """
+    driver = {"name": "nexoratrix-security", "version": RULESET_VERSION, "rules": _sarif_rules()}
+    header = {"version": "2.1.0", "$schema": SARIF_SCHEMA}
+    yield json.dumps(header, ensure_ascii=False)[:-1]
+    yield ', "runs": [{"tool": ' + json.dumps({"driver": driver}, ensure_ascii=False) + ', "results": ['
+
+    separator = ""
+    summary: Dict[str, Any] = {}
+    async for record in records:
+        if record.get("type") == "summary":
+            summary = record
+            continue
+        for vulnerability in record.get("vulnerabilities", ()):
+            yield separator + json.dumps(_sarif_result(record["path"], vulnerability), ensure_ascii=False)
+            separator = ", "
+
+    yield '], "properties": ' + json.dumps({"summary": summary}, ensure_ascii=False) + "}]}\n"
@@ -0,0 +1,135 @@
+"""
+فهرس التشابه بين المهام (MinHash + LSH)
+Near-duplicate task index using MinHash signatures and LSH banding
+"""
+
+import base64
+import hashlib
+import os
+import random
+import re
+import threading
+from array import array
+from typing import Dict, List, Any, Optional, Tuple
+
+# أكبر عدد أولي من شكل مرسين أقل من 2^64 لحساب التبديلات العشوائية
+MERSENNE_PRIME = (1 << 61) - 1
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def shingles(text: str) -> set:
+    """الكلمات وأزواج الكلمات المتتالية بعد التوحيد"""
+    tokens = TOKEN_PATTERN.findall(text.lower())
+    return set(tokens) | {f"{a} {b}" for a, b in zip(tokens, tokens[1:])}
+
+
+def task_text(description: str, requirements: List[str]) -> str:
+    """النص الذي يُفهرس لكل مهمة"""
+    return " ".join([description, *sorted(req.lower() for req in requirements)])
+
+
+class MinHashLSHIndex:
+    """فهرس MinHash مع تقسيم LSH إلى نطاقات
+
+    كل مهمة تُمثل بتوقيع من num_perm قيمة، ويُقسم التوقيع إلى bands نطاقاً.
+    المهام التي تتطابق في نطاق واحد على الأقل تُعد مرشحة، ثم يُقدر تشابه
+    Jaccard من التوقيعين. الإدخالات تُلحق بملف على القرص فلا يُعاد بناء
+    الفهرس إلا عند التشغيل.
+    """
+
+    def __init__(self, path: Optional[str] = "ai_task_index.dat", num_perm: int = 128,
+                 bands: int = 16, threshold: float = 0.8, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm يجب أن يقبل القسمة على bands")
+        self.path = path
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+
+        rng = random.Random(seed)
+        self._permutations = [
+            (rng.randrange(1, MERSENNE_PRIME), rng.randrange(0, MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+        self.signatures: Dict[str, Tuple[str, array]] = {}
+        self.buckets: Dict[Tuple[str, int, bytes], List[str]] = {}
+        self._lock = threading.Lock()
+
+        if path and os.path.exists(path):
+            self._load()
+
+    def signature(self, text: str) -> array:
+        """توقيع MinHash للنص"""
+        values = [
+            int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+            for shingle in shingles(text)
+        ]
+        signature = array("Q", [MERSENNE_PRIME] * self.num_perm)
+        if not values:
+            return signature
+        for index, (a, b) in enumerate(self._permutations):
+            signature[index] = min((a * value + b) % MERSENNE_PRIME for value in values)
+        return signature
+
+    def _band_keys(self, language: str, signature: array):
+        """مفاتيح النطاقات (اللغة جزء من المفتاح فلا تتشابه مهام لغات مختلفة)"""
+        for band in range(self.bands):
+            start = band * self.rows
+            yield (language, band, signature[start:start + self.rows].tobytes())
+
+    def _insert(self, task_id: str, language: str, signature: array):
+        self.signatures[task_id] = (language, signature)
+        for key in self._band_keys(language, signature):
+            self.buckets.setdefault(key, []).append(task_id)
+
+    def add(self, task_id: str, language: str, text: str):
+        """إضافة مهمة إلى الفهرس وإلحاقها بملف الفهرس"""
+        language = language.lower()
+        signature = self.signature(text)
+        with self._lock:
+            if task_id in self.signatures:
+                return
+            self._insert(task_id, language, signature)
+            if self.path:
+                encoded = base64.b64encode(signature.tobytes()).decode("ascii")
+                with open(self.path, "a", encoding="utf-8") as index_file:
+                    index_file.write(f"{task_id}\t{language}\t{encoded}\n")
+
+    def _load(self):
+        """تحميل الفهرس من القرص (يُتجاهل السطر الأخير إذا كان مبتوراً)"""
+        with open(self.path, "r", encoding="utf-8") as index_file:
+            for line in index_file:
+                parts = line.rstrip("\n").split("\t")
+                if len(parts) != 3:
+                    continue
+                signature = array("Q")
+                try:
+                    signature.frombytes(base64.b64decode(parts[2]))
+                except ValueError:
+                    continue
+                if len(signature) == self.num_perm:
+                    self._insert(parts[0], parts[1], signature)
+
+    def query(self, language: str, text: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """المهام المشابهة مرتبة تنازلياً حسب التشابه المقدر"""
+        language = language.lower()
+        signature = self.signature(text)
+        with self._lock:
+            candidates = set()
+            for key in self._band_keys(language, signature):
+                candidates.update(self.buckets.get(key, ()))
+
+            matches = []
+            for task_id in candidates:
+                other = self.signatures[task_id][1]
+                similarity = sum(1 for x, y in zip(signature, other) if x == y) / self.num_perm
+                if similarity >= self.threshold:
+                    matches.append({"task_id": task_id, "similarity": similarity})
+
+        matches.sort(key=lambda match: match["similarity"], reverse=True)
+        return matches[:limit]
+
+    def __len__(self) -> int:
+        return len(self.signatures)
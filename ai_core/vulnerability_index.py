@@ -0,0 +1,349 @@
+"""
+فهرس ثغرات التبعيات
+Memory-mapped, sorted advisory dataset with O(log n) lookups per dependency
+
+ملف البيانات نصي مفصول بعلامات التبويب ومرتب بايتياً، سطر لكل نطاق متأثر:
+
+    ecosystem  package  introduced  fixed  advisory_id  severity  description
+
+introduced فارغ يعني كل الإصدارات السابقة، و fixed فارغ يعني أنه لا يوجد
+إصدار مُصلح. الأسطر التي تبدأ بـ # تعليقات. الملف يُربط بالذاكرة (mmap) فلا
+يُحمّل عند التشغيل، ويُبحث فيه ثنائياً عن أول سطر للحزمة.
+"""
+
+import ast
+import mmap
+import os
+import re
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from parsed_source import get_parsed_source
+
+DEFAULT_DATASET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "vulnerabilities.tsv")
+
+# اسم الوحدة المستوردة -> اسم الحزمة في PyPI عند اختلافهما
+PYTHON_IMPORT_ALIASES = {
+    "yaml": "pyyaml",
+    "PIL": "pillow",
+    "sklearn": "scikit-learn",
+    "cv2": "opencv-python",
+    "bs4": "beautifulsoup4",
+    "jwt": "pyjwt",
+    "Crypto": "pycryptodome",
+    "dateutil": "python-dateutil",
+}
+
+NODE_BUILTINS = {
+    "assert", "buffer", "child_process", "crypto", "events", "fs", "http", "https",
+    "net", "os", "path", "querystring", "stream", "url", "util", "zlib",
+}
+
+LANGUAGE_ECOSYSTEMS = {"python": "pypi", "javascript": "npm", "java": "maven"}
+
+JS_IMPORT = re.compile(r"""(?:\brequire\s*\(\s*|\bimport\s*\(\s*|\bfrom\s+|\bimport\s+)['"]([^'"\n]+)['"]""")
+JAVA_IMPORT = re.compile(r"^[ \t]*import\s+(?:static\s+)?([\w.]+)", re.MULTILINE)
+VERSION_PATTERN = re.compile(r"v?(\d+(?:\.\d+)*)(.*)")
+SUFFIX_PATTERN = re.compile(r"[-_.]?([a-z]*)[-_.]?(\d*)")
+# مراحل ما قبل الإصدار النهائي وبعده (المراحل غير المعروفة تُعد قبل النهائي)
+VERSION_PHASES = {
+    "dev": -4, "alpha": -3, "a": -3, "beta": -2, "b": -2,
+    "rc": -1, "c": -1, "pre": -1, "post": 1, "r": 1,
+}
+PIN_PATTERNS = {
+    "pypi": re.compile(r"^\s*([A-Za-z0-9][\w.-]*)\s*(?:\[[^\]]*\])?\s*(?:===?\s*([\w.!+-]+))?\s*(?:[;#].*)?$"),
+    "npm": re.compile(r"^\s*(@?[\w.-]+(?:/[\w.-]+)?)(?:@[\^~=]?([\w.+-]+))?\s*$"),
+    "maven": re.compile(r"^\s*([\w.-]+):([\w.-]+)(?::([\w.+-]+))?\s*$"),
+}
+
+# أقصى عدد مكونات يُجرب من مسار استيراد Java كمعرف مجموعة
+JAVA_GROUP_DEPTH = 5
+
+
+@dataclass
+class Dependency:
+    """تبعية مستخرجة من الكود أو من المتطلبات"""
+    ecosystem: str
+    name: str
+    version: Optional[str] = None
+    line: Optional[int] = None
+    # أسماء محتملة بديلة للمطابقة الداخلية فقط (بادئات مجموعة Java، الأطول أولاً)
+    candidates: Tuple[str, ...] = field(default=(), repr=False, compare=False)
+
+
+def normalize_package(ecosystem: str, name: str) -> str:
+    """توحيد اسم الحزمة (PEP 503 لـ PyPI)"""
+    if ecosystem == "pypi":
+        return re.sub(r"[-_.]+", "-", name).lower()
+    return name.lower()
+
+
+def parse_version(version: str) -> Tuple:
+    """مفتاح مقارنة للإصدار: الأرقام دون الأصفار الزائدة ثم مرحلة الإصدار ورقمها
+
+    1.0 == 1.0.0، و 2.0-beta8 < 2.0-beta9 < 2.0rc1 < 2.0 < 2.0.post1 < 2.0.1.
+    """
+    match = VERSION_PATTERN.match(version.strip())
+    if not match:
+        return ((), 0, 0)
+    release = [int(part) for part in match.group(1).split(".")]
+    while len(release) > 1 and release[-1] == 0:
+        release.pop()
+    suffix = SUFFIX_PATTERN.match(match.group(2).lower())
+    if not suffix or not suffix.group(1):
+        # إصدار نهائي (أو بيانات بناء محلية بعد +)
+        return (tuple(release), 0, 0)
+    phase = VERSION_PHASES.get(suffix.group(1), -1)
+    return (tuple(release), phase, int(suffix.group(2) or 0))
+
+
+def version_affected(version: str, introduced: str, fixed: str) -> bool:
+    """هل الإصدار ضمن النطاق [introduced, fixed)"""
+    key = parse_version(version)
+    if introduced and key < parse_version(introduced):
+        return False
+    if fixed and key >= parse_version(fixed):
+        return False
+    return True
+
+
+def write_dataset(path: str, advisories: Iterable[Dict[str, Any]]):
+    """كتابة ملف بيانات مرتب من قائمة نصائح (لاستيراد قواعد بيانات خارجية)"""
+    lines = []
+    for advisory in advisories:
+        ecosystem = advisory["ecosystem"].lower()
+        fields = [
+            ecosystem,
+            normalize_package(ecosystem, advisory["package"]),
+            advisory.get("introduced") or "",
+            advisory.get("fixed") or "",
+            advisory["advisory_id"],
+            advisory.get("severity", "MEDIUM"),
+            advisory.get("description", ""),
+        ]
+        lines.append("\t".join(field.replace("\t", " ").replace("\n", " ") for field in fields).encode("utf-8"))
+    lines.sort()
+    with open(path, "wb") as dataset:
+        for line in lines:
+            dataset.write(line + b"\n")
+
+
+class VulnerabilityIndex:
+    """بحث ثنائي في ملف البيانات المربوط بالذاكرة"""
+
+    def __init__(self, path: str = DEFAULT_DATASET):
+        self.path = path
+        self._file = None
+        self._map: Optional[mmap.mmap] = None
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            self._file = open(path, "rb")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+            self._map = self._file = None
+
+    def _next_line_start(self, position: int) -> int:
+        """أول بداية سطر عند الموضع أو بعده"""
+        if position == 0:
+            return 0
+        newline = self._map.find(b"\n", position - 1)
+        return len(self._map) if newline == -1 else newline + 1
+
+    def _line_end(self, start: int) -> int:
+        newline = self._map.find(b"\n", start)
+        return len(self._map) if newline == -1 else newline
+
+    def _lower_bound(self, key: bytes) -> int:
+        """بداية أول سطر لا يقل عن المفتاح
+
+        الثابت: كل سطر يبدأ قبل low أصغر من المفتاح، وكل سطر يبدأ عند high
+        أو بعده لا يقل عنه. low دائماً بداية سطر.
+        """
+        data = self._map
+        low, high = 0, len(data)
+        while low < high:
+            start = self._next_line_start((low + high) // 2)
+            if start >= high:
+                # لا تبدأ أسطر في النصف الأعلى: يُفحص السطر عند low
+                start = low
+            end = self._line_end(start)
+            if data[start:end] < key:
+                low = end + 1
+            else:
+                high = start
+        return min(low, len(data))
+
+    def advisories(self, ecosystem: str, package: str) -> List[Dict[str, str]]:
+        """كل النطاقات المسجلة للحزمة"""
+        if self._map is None:
+            return []
+        ecosystem = ecosystem.lower()
+        key = f"{ecosystem}\t{normalize_package(ecosystem, package)}\t".encode("utf-8")
+        data = self._map
+        position = self._lower_bound(key)
+        results = []
+        while position < len(data) and data[position:position + len(key)] == key:
+            end = self._line_end(position)
+            fields = data[position:end].decode("utf-8").split("\t")
+            if len(fields) >= 7:
+                results.append({
+                    "ecosystem": fields[0],
+                    "package": fields[1],
+                    "introduced": fields[2],
+                    "fixed": fields[3],
+                    "advisory_id": fields[4],
+                    "severity": fields[5],
+                    "description": fields[6],
+                })
+            position = end + 1
+        return results
+
+    def lookup(self, ecosystem: str, package: str, version: Optional[str] = None) -> List[Dict[str, str]]:
+        """النصائح التي تنطبق على الإصدار
+
+        دون إصدار معروف تُعاد النطاقات المفتوحة فقط (لا يوجد إصدار مُصلح)،
+        لأن أي إصدار مثبت من الحزمة متأثر بها.
+        """
+        matches = []
+        for advisory in self.advisories(ecosystem, package):
+            if version is None:
+                if not advisory["fixed"]:
+                    matches.append(advisory)
+            elif version_affected(version, advisory["introduced"], advisory["fixed"]):
+                matches.append(advisory)
+        return matches
+
+    def resolve(self, dependency: Dependency) -> str:
+        """أول اسم محتمل للتبعية له نصائح في البيانات، وإلا اسمها"""
+        for name in dependency.candidates:
+            if self.advisories(dependency.ecosystem, name):
+                return name
+        return dependency.name
+
+    def check(self, dependencies: Iterable[Dependency]) -> List[Dict[str, Any]]:
+        """النصائح المنطبقة على قائمة تبعيات
+
+        التبعيات ذات الأسماء المحتملة تُحل إلى الاسم المطابق في البيانات
+        (يُحدّث name وتُفرغ candidates)، وتُفحص كل حزمة محلولة مرة واحدة.
+        """
+        findings = []
+        seen = set()
+        for dependency in dependencies:
+            if dependency.candidates:
+                dependency.name = self.resolve(dependency)
+                dependency.candidates = ()
+            key = (dependency.ecosystem, normalize_package(dependency.ecosystem, dependency.name))
+            if key in seen:
+                continue
+            seen.add(key)
+            for advisory in self.lookup(dependency.ecosystem, dependency.name, dependency.version):
+                findings.append({**advisory, "version": dependency.version, "line": dependency.line})
+        return findings
+
+
+def _python_imports(code: str) -> List[Dependency]:
+    try:
+        tree = get_parsed_source(code).tree
+    except SyntaxError:
+        return []
+    stdlib = set(getattr(sys, "stdlib_module_names", ())) | set(sys.builtin_module_names)
+    dependencies = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            modules = [node.module]
+        else:
+            continue
+        for module in modules:
+            top = module.split(".")[0]
+            if top in stdlib or top == "__future__":
+                continue
+            dependencies.append(Dependency("pypi", PYTHON_IMPORT_ALIASES.get(top, top), line=node.lineno))
+    return dependencies
+
+
+def _javascript_imports(code: str) -> List[Dependency]:
+    parsed = get_parsed_source(code)
+    dependencies = []
+    for match in JS_IMPORT.finditer(code):
+        specifier = match.group(1)
+        if specifier.startswith((".", "/", "node:")):
+            continue
+        parts = specifier.split("/")
+        name = "/".join(parts[:2]) if specifier.startswith("@") else parts[0]
+        if name in NODE_BUILTINS:
+            continue
+        dependencies.append(Dependency("npm", name, line=parsed.line_of(match.start())))
+    return dependencies
+
+
+def _java_imports(code: str) -> List[Dependency]:
+    parsed = get_parsed_source(code)
+    dependencies = []
+    for match in JAVA_IMPORT.finditer(code):
+        parts = match.group(1).split(".")
+        if parts[0] in ("java", "javax") or len(parts) < 3:
+            continue
+        # معرف المجموعة غير معروف من الاستيراد: البادئات المحتملة تُطابق داخلياً
+        # ويُبلغ عن مسار الحزمة حتى تُحل إلى متطلب مثبت أو مجموعة في البيانات
+        candidates = tuple(
+            ".".join(parts[:depth]) for depth in range(min(len(parts) - 1, JAVA_GROUP_DEPTH), 1, -1)
+        )
+        dependencies.append(Dependency("maven", candidates[0], line=parsed.line_of(match.start(1)),
+                                       candidates=candidates))
+    return dependencies
+
+
+def parse_requirement(requirement: str, ecosystem: str) -> Optional[Dependency]:
+    """تبعية من سطر متطلبات (requests==2.19.0، lodash@4.17.11، group:artifact:version)"""
+    pattern = PIN_PATTERNS.get(ecosystem)
+    match = pattern.match(requirement) if pattern else None
+    if not match:
+        return None
+    if ecosystem == "maven":
+        return Dependency("maven", match.group(1), match.group(3))
+    return Dependency(ecosystem, match.group(1), match.group(2))
+
+
+def extract_dependencies(code: str, language: str, requirements: Optional[Iterable[str]] = None) -> List[Dependency]:
+    """التبعيات من استيرادات الكود ومن المتطلبات المثبتة الإصدار
+
+    إصدار المتطلبات يُطبق على استيرادات الحزمة نفسها، وتُحذف التكرارات.
+    استيرادات Java تُحل إلى معرف المجموعة في المتطلبات إذا طابقته إحدى بادئاتها.
+    """
+    language = language.lower()
+    ecosystem = LANGUAGE_ECOSYSTEMS.get(language)
+    if ecosystem is None:
+        return []
+
+    pinned: Dict[str, Dependency] = {}
+    for requirement in requirements or ():
+        dependency = parse_requirement(requirement, ecosystem)
+        if dependency is not None:
+            pinned[normalize_package(ecosystem, dependency.name)] = dependency
+
+    extractors = {"python": _python_imports, "javascript": _javascript_imports, "java": _java_imports}
+    dependencies = []
+    seen = set()
+    for dependency in extractors[language](code):
+        for candidate in dependency.candidates:
+            normalized = normalize_package(ecosystem, candidate)
+            if normalized in pinned or normalized in seen:
+                dependency.name = candidate
+                dependency.candidates = ()
+                break
+        name = normalize_package(ecosystem, dependency.name)
+        if name in seen:
+            continue
+        seen.add(name)
+        if name in pinned:
+            dependency.version = pinned.pop(name).version
+        dependencies.append(dependency)
+    # متطلبات لا تظهر في الاستيرادات (تبعيات غير مباشرة أو أسماء مختلفة)
+    dependencies.extend(pinned.values())
+    return dependencies
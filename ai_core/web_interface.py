@@ -4,16 +4,16 @@ Web Interface for Autonomous Programmer
 """
 
 from fastapi import FastAPI, Request, Form, BackgroundTasks
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 import asyncio
 import json
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 import uvicorn
 
-from autonomous_programmer import AutonomousProgrammer
+from autonomous_programmer import AutonomousProgrammer, TenantQuotaExceeded
 
 # إنشاء التطبيق
 app = FastAPI(
@@ -58,22 +58,49 @@ async def dashboard(request: Request):
         "status": status
     })
 
+def quota_exceeded_response(error: TenantQuotaExceeded) -> JSONResponse:
+    """استجابة 429 مع Retry-After عند تجاوز حد العميل"""
+    return JSONResponse({
+        "success": False,
+        "error": str(error),
+        "retry_after": error.retry_after
+    }, status_code=429, headers={"Retry-After": str(error.retry_after)})
+
 @app.post("/add-task")
 async def add_task(
     description: str = Form(...),
     language: str = Form("python"),
     requirements: str = Form(""),
-    complexity: str = Form("medium")
+    complexity: str = Form("medium"),
+    deadline: str = Form(""),
+    client_id: str = Form("default"),
+    depends_on: str = Form("")
 ):
     """إضافة مهمة برمجية جديدة"""
     req_list = [req.strip() for req in requirements.split(",") if req.strip()]
     
-    task_id = await programmer.add_task(
-        description=description,
-        language=language,
-        requirements=req_list,
-        complexity=complexity
-    )
+    try:
+        deadline_at = datetime.fromisoformat(deadline) if deadline else None
+    except ValueError:
+        return JSONResponse({
+            "success": False,
+            "error": "الموعد النهائي يجب أن يكون بصيغة ISO 8601"
+        }, status_code=400)
+    
+    try:
+        task_id = await programmer.add_task(
+            description=description,
+            language=language,
+            requirements=req_list,
+            complexity=complexity,
+            deadline=deadline_at,
+            client_id=client_id,
+            depends_on=[dep.strip() for dep in depends_on.split(",") if dep.strip()]
+        )
+    except TenantQuotaExceeded as e:
+        return quota_exceeded_response(e)
+    except ValueError as e:
+        return JSONResponse({"success": False, "error": str(e)}, status_code=400)
     
     return JSONResponse({
         "success": True,
@@ -91,18 +118,174 @@ async def get_status():
 async def get_tasks():
     """API للحصول على قائمة المهام"""
     return JSONResponse({
-        "tasks_in_queue": len(programmer.task_queue),
-        "tasks": [
-            {
-                "task_id": task.task_id,
-                "description": task.description,
-                "language": task.language,
-                "status": task.status
+        "tasks_in_queue": len(programmer.active_tasks),
+        "tasks": programmer.list_active_tasks()
+    })
+
+# مهلة رسائل الإبقاء على الاتصال في بث الأحداث (بالثواني)
+EVENTS_KEEPALIVE = 15
+
+def format_sse(event_type: str, data: str, event_id: int = None) -> str:
+    """تنسيق حدث بصيغة Server-Sent Events"""
+    prefix = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{prefix}event: {event_type}\ndata: {data}\n\n"
+
+@app.get("/api/events")
+async def stream_events(request: Request):
+    """بث تغيرات المهام والحالة عبر Server-Sent Events"""
+    subscription = programmer.event_bus.subscribe()
+    
+    async def event_stream():
+        try:
+            # لقطة كاملة عند الاتصال ثم التغيرات فقط
+            snapshot = {
+                "status": await programmer.get_status(),
+                "tasks": programmer.list_active_tasks()
             }
-            for task in programmer.task_queue
-        ]
+            yield format_sse("snapshot", json.dumps(snapshot, ensure_ascii=False, default=str))
+            
+            while not subscription.closed:
+                if await request.is_disconnected():
+                    break
+                try:
+                    event_id, event_type, data = await asyncio.wait_for(
+                        subscription.queue.get(), timeout=EVENTS_KEEPALIVE
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event_type, data, event_id)
+        finally:
+            programmer.event_bus.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# الحد الأقصى لعدد المهام في الدفعة الواحدة
+MAX_BATCH_SIZE = 10000
+
+def parse_batch_body(body: bytes) -> List[Any]:
+    """قراءة الدفعة كمصفوفة JSON أو NDJSON"""
+    text = body.decode("utf-8").strip()
+    if text.startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+@app.post("/api/tasks/batch")
+async def add_tasks_batch(request: Request, stream: bool = False):
+    """إضافة دفعة مهام (مصفوفة JSON أو NDJSON) مع بث النتائج اختيارياً"""
+    try:
+        specs = parse_batch_body(await request.body())
+    except (ValueError, UnicodeDecodeError) as e:
+        return JSONResponse({"success": False, "error": f"صيغة غير صالحة: {e}"}, status_code=400)
+    
+    if not isinstance(specs, list) or not specs:
+        return JSONResponse({"success": False, "error": "الدفعة فارغة"}, status_code=400)
+    if len(specs) > MAX_BATCH_SIZE:
+        return JSONResponse({
+            "success": False,
+            "error": f"الحد الأقصى للدفعة {MAX_BATCH_SIZE} مهمة"
+        }, status_code=413)
+    
+    # التحقق من الدفعة كاملة قبل إضافة أي مهمة
+    tasks, errors = programmer.build_batch(specs)
+    if errors:
+        return JSONResponse({"success": False, "errors": errors}, status_code=400)
+    
+    subscription = programmer.event_bus.subscribe() if stream else None
+    try:
+        task_ids = await programmer.add_tasks(tasks)
+    except (TenantQuotaExceeded, ValueError) as e:
+        if subscription is not None:
+            programmer.event_bus.unsubscribe(subscription)
+        if isinstance(e, TenantQuotaExceeded):
+            return quota_exceeded_response(e)
+        return JSONResponse({"success": False, "error": str(e)}, status_code=400)
+    
+    if not stream:
+        return JSONResponse({
+            "success": True,
+            "task_ids": task_ids,
+            "message": f"تم إضافة {len(task_ids)} مهمة بنجاح"
+        })
+    
+    async def results_stream():
+        yield json.dumps({"task_ids": task_ids}, ensure_ascii=False) + "\n"
+        async for result in programmer.watch_tasks(task_ids, subscription):
+            yield json.dumps(result, ensure_ascii=False, default=str) + "\n"
+    
+    return StreamingResponse(results_stream(), media_type="application/x-ndjson")
+
+@app.get("/api/tasks/similar")
+async def get_similar_tasks(description: str, language: str = "python", requirements: str = ""):
+    """المهام المكتملة المشابهة لوصف مهمة جديدة"""
+    req_list = [req.strip() for req in requirements.split(",") if req.strip()]
+    return JSONResponse({
+        "similar_tasks": programmer.find_similar_tasks(description, language, req_list)
+    })
+
+@app.get("/api/tasks/{task_id}")
+async def get_task(task_id: str):
+    """API للحصول على مهمة ونتيجتها"""
+    task = programmer.get_task(task_id)
+    if task is None:
+        return JSONResponse({
+            "success": False,
+            "error": "المهمة غير موجودة"
+        }, status_code=404)
+    return JSONResponse(task)
+
+@app.post("/api/tasks/{task_id}/cancel")
+async def cancel_task(task_id: str):
+    """إلغاء مهمة منتظرة أو قيد التنفيذ"""
+    cancelled = await programmer.cancel_task(task_id)
+    if cancelled is None:
+        return JSONResponse({
+            "success": False,
+            "error": "المهمة غير موجودة"
+        }, status_code=404)
+    if not cancelled:
+        return JSONResponse({
+            "success": False,
+            "error": "المهمة انتهت بالفعل"
+        }, status_code=409)
+    return JSONResponse({
+        "success": True,
+        "task_id": task_id,
+        "message": "تم إلغاء المهمة"
     })
 
+@app.get("/api/results")
+async def get_results(
+    status: Optional[str] = None,
+    language: Optional[str] = None,
+    cursor: Optional[int] = None,
+    limit: int = 50
+):
+    """API لاستعلام نتائج المهام مع ترقيم الصفحات (cursor = آخر id مستلم)"""
+    page = programmer.result_store.query(
+        status=status,
+        language=language,
+        before_id=cursor,
+        limit=limit
+    )
+    return JSONResponse(page)
+
+@app.get("/api/improvement/trends")
+async def get_improvement_trends(resolution: str = "hour", limit: int = 24, metric: Optional[str] = None):
+    """اتجاهات مقاييس دورات التحسين (من التجميعات الساعية أو اليومية)"""
+    try:
+        trends = await asyncio.to_thread(
+            programmer.improvement_engine.metric_trends,
+            resolution, limit, metric.split(",") if metric else None
+        )
+    except ValueError as e:
+        return JSONResponse({"success": False, "error": str(e)}, status_code=400)
+    return JSONResponse(trends)
+
 @app.post("/api/learn")
 async def trigger_learning(topic: str = Form(...)):
     """تشغيل التعلم حول موضوع معين"""
@@ -358,7 +358,7 @@ programmer.internet_learner.search_engines.update({
 })
 
 # تخصيص مولد الأكواد
-programmer.code_generator.supported_languages["rust"] = custom_rust_generator
+programmer.code_generator.registry.register("rust", "my_plugins.rust:PLUGIN")
 ```
 
 ### 📊 مراقبة الأداء
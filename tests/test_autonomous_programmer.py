@@ -0,0 +1,693 @@
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "ai_core"))
+
+from autonomous_programmer import (
+    TERMINAL_STATUSES,
+    AutonomousProgrammer,
+    FairTaskQueue,
+    ImprovementTrigger,
+    PipelineStage,
+    ProgrammingTask,
+    TaskEventBus,
+    TaskPipeline,
+    TaskResultStore,
+    TenantQuotaExceeded,
+    connect_db,
+    current_task_metrics,
+    task_signature,
+)
+
+
+def make_task(index, language="python", status="completed", code="print('ok')"):
+    return ProgrammingTask(
+        task_id=f"task_{index}",
+        description=f"Task number {index}",
+        language=language,
+        complexity="medium",
+        requirements=[],
+        status=status,
+        generated_code=code,
+        test_results={"success": status == "completed"}
+    )
+
+
+@pytest.fixture
+def store(tmp_path):
+    return TaskResultStore(db_path=str(tmp_path / "results.db"))
+
+
+def test_result_store_round_trip(store):
+    """Test saving and loading a task result, including compressed code"""
+    large_code = "x = 1\n" * 500
+    store.save(make_task(1, code=large_code))
+
+    result = store.get("task_1")
+    assert result["generated_code"] == large_code
+    assert result["test_results"] == {"success": True}
+    assert store.get("missing") is None
+
+
+def test_result_store_upsert(store):
+    """Test that saving the same task twice updates the row"""
+    store.save(make_task(1, status="pending"))
+    store.save(make_task(1, status="failed"))
+
+    page = store.query()
+    assert len(page["items"]) == 1
+    assert page["items"][0]["status"] == "failed"
+
+
+def test_result_store_keyset_pagination(store):
+    """Test filtering by status and language with keyset pagination"""
+    for index in range(10):
+        store.save(make_task(
+            index,
+            language="python" if index % 2 == 0 else "javascript",
+            status="completed" if index < 6 else "failed"
+        ))
+
+    first = store.query(language="python", limit=2)
+    assert [item["task_id"] for item in first["items"]] == ["task_8", "task_6"]
+    assert first["next_cursor"] is not None
+
+    second = store.query(language="python", before_id=first["next_cursor"], limit=2)
+    assert [item["task_id"] for item in second["items"]] == ["task_4", "task_2"]
+
+    completed = store.query(language="python", status="completed")
+    assert [item["task_id"] for item in completed["items"]] == ["task_4", "task_2", "task_0"]
+    assert completed["next_cursor"] is None
+
+
+def test_pipeline_overlaps_stages():
+    """Test that pipeline throughput is bound by the slowest stage, not the sum"""
+    done = []
+
+    async def slow(task):
+        await asyncio.sleep(0.05)
+
+    async def record(task):
+        done.append(task.task_id)
+
+    async def run():
+        pipeline = TaskPipeline([
+            PipelineStage("learn", slow),
+            PipelineStage("generate", slow),
+            PipelineStage("test", slow),
+            PipelineStage("save", record)
+        ])
+        pipeline.start()
+        started = time.perf_counter()
+        for index in range(10):
+            await pipeline.submit(make_task(index))
+        while len(done) < 10:
+            await asyncio.sleep(0.01)
+        elapsed = time.perf_counter() - started
+        metrics = pipeline.metrics()
+        await pipeline.stop()
+        return elapsed, metrics
+
+    elapsed, metrics = asyncio.run(run())
+    assert done == [f"task_{index}" for index in range(10)]
+    # sequential execution would take 10 * 3 * 0.05 = 1.5s
+    assert elapsed < 1.0
+    assert metrics["stages"]["learn"]["processed"] == 10
+    assert metrics["bottleneck"] in ("learn", "generate", "test")
+
+
+def test_pipeline_backpressure():
+    """Test that submit blocks once the intake queue is full"""
+    async def run():
+        pipeline = TaskPipeline([PipelineStage("learn", lambda task: None, queue_size=1)])
+        await pipeline.submit(make_task(1))
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(pipeline.submit(make_task(2)), timeout=0.1)
+
+    asyncio.run(run())
+
+
+def test_event_bus_fans_out_and_drops_slow_subscribers():
+    """Test that one publish reaches every subscriber and full queues are disconnected"""
+    async def run():
+        bus = TaskEventBus(subscriber_queue_size=1)
+        fast = bus.subscribe()
+        slow = bus.subscribe()
+
+        bus.publish("task", {"task_id": "task_1", "status": "learning"})
+        event_id, event_type, data = fast.queue.get_nowait()
+        assert (event_id, event_type) == (1, "task")
+        assert '"learning"' in data
+
+        bus.publish("task", {"task_id": "task_1", "status": "testing"})
+        assert fast.queue.qsize() == 1
+        assert slow.closed
+        assert bus.subscribers == {fast}
+
+    asyncio.run(run())
+
+
+def test_build_task_validates_batch_entries():
+    """Test validation of task specs submitted in a batch"""
+    task = AutonomousProgrammer.build_task({
+        "description": "  Build an API  ",
+        "requirements": "database, api"
+    })
+    assert task.description == "Build an API"
+    assert task.language == "python"
+    assert task.requirements == ["database", "api"]
+
+    other = AutonomousProgrammer.build_task({"description": "Build an API"})
+    assert other.task_id != task.task_id
+
+    for invalid in ({}, {"description": ""}, {"description": "x", "requirements": [1]}, "text"):
+        with pytest.raises(ValueError):
+            AutonomousProgrammer.build_task(invalid)
+
+
+def test_build_batch_resolves_keys_and_rejects_cycles():
+    """Test dependency keys inside a batch and cycle detection"""
+    tasks, errors = AutonomousProgrammer.build_batch([
+        {"key": "schema", "description": "Design the schema"},
+        {"key": "api", "description": "Build the API", "depends_on": ["schema"]},
+        {"description": "Write docs", "depends_on": ["schema", "api"]}
+    ])
+    assert errors == []
+    schema, api, docs = tasks
+    assert api.depends_on == [schema.task_id]
+    assert docs.depends_on == [schema.task_id, api.task_id]
+
+    _, errors = AutonomousProgrammer.build_batch([
+        {"key": "a", "description": "A", "depends_on": ["b"]},
+        {"key": "b", "description": "B", "depends_on": ["a"]}
+    ])
+    assert errors and errors[0]["index"] is None
+
+    _, errors = AutonomousProgrammer.build_batch([
+        {"key": "a", "description": "A"},
+        {"key": "a", "description": "B"}
+    ])
+    assert errors[0]["index"] == 1
+
+
+def fill_queue(queue, tasks):
+    async def run():
+        for task in tasks:
+            queue.reserve(task.client_id)
+            await queue.put(task)
+    return run()
+
+
+def test_fair_queue_orders_by_priority_then_deadline():
+    """Test earliest-deadline-first ordering with FIFO for tasks without deadlines"""
+    async def run():
+        queue = FairTaskQueue(maxsize=10, max_running_per_client=10)
+        now = datetime.now()
+        tasks = [make_task(index) for index in range(5)]
+        tasks[1].deadline = now + timedelta(minutes=10)
+        tasks[2].deadline = now + timedelta(minutes=1)
+        tasks[4].priority = -1
+        await fill_queue(queue, tasks)
+        return [(await queue.get()).task_id for _ in tasks]
+
+    assert asyncio.run(run()) == ["task_4", "task_2", "task_1", "task_0", "task_3"]
+
+
+def test_fair_queue_weighted_round_robin():
+    """Test that a noisy client cannot starve others and weights are honoured"""
+    async def run():
+        queue = FairTaskQueue(weights={"big": 2.0}, max_running_per_client=100)
+        tasks = []
+        for index in range(20):
+            task = make_task(f"big_{index}")
+            task.client_id = "big"
+            tasks.append(task)
+        for index in range(3):
+            task = make_task(f"small_{index}")
+            task.client_id = "small"
+            tasks.append(task)
+        await fill_queue(queue, tasks)
+        return [(await queue.get()).client_id for _ in range(9)]
+
+    order = asyncio.run(run())
+    assert order == ["big", "big", "small"] * 3
+
+    # وزن غير موجب كان سيُدخل اختيار المهمة التالية في حلقة لا تنتهي
+    for weight in (0, -1.0, float("nan")):
+        with pytest.raises(ValueError):
+            FairTaskQueue(weights={"big": weight})
+
+
+def test_fair_queue_running_cap_and_quota():
+    """Test per-client concurrency caps and pending quota"""
+    async def run():
+        queue = FairTaskQueue(max_pending_per_client=3, max_running_per_client=1)
+        tasks = [make_task(index) for index in range(3)]
+        await fill_queue(queue, tasks)
+        with pytest.raises(TenantQuotaExceeded):
+            queue.reserve("default")
+
+        first = await queue.get()
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(queue.get(), timeout=0.1)
+
+        await queue.release(first)
+        second = await asyncio.wait_for(queue.get(), timeout=1)
+        assert await queue.discard(tasks[2])
+        return first.task_id, second.task_id, queue.qsize(), queue.pending("default")
+
+    assert asyncio.run(run()) == ("task_0", "task_1", 0, 0)
+
+
+def test_stage_latency_percentiles(programmer):
+    """Test per-stage latency percentiles over the retained samples"""
+    programmer.stage_latency["learn"].extend(float(value) for value in range(100, 0, -1))
+    programmer.stage_latency["test"].extend([programmer.LATENCY_SAMPLES + 1.0] * 10)
+    programmer.stage_latency["test"].extend([1.0] * programmer.LATENCY_SAMPLES)
+
+    latency = programmer.stage_latency_percentiles()
+    assert set(latency) == set(programmer.STAGE_ORDER)
+    assert latency["learn"] == {"count": 100, "p50": 50.5, "p95": pytest.approx(95.05), "p99": pytest.approx(99.01)}
+    # العينات الأقدم تخرج من النافذة
+    assert latency["test"] == {"count": programmer.LATENCY_SAMPLES, "p50": 1.0, "p95": 1.0, "p99": 1.0}
+    assert latency["save"] == {"count": 0, "p50": 0.0, "p95": 0.0, "p99": 0.0}
+
+
+def test_task_signature_normalizes_inputs():
+    """Test that equivalent generation inputs share one cache signature"""
+    base = task_signature("python", "Build an  API", ["database", "api"])
+    assert task_signature(" Python ", "Build an API\n", ["API", "database", ""]) == base
+    assert task_signature("python", "Build an API", ["database"]) != base
+    assert task_signature("javascript", "Build an API", ["database", "api"]) != base
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_improvement_trigger_debounces_and_rate_limits():
+    """Test threshold triggers with debounce, rate limiting and unchanged watermarks"""
+    clock = FakeClock()
+    trigger = ImprovementTrigger(
+        window=10, min_samples=10, success_drop=0.3, failure_burst=100,
+        knowledge_growth=50, debounce=10, min_interval=100, clock=clock
+    )
+    for _ in range(10):
+        trigger.record_outcome(True)
+    watermarks = {"knowledge": 1, "code_outcomes": 10}
+    assert trigger.poll(watermarks) == []
+
+    for _ in range(4):
+        trigger.record_outcome(False)
+    watermarks = {"knowledge": 1, "code_outcomes": 14}
+    assert trigger.poll(watermarks) == []
+    clock.now = 11
+    assert trigger.poll(watermarks) == ["success_rate_drop"]
+    trigger.mark_run(watermarks, ["success_rate_drop"])
+
+    # nothing new since the last cycle
+    assert trigger.poll(watermarks) == []
+
+    watermarks = {"knowledge": 60, "code_outcomes": 14}
+    clock.now = 30
+    assert trigger.poll(watermarks) == []
+    clock.now = 50
+    assert trigger.poll(watermarks) == []
+    assert trigger.status()["rate_limited"] == 1
+    clock.now = 112
+    assert trigger.poll(watermarks) == ["knowledge_growth"]
+
+
+def test_improvement_trigger_failure_burst():
+    """Test that a burst of failures inside the window triggers a cycle"""
+    clock = FakeClock()
+    trigger = ImprovementTrigger(failure_burst=3, burst_window=5, debounce=0, clock=clock)
+    for second in (0, 10, 20):
+        clock.now = second
+        trigger.record_outcome(False)
+    assert trigger.poll({"code_outcomes": 3}) == []
+
+    for second in (21, 22):
+        clock.now = second
+        trigger.record_outcome(False)
+    assert trigger.poll({"code_outcomes": 5}) == ["failure_burst"]
+
+
+@pytest.fixture
+def programmer(tmp_path, monkeypatch):
+    """مبرمج بقواعد بيانات في مجلد مؤقت"""
+    monkeypatch.chdir(tmp_path)
+    return AutonomousProgrammer(reuse_similar=False)
+
+
+async def _passed(task):
+    task.status = "completed"
+    task.test_results = {"success": True}
+
+
+async def _idle(task):
+    return None
+
+
+def use_stages(programmer, learn=_idle, generate=_idle, test=_passed):
+    """استبدال المراحل بمعالجات وهمية مع تسجيل المراحل التي نُفذت"""
+    calls = []
+
+    def recorded(name, handler):
+        async def stage(task):
+            calls.append((task.task_id, name))
+            return await handler(task)
+        return stage
+
+    for name, handler in (("learn", learn), ("generate", generate), ("test", test)):
+        setattr(programmer, f"_stage_{name}", recorded(name, handler))
+    programmer.pipeline = programmer._build_pipeline(programmer.DEFAULT_STAGE_CONCURRENCY, 10)
+    return calls
+
+
+def final_statuses(subscription, task_id):
+    """الحالات النهائية المنشورة لمهمة"""
+    statuses = []
+    while not subscription.queue.empty():
+        _, event_type, data = subscription.queue.get_nowait()
+        data = json.loads(data)
+        if event_type == "task" and data["task_id"] == task_id and data["status"] in TERMINAL_STATUSES:
+            statuses.append(data["status"])
+    return statuses
+
+
+async def wait_until(predicate, timeout=5.0):
+    deadline = time.perf_counter() + timeout
+    while not predicate():
+        assert time.perf_counter() < deadline
+        await asyncio.sleep(0.01)
+
+
+def test_cancel_queued_task_never_runs(programmer):
+    calls = use_stages(programmer)
+
+    async def scenario():
+        subscription = programmer.event_bus.subscribe()
+        task_id = await programmer.add_task("Queued task")
+        assert await programmer.cancel_task(task_id) is True
+        programmer.pipeline.start()
+        await asyncio.sleep(0.1)
+        await programmer.pipeline.stop()
+        assert await programmer.cancel_task(task_id) is False
+        return task_id, final_statuses(subscription, task_id)
+
+    task_id, statuses = asyncio.run(scenario())
+    assert calls == []
+    assert statuses == ["cancelled"]
+    assert programmer.result_store.get(task_id)["status"] == "cancelled"
+    assert task_id not in programmer.active_tasks
+
+
+def test_cancel_running_task_stops_later_stages(programmer):
+    started = []
+
+    async def stubborn_test(task):
+        # المرحلة تبتلع الإلغاء وتكتمل: يجب ألا تصل المهمة لمرحلة الحفظ
+        started.append(task.task_id)
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            return None
+
+    calls = use_stages(programmer, test=stubborn_test)
+
+    async def scenario():
+        subscription = programmer.event_bus.subscribe()
+        programmer.pipeline.start()
+        task_id = await programmer.add_task("Running task")
+        await wait_until(lambda: started and task_id in programmer.running_stages)
+        assert await programmer.cancel_task(task_id) is True
+        await asyncio.sleep(0.1)
+        await programmer.pipeline.stop()
+        return task_id, final_statuses(subscription, task_id)
+
+    task_id, statuses = asyncio.run(scenario())
+    assert [name for _, name in calls] == ["learn", "generate", "test"]
+    assert statuses == ["cancelled"]
+    assert programmer.result_store.get(task_id)["status"] == "cancelled"
+
+
+def test_stage_timeout_finalizes_once(programmer, monkeypatch):
+    async def slow_generate(task):
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(programmer, "STAGE_TIMEOUTS", {**programmer.STAGE_TIMEOUTS, "generate": 0.05})
+    calls = use_stages(programmer, generate=slow_generate)
+
+    async def scenario():
+        subscription = programmer.event_bus.subscribe()
+        programmer.pipeline.start()
+        task_id = await programmer.add_task("Slow task")
+        await wait_until(lambda: task_id not in programmer.active_tasks)
+        await asyncio.sleep(0.05)
+        await programmer.pipeline.stop()
+        return task_id, final_statuses(subscription, task_id)
+
+    task_id, statuses = asyncio.run(scenario())
+    assert [name for _, name in calls] == ["learn", "generate"]
+    assert statuses == ["error"]
+    result = programmer.result_store.get(task_id)
+    assert result["status"] == "error"
+    assert result["test_results"]["errors"] == ["انتهت مهلة المرحلة generate"]
+
+
+def test_deadline_expiry(programmer):
+    async def slow_generate(task):
+        await asyncio.sleep(10)
+
+    calls = use_stages(programmer, generate=slow_generate)
+
+    async def scenario():
+        subscription = programmer.event_bus.subscribe()
+        programmer.pipeline.start()
+        # موعد منقضٍ: تُسقط المهمة قبل أي مرحلة
+        past_id = await programmer.add_task("Late task", deadline=datetime.now() - timedelta(seconds=1))
+        # موعد يقع أثناء مرحلة: تُقلص مهلتها إلى الوقت المتبقي
+        near_id = await programmer.add_task("Tight task", deadline=datetime.now() + timedelta(seconds=0.3))
+        await wait_until(lambda: not programmer.active_tasks)
+        await asyncio.sleep(0.05)
+        await programmer.pipeline.stop()
+        return past_id, near_id, final_statuses(subscription, past_id), final_statuses(subscription, near_id)
+
+    # الأحداث تُقرأ مرة واحدة فتُجمع الحالتان من نفس الاشتراك
+    past_id, near_id, past_statuses, near_statuses = asyncio.run(scenario())
+    assert (past_id, "learn") not in calls and (near_id, "generate") in calls
+    assert (near_id, "test") not in calls
+    assert past_statuses == ["expired"]
+    assert programmer.result_store.get(past_id)["test_results"]["errors"] == [
+        "لا يمكن إنجاز المهمة قبل موعدها النهائي"]
+    assert programmer.result_store.get(near_id)["status"] == "expired"
+    assert programmer.result_store.get(near_id)["test_results"]["errors"] == [
+        "تجاوزت المرحلة generate الموعد النهائي"]
+
+
+def test_cancel_endpoint_rejects_finished_tasks(programmer, tmp_path, monkeypatch):
+    # الوحدة تربط مجلد static من المجلد الحالي عند استيرادها
+    (tmp_path / "static").mkdir()
+    import web_interface
+
+    monkeypatch.setattr(web_interface, "programmer", programmer)
+    use_stages(programmer)
+
+    async def scenario():
+        programmer.pipeline.start()
+        task_id = await programmer.add_task("Finished task")
+        await wait_until(lambda: task_id not in programmer.active_tasks)
+        await programmer.pipeline.stop()
+        return (
+            await web_interface.cancel_task(task_id),
+            await web_interface.cancel_task("task_missing"),
+        )
+
+    finished, missing = asyncio.run(scenario())
+    assert finished.status_code == 409
+    assert json.loads(finished.body)["success"] is False
+    assert missing.status_code == 404
+
+
+def run_batch(programmer, specs):
+    """تنفيذ دفعة مهام عبر خط المعالجة حتى انتهائها"""
+    tasks, errors = AutonomousProgrammer.build_batch(specs)
+    assert errors == []
+
+    async def scenario():
+        programmer.pipeline.start()
+        await programmer.add_tasks(tasks)
+        await wait_until(lambda: not programmer.active_tasks)
+        await asyncio.sleep(0.05)
+        await programmer.pipeline.stop()
+
+    asyncio.run(scenario())
+    return tasks
+
+
+def test_dependencies_run_branches_in_parallel_and_pass_results(programmer):
+    timeline = []
+    running = []
+    upstream = {}
+
+    async def learn(task):
+        task.knowledge = [{"topic": task.description, "content": f"notes on {task.description}"}]
+
+    async def generate(task):
+        upstream[task.description] = task.upstream
+        running.append(task.description)
+        timeline.append(("start", task.description, len(running)))
+        await asyncio.sleep(0.2)
+        running.remove(task.description)
+        timeline.append(("end", task.description, len(running)))
+        task.generated_code = f"# {task.description}\n"
+
+    use_stages(programmer, learn=learn, generate=generate)
+    schema, models, api = run_batch(programmer, [
+        {"key": "schema", "description": "Schema"},
+        {"key": "models", "description": "Models"},
+        {"description": "API", "depends_on": ["schema", "models"]}
+    ])
+
+    # الفرعان المستقلان يتداخلان في مرحلة التوليد
+    assert max(count for event, _, count in timeline if event == "start") == 2
+    # المهمة التابعة تبدأ بعد انتهاء كل ما تعتمد عليه
+    api_start = timeline.index(("start", "API", 1))
+    assert {name for event, name, _ in timeline[:api_start] if event == "end"} == {"Schema", "Models"}
+
+    assert upstream["Schema"] == {} and upstream["Models"] == {}
+    assert set(upstream["API"]) == {schema.task_id, models.task_id}
+    assert upstream["API"][schema.task_id]["generated_code"] == "# Schema\n"
+    assert upstream["API"][models.task_id]["knowledge"] == [
+        {"topic": "Models", "content": "notes on Models"}]
+    assert all(programmer.result_store.get(task.task_id)["status"] == "completed"
+               for task in (schema, models, api))
+    assert not programmer.waiting_tasks and not programmer.dependents
+
+
+def test_dependency_failure_fails_dependents(programmer):
+    async def test(task):
+        await _passed(task)
+        if task.description == "Broken":
+            task.status = "failed"
+            task.test_results = {"success": False}
+
+    calls = use_stages(programmer, test=test)
+    broken, child, grandchild, sibling = run_batch(programmer, [
+        {"key": "broken", "description": "Broken"},
+        {"key": "child", "description": "Child", "depends_on": ["broken"]},
+        {"description": "Grandchild", "depends_on": ["child"]},
+        {"description": "Sibling"}
+    ])
+
+    assert programmer.result_store.get(broken.task_id)["status"] == "failed"
+    assert programmer.result_store.get(sibling.task_id)["status"] == "completed"
+    for task, upstream_id in ((child, broken.task_id), (grandchild, child.task_id)):
+        result = programmer.result_store.get(task.task_id)
+        assert result["status"] == "failed"
+        assert result["test_results"]["errors"] == [f"فشلت المهمة السابقة {upstream_id}"]
+        # لم تدخل خط المعالجة ولم تبقَ منتظرة
+        assert not any(task_id == task.task_id for task_id, _ in calls)
+    assert not programmer.waiting_tasks and not programmer.pending_dependencies
+
+    # مهمة جديدة تعتمد على مهمة فاشلة محفوظة تفشل فوراً
+    async def late():
+        return await programmer.add_task("Late", depends_on=[broken.task_id])
+
+    late_id = asyncio.run(late())
+    assert programmer.result_store.get(late_id)["status"] == "failed"
+
+
+class FakeResponse:
+    status = 200
+
+    async def json(self):
+        return {"items": []}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class FakeSession(FakeResponse):
+    def __init__(self, **kwargs):
+        pass
+
+    def get(self, url, params=None):
+        return FakeResponse()
+
+
+def test_task_metrics_reach_stored_result(programmer, monkeypatch):
+    """Test that DB and HTTP calls made inside stages are counted per task and stored"""
+    import autonomous_programmer
+
+    monkeypatch.setattr(autonomous_programmer.aiohttp, "ClientSession", FakeSession)
+
+    async def learn(task):
+        # الخيوط والطلبات داخل المرحلة ترث مقاييس المهمة
+        await asyncio.to_thread(lambda: connect_db(programmer.knowledge_base.db_path).close())
+        await programmer.internet_learner._fetch_json("https://example.invalid", {})
+
+    use_stages(programmer, learn=learn, generate=programmer._stage_generate)
+
+    async def scenario():
+        programmer.pipeline.start()
+        task_ids = [await programmer.add_task(f"Metrics task {index}") for index in range(2)]
+        await wait_until(lambda: not programmer.active_tasks)
+        await programmer.pipeline.stop()
+        return task_ids
+
+    for task_id in asyncio.run(scenario()):
+        performance = programmer.result_store.get(task_id)["test_results"]["performance"]
+        # التوليد: البحث في الذاكرة المؤقتة وقاعدة المعرفة ثم حفظ الكود
+        assert performance["db_calls"] == 4
+        assert performance["http_calls"] == 1
+        # زمن مرحلة الحفظ يُقاس بعد إرفاق المقاييس، وانتظارها قبله
+        assert set(performance["stages"]) == {"learn", "generate", "test"}
+        assert set(performance["queue_wait"]) == set(programmer.STAGE_ORDER)
+    assert current_task_metrics.get() is None
+    assert programmer.stage_latency_percentiles()["generate"]["count"] == 2
+
+
+def test_reused_task_skips_generation_and_is_saved_by_pipeline(programmer, monkeypatch):
+    """Test that a reused task passes generate/test and is finalized once by the save stage"""
+    async def no_sessions(topic, max_results=5):
+        return []
+
+    monkeypatch.setattr(programmer.internet_learner, "search_and_learn", no_sessions)
+    programmer.reuse_similar = True
+    calls = use_stages(programmer, learn=programmer._stage_learn)
+
+    async def scenario():
+        subscription = programmer.event_bus.subscribe()
+        programmer.pipeline.start()
+        first_id = await programmer.add_task("Build a REST API for users")
+        await wait_until(lambda: first_id not in programmer.active_tasks)
+        second_id = await programmer.add_task("Build a REST API for users")
+        await wait_until(lambda: second_id not in programmer.active_tasks)
+        await asyncio.sleep(0.05)
+        await programmer.pipeline.stop()
+        return first_id, second_id, final_statuses(subscription, second_id)
+
+    first_id, second_id, statuses = asyncio.run(scenario())
+    assert [name for task_id, name in calls if task_id == second_id] == ["learn"]
+    assert statuses == ["completed"]
+    result = programmer.result_store.get(second_id)
+    assert result["status"] == "completed"
+    assert result["test_results"]["reused_from"] == first_id
+    assert "save" in result["test_results"]["performance"]["queue_wait"]
+    # المهام المعاد استخدامها لا تُضاف للفهرس
+    assert len(programmer.similarity_index) == 1
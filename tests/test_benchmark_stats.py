@@ -0,0 +1,64 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "ai_core"))
+
+from benchmark_stats import BaselineStore, compare_runs, mann_whitney_greater, percentile, summarize
+
+
+def test_summarize():
+    summary = summarize([5, 1, 3, 2, 4])
+    assert (summary["min_ns"], summary["median_ns"], summary["mean_ns"]) == (1, 3, 3)
+    assert summary["p95_ns"] == percentile([1, 2, 3, 4, 5], 0.95) == 4.8
+    assert round(summary["stdev_ns"], 4) == 1.5811
+
+
+def test_regression_requires_significance_and_size():
+    rng = random.Random(3)
+    baseline = [1000 + rng.gauss(0, 20) for _ in range(30)]
+    same = [1000 + rng.gauss(0, 20) for _ in range(30)]
+    slower = [1200 + rng.gauss(0, 20) for _ in range(30)]
+    slightly = [1020 + rng.gauss(0, 5) for _ in range(30)]
+
+    assert compare_runs(same, baseline)["regression"] is False
+    result = compare_runs(slower, baseline)
+    assert result["regression"] is True and result["p_value"] < 1e-6
+    # دال إحصائياً لكنه أصغر من الحد الأدنى للتراجع
+    assert compare_runs(slightly, baseline)["regression"] is False
+    # الأسرع ليس تراجعاً
+    assert mann_whitney_greater(baseline, slower) > 0.99
+    # التعادل الكامل
+    assert mann_whitney_greater([5] * 5, [5] * 5) == 1.0
+
+
+def test_baseline_store_roundtrip(tmp_path):
+    store = BaselineStore(str(tmp_path / "baselines.db"))
+    assert store.get("key") is None
+    store.put("key", "hash1", [1, 2, 3], summarize([1, 2, 3]))
+    store.put("key", "hash2", [4, 5, 6], summarize([4, 5, 6]))
+    baseline = store.get("key")
+    assert (baseline["code_hash"], baseline["samples"], baseline["summary"]["median_ns"]) == ("hash2", [4, 5, 6], 5)
+
+
+def test_baseline_store_closes_connections(tmp_path, monkeypatch):
+    import sqlite3
+    import benchmark_stats
+
+    opened, original_connect = [], sqlite3.connect
+
+    def connect(*args, **kwargs):
+        opened.append(original_connect(*args, **kwargs))
+        return opened[-1]
+
+    monkeypatch.setattr(benchmark_stats.sqlite3, "connect", connect)
+    store = BaselineStore(str(tmp_path / "baselines.db"))
+    store.put("key", "hash", [1, 2, 3], summarize([1, 2, 3]))
+    assert store.get("key")["samples"] == [1, 2, 3]
+    assert len(opened) == 3
+    for conn in opened:
+        try:
+            conn.execute("SELECT 1")
+        except sqlite3.ProgrammingError:
+            continue
+        raise AssertionError("connection left open")
@@ -0,0 +1,92 @@
+import asyncio
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "ai_core"))
+
+from advanced_features import IntelligentCodeOptimizer
+from code_metrics import compute_code_metrics
+
+PYTHON_SOURCE = '''# module comment
+class Parser:
+    def parse(self, text):
+        """def class if ( [ {"""
+        if text and not text.startswith("#"):  # trailing comment
+            return [part for part in text.split() if part]
+        elif text is None:
+            return None
+        return {}
+'''
+
+JS_SOURCE = '''// handler
+class Api {
+    load(id) {
+        /* if (x) { */
+        const url = `/items/${id}?full=${id > 0 ? "yes" : "no"}`;
+        return fetch(url).then(r => r.ok || retry("if ("));
+    }
+}
+function retry(message) { return null; }
+'''
+
+
+def test_python_metrics_ignore_strings_and_comments():
+    """Test that keywords and brackets in strings and comments are not counted"""
+    metrics = compute_code_metrics(PYTHON_SOURCE, "python")
+    assert metrics["lines"] == 9
+    assert metrics["comment_lines"] == 1
+    assert metrics["functions"] == 1
+    assert metrics["classes"] == 1
+    # if, and, if (comprehension), for (comprehension), elif
+    assert metrics["cyclomatic_complexity"] == 6
+    # parse(, startswith(, [, split(, {
+    assert metrics["brackets"] == 5
+
+
+def test_javascript_metrics_handle_templates_and_comments():
+    """Test the JavaScript lexer on template literals, block comments and arrows"""
+    metrics = compute_code_metrics(JS_SOURCE, "javascript")
+    assert metrics["lines"] == 9
+    assert metrics["comment_lines"] == 2
+    assert metrics["classes"] == 1
+    # arrow function and function declaration
+    assert metrics["functions"] == 2
+    # ternary inside the template and ||
+    assert metrics["cyclomatic_complexity"] == 3
+
+
+def test_javascript_metrics_distinguish_regex_from_division():
+    """Test that slashes start regex literals only where an expression can begin"""
+    source = (
+        "const pattern = /[/*]/g; // comment\n"
+        "function check(text) {\n"
+        "  return /'|\\/(/.test(text) ? text.length / 2 / count : (total) / 3;\n"
+        "}\n"
+        "const found = `${/if (/.test(x)}` || [1][0] / 2;\n"
+        "// done\n"
+    )
+    metrics = compute_code_metrics(source, "javascript")
+    assert metrics["lines"] == 6
+    assert metrics["comment_lines"] == 1
+    assert metrics["functions"] == 1
+    # base path, the ternary and ||; "if (" inside the regex literals is not counted
+    assert metrics["cyclomatic_complexity"] == 3
+    # check(, {, test(, (total), test(, [1], [0]
+    assert metrics["brackets"] == 7
+
+
+def test_metrics_stream_from_file_objects(tmp_path):
+    """Test that a file object gives the same metrics as the string"""
+    path = tmp_path / "parser.py"
+    path.write_text(PYTHON_SOURCE, encoding="utf-8")
+    with open(path, encoding="utf-8") as source:
+        assert compute_code_metrics(source, "python") == compute_code_metrics(PYTHON_SOURCE, "python")
+
+    # incomplete code still reports line metrics
+    metrics = compute_code_metrics(io.StringIO("x = (\n  1,\n"), "python")
+    assert metrics["lines"] == 2
+
+    scores = asyncio.run(IntelligentCodeOptimizer(None).score_source(PYTHON_SOURCE, "python"))
+    assert 0 <= scores["readability_score"] <= 1
+    assert 0 <= scores["maintainability_score"] <= 1
@@ -0,0 +1,132 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "ai_core"))
+
+from advanced_features import IntelligentCodeOptimizer
+from code_rewriter import rewrite_python
+
+SOURCE = '''def build(items, factor, offset):
+    result = []
+    for item in items:
+        if item > 0:
+            result.append(item * 2)
+    squares = {}
+    for item in items:
+        squares[item] = item * item
+    text = ""
+    for part in items:
+        text += str(part)
+    total = sum([x * x for x in items])
+    out = []
+    for step in range(3):
+        scale = factor * offset + len(items)
+        out.append(step * scale)  # تعليق
+    return result, squares, text, total, out
+'''
+
+
+def names(applied):
+    return sorted(rewrite["name"] for rewrite in applied)
+
+
+def test_rewrites_preserve_behaviour():
+    """Test each rewrite on one function and compare results before and after"""
+    optimized, applied = rewrite_python(SOURCE)
+    assert names(applied) == [
+        "dict_comprehension", "generator_expression", "hoist_invariant",
+        "list_comprehension", "string_join"
+    ]
+    assert "result = [item * 2 for item in items if item > 0]" in optimized
+    assert "text = ''.join(str(part) for part in items)" in optimized
+    assert "total = sum(x * x for x in items)" in optimized
+    assert "    scale = factor * offset + len(items)\n    for step in range(3):" in optimized
+    assert "# تعليق" in optimized
+
+    before, after = {}, {}
+    exec(SOURCE, before)
+    exec(optimized, after)
+    arguments = ([3, -1, 4, 1, -5], 2, 3)
+    assert before["build"](*arguments) == after["build"](*arguments)
+
+
+def test_rewrites_are_conservative():
+    """Test that rewrites which could change behaviour are skipped"""
+    unchanged = [
+        # the loop variable is read after the loop
+        "def f(items):\n    acc = []\n    for i in items:\n        acc.append(i)\n    return acc, i\n",
+        # the list is read inside the loop
+        "acc = []\nfor i in range(3):\n    acc.append(len(acc))\n",
+        # a comment would be lost
+        "acc = []\nfor i in range(3):\n    # keep\n    acc.append(i)\n",
+        # class bodies cannot see class variables from a comprehension
+        "class C:\n    n = 2\n    xs = []\n    for v in range(3):\n        xs.append(v * n)\n",
+        # any() may stop early, so calls must keep running
+        "ok = any([check(x) for x in items])\n",
+        # the invariant's inputs change inside the loop, or it may raise
+        "for i in range(3):\n    y = a + b\n    a = i\n",
+        "for i in range(3):\n    y = a / b\n    print(y)\n",
+        # the loop may not run, so the invariant would be evaluated when it never was
+        "def f(items, x):\n    for i in items:\n        y = x + 1\n        print(y, i)\n",
+        # the invariant's input changes through an alias or an unknown call
+        "items = [1]\nalias = items\nfor i in range(3):\n    n = len(items)\n    alias.append(n)\n",
+        "for i in range(3):\n    n = len(items)\n    update(items)\n",
+        # only the first statement moves, so nothing runs before it in the first iteration
+        "out = []\nfor i in range(3):\n    out.append(i)\n    y = a + b\n    out.append(y)\n",
+        # the loop variable is a global read elsewhere
+        "i = 0\ndef f():\n    global i\n    acc = []\n    for i in range(3):\n        acc.append(i)\n    return acc\n",
+        # another loop's iter or else clause reads the old loop variable
+        "def f(a, b):\n    acc = []\n    for i in a:\n        acc.append(i)\n    for i in range(i):\n        pass\n    return acc\n",
+        "def f(a, b):\n    acc = []\n    for i in a:\n        acc.append(i)\n    for i in b:\n        pass\n    else:\n        print(i)\n    return acc\n",
+        "not valid python (",
+    ]
+    for source in unchanged:
+        assert rewrite_python(source) == (source, []), source
+
+
+def test_optimizer_measures_speedup():
+    """Test that the optimizer reports a measured improvement instead of constants"""
+    source = (
+        "data = list(range(100000))\n"
+        "result = []\n"
+        "for x in data:\n"
+        "    result.append(x * 2)\n"
+    )
+    results = asyncio.run(IntelligentCodeOptimizer(None).optimize_code(source, "python"))
+    assert results["optimized_code"] == "data = list(range(100000))\nresult = [x * 2 for x in data]\n"
+    benchmark = results["benchmark"]
+    assert benchmark["before_ns"] > 0 and benchmark["after_ns"] > 0
+    assert results["performance_improvement"] == benchmark["improvement"]
+
+    failing = asyncio.run(IntelligentCodeOptimizer(None).optimize_code(
+        "acc = []\nfor i in range(3):\n    acc.append(i)\nraise SystemExit(1)\n", "python"
+    ))
+    assert failing["performance_improvement"] is None
+    assert "SystemExit" in failing["benchmark"]["error"]
+    assert failing["optimizations_applied"] == [] and failing["optimized_code"].startswith("acc = []\nfor")
+
+
+def test_optimizer_rejects_rewrites_that_change_behaviour(monkeypatch, tmp_path):
+    """Test that a rewrite is kept only when both variants run and behave the same"""
+    import advanced_features
+
+    source = "items = [1]\nalias = items\nfor i in range(3):\n    n = len(items)\n    alias.append(n)\nprint(items)\n"
+    broken = "items = [1]\nalias = items\nn = len(items)\nfor i in range(3):\n    alias.append(n)\nprint(items)\n"
+    monkeypatch.setattr(advanced_features, "rewrite_python", lambda code: (broken, [{"name": "hoist_invariant", "line": 3}]))
+    results = asyncio.run(IntelligentCodeOptimizer(None).optimize_code(source, "python"))
+    assert results["optimized_code"] == source and results["optimizations_applied"] == []
+    assert results["benchmark"]["mismatch"] is True and results["benchmark"]["rejected"] is True
+
+    optimizer = IntelligentCodeOptimizer(None)
+    raising = asyncio.run(optimizer._measure_speedup("x = 1\n", "x = 1 + 's'\n"))
+    assert raising["improvement"] is None and raising["error"].startswith("after: TypeError")
+
+    # the variants run in a temporary directory under memory limits
+    monkeypatch.chdir(tmp_path)
+    optimizer.BENCHMARK_MEMORY_LIMIT_MB = 256
+    writes = "open('leak.txt', 'w').write('x')\n"
+    assert asyncio.run(optimizer._measure_speedup(writes, writes))["improvement"] is not None
+    assert not (tmp_path / "leak.txt").exists()
+    hungry = "blob = bytearray(1024 ** 3)\n"
+    assert asyncio.run(optimizer._measure_speedup(hungry, hungry))["error"].startswith("before: MemoryError")
@@ -0,0 +1,31 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "ai_core"))
+
+from autonomous_programmer import CodeGenerator, KnowledgeBase, SelfImprovementEngine
+
+
+def test_cycle_metrics_rollups_and_trends(tmp_path):
+    """Test hourly/daily rollups and trend deltas for improvement cycles"""
+    knowledge_base = KnowledgeBase(db_path=str(tmp_path / "knowledge.db"))
+    engine = SelfImprovementEngine(knowledge_base, CodeGenerator(knowledge_base))
+
+    day = 86400 * 20000
+    engine.record_cycle_metrics({"average_success_rate": 0.5, "improvement_cycles": 1}, day + 60)
+    engine.record_cycle_metrics({"average_success_rate": 0.7, "improvement_cycles": 2}, day + 120)
+    engine.record_cycle_metrics({"average_success_rate": 0.9, "improvement_cycles": 3, "label": "x"}, day + 3700)
+
+    hourly = engine.metric_trends("hour", metrics=["average_success_rate"])["metrics"]
+    rate = hourly["average_success_rate"]
+    assert [point["avg"] for point in rate["points"]] == [0.6, 0.9]
+    assert rate["points"][0]["min"] == 0.5
+    assert rate["latest"] == 0.9
+    assert round(rate["delta"], 6) == 0.2
+
+    daily = engine.metric_trends("day")["metrics"]
+    assert set(daily) == {"average_success_rate", "improvement_cycles"}
+    assert daily["improvement_cycles"]["points"][0]["max"] == 3
+
+    # the cycle counter survives restarts
+    assert SelfImprovementEngine(knowledge_base, CodeGenerator(knowledge_base)).improvement_cycles == 3
@@ -0,0 +1,130 @@
+import ast
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "ai_core"))
+
+from autonomous_programmer import CodeGenerator, KnowledgeBase, ProgrammingTask
+from language_plugins import LanguagePlugin, LanguageRegistry, generate_class_name
+
+
+def make_generator(tmp_path, **kwargs):
+    knowledge_base = KnowledgeBase(db_path=str(tmp_path / "knowledge.db"))
+    registry = LanguageRegistry(bytecode_cache_dir=str(tmp_path), discover=False)
+    return CodeGenerator(knowledge_base, registry=registry, **kwargs)
+
+
+def generate(generator, language="python", description="Build an API", requirements=None, upstream=None):
+    task = ProgrammingTask(
+        task_id="task_1",
+        description=description,
+        language=language,
+        complexity="medium",
+        requirements=requirements or [],
+        upstream=upstream or {}
+    )
+    return asyncio.run(generator.generate_code(task))
+
+
+def test_registry_loads_plugins_on_first_use(tmp_path):
+    """Test that plugins are imported lazily and unknown languages fall back"""
+    registry = LanguageRegistry(bytecode_cache_dir=str(tmp_path), discover=False)
+    assert "java" in registry.available()
+    assert registry.loaded() == []
+
+    assert registry.get("Python").name == "python"
+    assert registry.get("brainfuck").name == "generic"
+    assert registry.loaded() == ["generic", "python"]
+
+
+def test_registry_renders_registered_plugin(tmp_path):
+    """Test registering an external plugin with an inline template"""
+    registry = LanguageRegistry(bytecode_cache_dir=str(tmp_path), discover=False)
+    registry.register("rust", LanguagePlugin(
+        name="rust",
+        template="rust.rs.j2",
+        template_source="// {{ description }}\nstruct {{ class_name }};\n{{ requirements_code }}\n",
+        requirement_snippets={"api": ["// api"]}
+    ))
+
+    code = registry.render("rust", "Build an API", ["api"], created="2024-01-01")
+    assert code == "// Build an API\nstruct BuildAnApiHandler;\n// api\n"
+    assert list(tmp_path.glob("__jinja2_*"))
+
+    # إعادة التسجيل بنفس اسم القالب تستبدل القالب المترجم
+    registry.register("rust", LanguagePlugin(
+        name="rust",
+        template="rust.rs.j2",
+        template_source="/* {{ description }} */\n"
+    ))
+    assert registry.render("rust", "Build an API", [], created="2024-01-01") == "/* Build an API */\n"
+    assert registry.render("python", "Build an API", [], created="2024-01-01").startswith("#!/usr/bin/env python3")
+
+
+def test_generated_python_is_valid(tmp_path):
+    """Test that generated Python code parses with and without requirements"""
+    generator = make_generator(tmp_path)
+    for requirements in ([], ["database", "file"]):
+        code = generate(generator, requirements=requirements)
+        ast.parse(code)
+        assert code.count(generate_class_name("Build an API")) == 2
+
+
+def test_code_generation_is_memoized(tmp_path):
+    """Test memory and database hits for equivalent generation requests"""
+    generator = make_generator(tmp_path)
+    first = generate(generator, requirements=["api", "database"])
+    assert generate(generator, description=" Build  an API ", requirements=["database", "api"]) == first
+
+    restarted = make_generator(tmp_path)
+    assert generate(restarted, requirements=["database", "api"]) == first
+
+    assert generator.cache_stats()["memory"] == 1
+    assert restarted.cache_stats()["database"] == 1
+    assert restarted.cache_stats()["hit_ratio"] == 1.0
+
+
+def test_cache_key_includes_upstream_results(tmp_path):
+    """Test that dependent tasks miss the cache when upstream code or knowledge changes"""
+    generator = make_generator(tmp_path)
+    schema = {"language": "python", "generated_code": "SCHEMA = 1\n", "knowledge": []}
+    first = generate(generator, upstream={"task_0": schema})
+    assert generate(generator, upstream={"task_0": dict(schema)}) == first
+    assert generator.cache_stats()["memory"] == 1
+
+    generate(generator, upstream={"task_0": {**schema, "generated_code": "SCHEMA = 2\n"}})
+    generate(generator, upstream={"task_0": {**schema, "knowledge": [{"topic": "orm", "content": "x"}]}})
+    generate(generator)
+    assert generator.cache_stats()["miss"] == 4
+
+
+def test_cache_key_follows_plugin_and_template(tmp_path):
+    """Test database hits after a restart and misses when the plugin or its template changes"""
+    def plugin(template_source="// {{ description }}\n{{ requirements_code }}\n", snippet="// api"):
+        return LanguagePlugin(name="rust", template="rust.rs.j2", template_source=template_source,
+                              requirement_snippets={"api": [snippet]})
+
+    def restart(rust_plugin):
+        generator = make_generator(tmp_path)
+        generator.registry.register("rust", rust_plugin)
+        return generator
+
+    first = generate(restart(plugin()), language="rust", requirements=["api"])
+    assert first == "// Build an API\n// api\n"
+
+    same = restart(plugin())
+    assert generate(same, language="rust", requirements=["api"]) == first
+    assert same.cache_stats()["database"] == 1
+
+    snippet_changed = restart(plugin(snippet="// api v2"))
+    assert generate(snippet_changed, language="rust", requirements=["api"]) == "// Build an API\n// api v2\n"
+    assert snippet_changed.cache_stats()["miss"] == 1
+
+    template_changed = restart(plugin(template_source="/* {{ description }} */\n"))
+    assert generate(template_changed, language="rust", requirements=["api"]) == "/* Build an API */\n"
+    assert template_changed.cache_stats()["miss"] == 1
+
+    registry = template_changed.registry
+    assert registry.version("RUST") == registry.version("rust") != snippet_changed.registry.version("rust")
+    assert registry.version("brainfuck") == registry.version("generic")
@@ -0,0 +1,64 @@
+import ast
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "ai_core"))
+
+import parsed_source
+from code_metrics import compute_code_metrics
+from code_rewriter import rewrite_python
+from parsed_source import ParsedSourceCache, get_parsed_source
+from security_rules import scan_source
+
+SOURCE = '''# config
+def connect(user):
+    password = "hunter2"  # ملاحظة
+    return eval(user)
+'''
+
+
+def test_parsed_source_artifacts():
+    parsed = get_parsed_source(SOURCE)
+    assert parsed is get_parsed_source(SOURCE)
+    assert isinstance(parsed.tree, ast.Module)
+    assert parsed.comment_lines == {1, 3}
+    assert parsed.line_offsets[:3] == [0, 9, 28]
+    assert parsed.byte_line_offsets[3] > parsed.line_offsets[3]
+    assert parsed.line_of(SOURCE.index("eval")) == 4
+    namespace = {}
+    exec(parsed.code_object, namespace)
+    assert namespace["connect"]("1 + 1") == 2
+
+
+def test_syntax_error_is_cached():
+    parsed = get_parsed_source("def broken(:\n")
+    assert isinstance(parsed.syntax_error, SyntaxError)
+    try:
+        parsed.tree
+    except SyntaxError as e:
+        assert e is parsed.syntax_error
+    else:
+        raise AssertionError("expected SyntaxError")
+
+
+def test_cache_is_bounded_lru():
+    cache = ParsedSourceCache(max_size=2)
+    first = cache.get("a = 1\n")
+    cache.get("b = 2\n")
+    assert cache.get("a = 1\n") is first
+    cache.get("c = 3\n")
+    assert cache.get("a = 1\n") is first
+    assert cache.stats() == {"size": 2, "max_size": 2, "hits": 2, "misses": 3}
+
+
+def test_analyzers_share_one_parse(monkeypatch):
+    code = SOURCE + "\n# unique blob for this test\n"
+    calls = []
+    original_parse = ast.parse
+    monkeypatch.setattr(parsed_source.ast, "parse", lambda *args, **kwargs: calls.append(1) or original_parse(*args, **kwargs))
+
+    assert rewrite_python(code) == (code, [])
+    assert compute_code_metrics(code, "python")["functions"] == 1
+    assert [v["line_number"] for v in scan_source(code, "python")] == [3, 4]
+    get_parsed_source(code).code_object
+    assert len(calls) == 1
@@ -0,0 +1,98 @@
+import asyncio
+import os
+import sqlite3
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "ai_core"))
+
+from autonomous_programmer import CodeGenerator, KnowledgeBase, SelfImprovementEngine
+from pattern_mining import count_patterns, extract_code_patterns
+
+ASYNC_CODE = '''
+class Worker:
+    async def run(self) -> None:
+        """Run once"""
+        try:
+            await self.step()
+        except ValueError:
+            pass
+'''
+
+
+def test_extract_code_patterns_uses_ast():
+    """Test that patterns come from the syntax tree, not substrings"""
+    patterns = extract_code_patterns(ASYNC_CODE)
+    assert patterns["object_oriented"] == 1
+    assert patterns["asynchronous"] == 2
+    assert patterns["error_handling"] == 1
+    assert patterns["type_hints"] == 1
+
+    assert extract_code_patterns("text = 'class try: async def'") == {}
+    assert extract_code_patterns("function () {") == {}
+
+
+def test_mining_processes_only_new_outcomes(tmp_path):
+    """Test that pattern counts are merged incrementally past the watermark"""
+    knowledge_base = KnowledgeBase(db_path=str(tmp_path / "knowledge.db"))
+    generator = CodeGenerator(knowledge_base)
+    engine = SelfImprovementEngine(knowledge_base, generator)
+    engine.MINING_CHUNK_SIZE = 1
+
+    conn = sqlite3.connect(knowledge_base.db_path)
+    conn.executemany(
+        "INSERT INTO generated_codes (language, description, code, hash) VALUES (?, ?, ?, ?)",
+        [("python", "a", ASYNC_CODE, "a"), ("python", "b", "[x for x in y]", "b")]
+    )
+    conn.commit()
+
+    def patterns():
+        return dict(conn.execute("SELECT pattern, codes FROM code_patterns"))
+
+    def knowledge_count():
+        return conn.execute(
+            "SELECT COUNT(*) FROM knowledge WHERE topic = 'successful_patterns'"
+        ).fetchone()[0]
+
+    generator.record_outcome("a", True)
+    generator.record_outcome("b", True)
+    generator.record_outcome("b", False)
+    asyncio.run(engine._improve_code_generation())
+    pool = engine._mining_pool
+    assert pool is not None
+    assert patterns()["object_oriented"] == 1
+    assert patterns()["comprehension"] == 1
+    first_knowledge = knowledge_count()
+
+    asyncio.run(engine._improve_code_generation())
+    assert patterns()["object_oriented"] == 1
+
+    generator.record_outcome("a", True)
+    generator.record_outcome("b", True)
+    asyncio.run(engine._improve_code_generation())
+    assert patterns()["object_oriented"] == 2
+    assert patterns()["comprehension"] == 2
+    assert knowledge_count() == first_knowledge
+    # نفس العمليات تخدم الدورات المتتالية
+    assert engine._mining_pool is pool
+    engine.close()
+    assert engine._mining_pool is None
+
+    rate = conn.execute("SELECT success_rate FROM generated_codes WHERE hash = 'b'").fetchone()[0]
+    assert round(rate, 6) == round(2 / 3, 6)
+    conn.close()
+
+
+
+def test_mining_workers_import_only_pattern_mining():
+    """Test that the worker module pulls in no application modules"""
+    script = (
+        "import sys; import pattern_mining; "
+        "print(sorted(name for name in ('autonomous_programmer', 'web_interface', 'fastapi') if name in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True,
+        cwd=os.path.join(os.path.dirname(__file__), "..", "ai_core")
+    )
+    assert result.stdout.strip() == "[]"
+    assert count_patterns.__module__ == "pattern_mining"
@@ -0,0 +1,114 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "ai_core"))
+
+from advanced_features import PerformanceProfiler
+
+BUSY_SOURCE = """
+def work(n):
+    return sum(i * i for i in range(n))
+
+data = [work(20000) for _ in range(20)]
+print(len(data))
+"""
+
+
+def test_profile_runs_in_child_with_resources(tmp_path):
+    profiler = PerformanceProfiler(str(tmp_path / "baselines.db"))
+    result = asyncio.run(profiler.profile_code_execution(BUSY_SOURCE, "python", benchmark=True))
+    assert result["error"] is None
+    assert result["output"].strip() == "20"
+    assert result["execution_time"] > 0
+    assert result["cpu_time"] > 0 and result["cpu_usage"] > 0
+    assert result["peak_rss_mb"] > 0
+    assert result["allocations"] and "line" in result["allocations"][0]
+    # النقاط من وسيط التشغيلات المتكررة
+    assert result["benchmark"]["summary"]["count"] == profiler.BENCHMARK_REPEAT
+    # نقاط الاختناق من بيانات pstats الخام
+    hottest = result["bottlenecks"][0]
+    assert hottest["function"] == "<genexpr>" and hottest["file"] == "<generated>" and hottest["line"] == 3
+    assert any(edge["callee"] == "work (<generated>:2)" and edge["calls"] == 20 and edge["call_lines"] == [5]
+               for edge in result["hot_calls"])
+    # القياس لا يغير خطوط الأساس ما لم يُطلب حفظها
+    assert profiler.baselines.get(result["benchmark"]["key"]) is None
+
+
+def test_profile_benchmarks_only_when_asked(tmp_path):
+    profiler = PerformanceProfiler(str(tmp_path / "baselines.db"))
+    result = asyncio.run(profiler.profile_code_execution(BUSY_SOURCE, "python"))
+    assert result["error"] is None and result["benchmark"] is None
+    assert profiler.benchmarks == {}
+
+    result = asyncio.run(profiler.profile_code_execution(BUSY_SOURCE, "python", benchmark=True, save_baseline=True))
+    assert profiler.baselines.get(result["benchmark"]["key"])["code_hash"] == result["benchmark"]["code_hash"]
+
+
+def test_profile_enforces_limits(tmp_path):
+    profiler = PerformanceProfiler(str(tmp_path / "baselines.db"))
+    profiler.PROFILE_TIMEOUT = 1
+    result = asyncio.run(profiler.profile_code_execution("while True:\n    pass\n", "python"))
+    assert result["performance_score"] == 0.0
+    assert result["error"] in ("انتهت مهلة التنفيذ", "تجاوز حد وقت المعالج")
+
+    profiler = PerformanceProfiler(str(tmp_path / "baselines.db"))
+    profiler.PROFILE_MEMORY_LIMIT_MB = 256
+    result = asyncio.run(profiler.profile_code_execution("blob = bytearray(1024 ** 3)\n", "python"))
+    assert result["error"].startswith("MemoryError")
+
+
+def test_profile_reports_syntax_errors_without_running(tmp_path):
+    profiler = PerformanceProfiler(str(tmp_path / "baselines.db"))
+    result = asyncio.run(profiler.profile_code_execution("def broken(:\n", "python"))
+    assert result["error"].startswith("خطأ في بناء الجملة")
+    assert "resources" not in result
+
+
+def test_sampling_mode_exports_flamegraph(tmp_path):
+    source = "def inner(n):\n    return sum(i * i for i in range(n))\n\ndef outer():\n    for _ in range(60):\n        inner(50000)\n\nouter()\n"
+    result = asyncio.run(PerformanceProfiler(str(tmp_path / "baselines.db")).profile_code_execution(
+        source, "python", mode="sampling", sample_interval=0.001))
+    assert result["error"] is None and result["mode"] == "sampling"
+    assert result["samples"] > 10
+    collapsed = result["flamegraph"]["collapsed"].splitlines()
+    assert all(line.startswith("<module> (<generated>:1);outer (<generated>:4)") for line in collapsed)
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in collapsed) == result["samples"]
+    speedscope = result["flamegraph"]["speedscope"]
+    profile = speedscope["profiles"][0]
+    assert profile["type"] == "sampled" and len(profile["samples"]) == len(profile["weights"])
+    names = {frame["name"] for frame in speedscope["shared"]["frames"]}
+    assert {"<module>", "outer", "inner"} <= names
+    assert any(b.startswith(("inner", "<genexpr>", "inner.<locals>")) for b in result["bottlenecks"])
+
+
+def test_benchmark_flags_significant_regressions(tmp_path):
+    profiler = PerformanceProfiler(str(tmp_path / "baselines.db"))
+    fast = "total = sum(range(20000))\n"
+    slow = "total = sum(range(200000))\n"
+
+    first = asyncio.run(profiler.benchmark_code(fast, name="sum", repeat=15))
+    assert first["baseline"] is None and first["regression"] is False
+    summary = first["summary"]
+    assert summary["count"] == 15
+    assert summary["min_ns"] <= summary["median_ns"] <= summary["p95_ns"]
+
+    regressed = asyncio.run(profiler.benchmark_code(slow, name="sum", repeat=15))
+    assert regressed["regression"] is True
+    assert regressed["baseline"]["p_value"] < 0.01 and regressed["baseline"]["median_change"] > 1
+    # خط الأساس لا يُستبدل بتشغيل متراجع
+    assert profiler.baselines.get("sum")["code_hash"] == first["code_hash"]
+    assert profiler.benchmarks["sum"] is regressed
+
+
+def test_benchmark_runs_under_profile_limits(tmp_path):
+    profiler = PerformanceProfiler(str(tmp_path / "baselines.db"))
+    profiler.PROFILE_MEMORY_LIMIT_MB = 256
+    result = asyncio.run(profiler.benchmark_code("blob = bytearray(1024 ** 3)\n", repeat=2))
+    assert result["error"].startswith("MemoryError") and "summary" not in result
+    assert result["limits"]["memory_limit_mb"] == 256
+
+    profiler.PROFILE_TIMEOUT = 1
+    result = asyncio.run(profiler.benchmark_code("while True:\n    pass\n", repeat=2))
+    assert result["error"] in ("انتهت مهلة القياس", "تجاوز حد وقت المعالج")
+    assert profiler.baselines.get(result["key"]) is None
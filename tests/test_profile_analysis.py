@@ -0,0 +1,74 @@
+import cProfile
+import os
+import pstats
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "ai_core"))
+
+from profile_analysis import analyze_stats
+
+SOURCE = """def fib(n):
+    return n if n < 2 else fib(n - 1) + fib(n - 2)
+
+def slow_lookup(items, targets):
+    found = 0
+    for t in targets:
+        if t in items:
+            found += 1
+    return found
+
+def build(n):
+    out = []
+    for i in range(n):
+        out.append(i * 2)
+    return out
+
+fib(20)
+data = build(100000)
+slow_lookup(data[:2000], list(range(2000)))
+"""
+
+
+def _stats(source):
+    profiler = cProfile.Profile()
+    compiled = compile(source, "<generated>", "exec")
+    profiler.enable()
+    exec(compiled, {"__name__": "__main__"})
+    profiler.disable()
+    return pstats.Stats(profiler).stats
+
+
+def test_ranks_functions_and_maps_source_lines():
+    analysis = analyze_stats(_stats(SOURCE), SOURCE)
+    by_name = {entry["function"]: entry for entry in analysis["bottlenecks"]}
+    assert {"build", "slow_lookup"} <= set(by_name)
+    assert by_name["slow_lookup"]["line"] == 4
+    assert by_name["slow_lookup"]["source"] == "def slow_lookup(items, targets):"
+    self_times = [entry["self_time"] for entry in analysis["bottlenecks"]]
+    assert self_times == sorted(self_times, reverse=True)
+    # أدوات القياس والمستوى الأعلى للوحدة خارج الترتيب التراكمي
+    assert all(entry["function"] not in ("<module>", "<built-in method builtins.exec>")
+               for entry in analysis["cumulative"])
+    fib = next(entry for entry in analyze_stats(_stats(SOURCE), SOURCE, limit=20)["cumulative"]
+               if entry["function"] == "fib")
+    assert fib["calls"] > fib["primitive_calls"] == 1
+
+
+def test_hot_calls_point_at_call_sites():
+    analysis = analyze_stats(_stats(SOURCE), SOURCE, limit=20)
+    edges = {(edge["caller"], edge["callee"]): edge for edge in analysis["hot_calls"]}
+    assert edges[("<module> (<generated>:1)", "build (<generated>:11)")]["call_lines"] == [18]
+    append = edges[("build (<generated>:11)", "<method 'append' of 'list' objects>")]
+    assert append["calls"] == 100000 and append["call_lines"] == [14]
+    assert edges[("fib (<generated>:1)", "fib (<generated>:1)")]["call_lines"] == [2]
+
+
+def test_suggestions_target_hot_spots():
+    suggestions = analyze_stats(_stats(SOURCE), SOURCE)["suggestions"]
+    assert any("slow_lookup" in s and "السطر 7" in s and "set" in s for s in suggestions)
+    assert any("build" in s and "السطر 14" in s for s in suggestions)
+    assert not any("NumPy" in s for s in suggestions)
+
+    recursive = "def fib(n):\n    return n if n < 2 else fib(n - 1) + fib(n - 2)\n\nfib(22)\n"
+    suggestions = analyze_stats(_stats(recursive), recursive)["suggestions"]
+    assert any(s.startswith("fib (<generated>:1)") and "lru_cache" in s for s in suggestions)
@@ -0,0 +1,105 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "ai_core"))
+
+from project_runner import OPTIMIZER_VERSION, iter_source_files, optimize_files, run_project, sources_digest
+
+LOOP_SOURCE = """def evens(items):
+    result = []
+    for item in items:
+        if item % 2 == 0:
+            result.append(item)
+    return result
+"""
+
+
+def _collect(root, cache_path, worker=optimize_files):
+    async def collect():
+        return [record async for record in run_project(
+            root, worker, "optimize", OPTIMIZER_VERSION,
+            cache_path=cache_path, max_workers=2, chunk_size=1)]
+    return asyncio.run(collect())
+
+
+def crashing_worker(files):
+    """عامل تنهار عمليته عند ملف JavaScript"""
+    if any(language == "javascript" for _, language in files):
+        os._exit(1)
+    return optimize_files(files)
+
+
+def _write_tree(root):
+    os.makedirs(os.path.join(root, "pkg"))
+    os.makedirs(os.path.join(root, "node_modules"))
+    with open(os.path.join(root, "pkg", "loops.py"), "w") as f:
+        f.write(LOOP_SOURCE)
+    with open(os.path.join(root, "app.js"), "w") as f:
+        f.write("function add(a, b) { return a + b; }\n")
+    with open(os.path.join(root, "node_modules", "dep.js"), "w") as f:
+        f.write("module.exports = 1;\n")
+    with open(os.path.join(root, "notes.txt"), "w") as f:
+        f.write("not source\n")
+
+
+def test_iter_source_files_skips_excluded_dirs(tmp_path):
+    _write_tree(str(tmp_path))
+    files = [(os.path.relpath(path, tmp_path), language) for path, language in iter_source_files(str(tmp_path))]
+    assert files == [("app.js", "javascript"), (os.path.join("pkg", "loops.py"), "python")]
+
+
+def test_run_project_streams_results_and_reuses_cache(tmp_path):
+    root = tmp_path / "project"
+    _write_tree(str(root))
+    cache_path = str(tmp_path / "cache.db")
+
+    first = _collect(str(root), cache_path)
+    files = {record["path"]: record for record in first if record["type"] == "file"}
+    summary = first[-1]
+    assert summary["type"] == "summary"
+    assert (summary["files"], summary["analyzed"], summary["cached"], summary["errors"]) == (2, 2, 0, 0)
+
+    loops = files[os.path.join("pkg", "loops.py")]
+    assert [change["name"] for change in loops["suggested_optimizations"]] == ["list_comprehension"]
+    assert "result = [item for item in items if item % 2 == 0]" in loops["suggested_code"]
+    # الملف لا يُشغل فلا يُتحقق من التحويل: المقاييس للكود كما هو على القرص
+    assert "optimized_code" not in loops
+    assert loops["metrics"]["lines"] == LOOP_SOURCE.count("\n")
+    assert files["app.js"]["metrics"]["functions"] == 1
+
+    # تعديل ملف واحد: يُعاد تحليله فقط
+    with open(root / "app.js", "a") as f:
+        f.write("function sub(a, b) { return a - b; }\n")
+    second = _collect(str(root), cache_path)
+    files = {record["path"]: record for record in second if record["type"] == "file"}
+    assert (second[-1]["analyzed"], second[-1]["cached"]) == (1, 1)
+    assert files[os.path.join("pkg", "loops.py")]["cached"] is True
+    assert files[os.path.join("pkg", "loops.py")]["suggested_code"] == loops["suggested_code"]
+    assert files["app.js"]["cached"] is False
+    assert files["app.js"]["metrics"]["functions"] == 2
+
+
+def test_optimizer_version_follows_rewriter_and_metrics_sources(tmp_path):
+    import code_metrics
+    import code_rewriter
+
+    rewriter = tmp_path / "code_rewriter.py"
+    rewriter.write_text(open(code_rewriter.__file__, encoding="utf-8").read(), encoding="utf-8")
+    before = sources_digest([str(rewriter), code_metrics.__file__])
+    rewriter.write_text(rewriter.read_text(encoding="utf-8") + "\n# edited\n", encoding="utf-8")
+    assert sources_digest([str(rewriter), code_metrics.__file__]) != before
+    assert len(OPTIMIZER_VERSION) == 16 and OPTIMIZER_VERSION != "1"
+
+
+def test_run_project_reports_worker_crashes_per_file(tmp_path):
+    root = tmp_path / "project"
+    _write_tree(str(root))
+
+    records = _collect(str(root), None, worker=crashing_worker)
+    files = {record["path"]: record for record in records if record["type"] == "file"}
+    summary = records[-1]
+    # كل ملف يظهر مرة واحدة ويكتمل البث بملخصه رغم انهيار العملية
+    assert summary["type"] == "summary" and summary["files"] == 2 == len(files)
+    assert files["app.js"]["error"].startswith("BrokenProcessPool")
+    assert summary["errors"] >= 1
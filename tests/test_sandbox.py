@@ -0,0 +1,43 @@
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "ai_core"))
+
+from sandbox import run_process, run_process_async
+
+
+def test_run_process_reports_resources():
+    """Test that a finished child reports its output and rusage"""
+    result = run_process([sys.executable, "-c", "print(sum(range(100000)))"], timeout=10)
+    assert result["returncode"] == 0
+    assert result["stdout"].strip() == str(sum(range(100000)))
+    assert not result["timed_out"]
+    assert result["resources"]["max_rss_kb"] > 0
+    assert result["resources"]["cpu_user"] >= 0
+
+
+def test_run_process_kills_on_timeout():
+    """Test that a child exceeding its timeout is killed"""
+    result = run_process([sys.executable, "-c", "import time; time.sleep(30)"], timeout=0.5)
+    assert result["timed_out"]
+    assert result["returncode"] != 0
+
+
+def test_run_process_async_cancellation_kills_child():
+    """Test that cancelling the awaiting task kills the child process"""
+    async def run():
+        job = asyncio.create_task(
+            run_process_async([sys.executable, "-c", "import time; time.sleep(30)"], timeout=30)
+        )
+        await asyncio.sleep(0.3)
+        started = time.perf_counter()
+        job.cancel()
+        try:
+            await job
+        except asyncio.CancelledError:
+            pass
+        return time.perf_counter() - started
+
+    assert asyncio.run(run()) < 5
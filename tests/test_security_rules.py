@@ -0,0 +1,85 @@
+import asyncio
+import json
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "ai_core"))
+
+from advanced_features import AdvancedSecurityScanner
+from security_rules import SECURITY_RULES, RuleSet, scan_source, stream_sarif
+
+PYTHON_SOURCE = '''import sqlite3
+
+def load(cursor, user):
+    cursor.execute("SELECT * FROM users WHERE name = '%s'" % user); eval(user)
+    password = "hunter2"
+    return EVAL (user)
+'''
+
+
+def _naive_scan(code, rules):
+    """التنفيذ المرجعي: تعبير لكل قاعدة ورقم السطر بالعد"""
+    found = []
+    for rule in rules:
+        for match in re.finditer(rule["pattern"], code, re.MULTILINE | re.IGNORECASE):
+            found.append((rule["rule_id"], code[:match.start()].count("\n") + 1, match.group(0)))
+    return found
+
+
+def test_scan_matches_per_rule_reference():
+    found = [(v["rule_id"], v["line_number"], v["code_snippet"]) for v in scan_source(PYTHON_SOURCE, "python")]
+    assert found == _naive_scan(PYTHON_SOURCE, SECURITY_RULES["python"])
+    assert [(rule_id, line) for rule_id, line, _ in found] == [
+        ("SQL_INJECTION", 4), ("HARDCODED_PASSWORD", 5), ("UNSAFE_EVAL", 4), ("UNSAFE_EVAL", 6),
+    ]
+
+
+def test_prefilter_skips_rules_and_handles_nested_literals():
+    rules = [
+        {"rule_id": "OUTER", "pattern": r"innerHTML\s*=", "literals": ["innerHTML"], "severity": "HIGH", "description": ""},
+        {"rule_id": "INNER", "pattern": r"HTML", "literals": ["html"], "severity": "LOW", "description": ""},
+        {"rule_id": "ALWAYS", "pattern": r"^var ", "severity": "LOW", "description": ""},
+    ]
+    compiled = RuleSet(rules)
+    assert [v["rule_id"] for v in compiled.scan("el.innerHTML = x\n")] == ["OUTER", "INNER"]
+    assert [v["rule_id"] for v in compiled.scan("var a = 1\n")] == ["ALWAYS"]
+
+
+def test_scanner_reports_fix_suggestions():
+    scanner = AdvancedSecurityScanner()
+    results = asyncio.run(scanner.scan_code_security("el.innerHTML = '<b>' + name;\n", "JavaScript"))
+    assert [v["rule_id"] for v in results["vulnerabilities"]] == ["XSS_VULNERABILITY"]
+    assert "textContent" in results["vulnerabilities"][0]["fix_suggestion"]
+    assert results["security_score"] == 80
+
+
+def test_scan_project_caches_by_ruleset_and_streams_sarif(tmp_path):
+    root = tmp_path / "repo"
+    root.mkdir()
+    (root / "app.py").write_text('password = "secret"\n')
+    (root / "clean.py").write_text("print('ok')\n")
+    cache_path = str(tmp_path / "cache.db")
+    scanner = AdvancedSecurityScanner()
+
+    async def scan():
+        return [record async for record in scanner.scan_project(str(root), cache_path=cache_path, max_workers=1)]
+
+    first = asyncio.run(scan())
+    assert (first[-1]["analyzed"], first[-1]["cached"]) == (2, 0)
+    second = asyncio.run(scan())
+    assert (second[-1]["analyzed"], second[-1]["cached"]) == (0, 2)
+    files = {record["path"]: record for record in second if record["type"] == "file"}
+    assert [v["rule_id"] for v in files["app.py"]["vulnerabilities"]] == ["HARDCODED_PASSWORD"]
+    assert files["app.py"]["security_score"] == 90
+
+    async def sarif():
+        return "".join([chunk async for chunk in stream_sarif(scanner.scan_project(str(root), cache_path=cache_path))])
+
+    document = json.loads(asyncio.run(sarif()))
+    run = document["runs"][0]
+    assert document["version"] == "2.1.0"
+    assert [(r["ruleId"], r["level"]) for r in run["results"]] == [("HARDCODED_PASSWORD", "warning")]
+    location = run["results"][0]["locations"][0]["physicalLocation"]
+    assert (location["artifactLocation"]["uri"], location["region"]["startLine"]) == ("app.py", 1)
+    assert run["properties"]["summary"]["files"] == 2
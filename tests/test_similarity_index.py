@@ -0,0 +1,34 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "ai_core"))
+
+from similarity_index import MinHashLSHIndex, task_text
+
+
+def test_finds_paraphrased_tasks(tmp_path):
+    """Test that near-duplicate descriptions match and unrelated ones do not"""
+    index = MinHashLSHIndex(path=str(tmp_path / "index.dat"), threshold=0.5)
+    index.add("task_1", "python", task_text("Build a REST API for managing users", ["database"]))
+    index.add("task_2", "python", task_text("Write a script that resizes images", []))
+
+    matches = index.query("python", task_text("build a rest api for managing the users", ["database"]))
+    assert [match["task_id"] for match in matches] == ["task_1"]
+    assert 0.5 <= matches[0]["similarity"] <= 1.0
+
+    assert index.query("javascript", task_text("Build a REST API for managing users", ["database"])) == []
+    assert index.query("python", task_text("Train a neural network on audio", [])) == []
+
+
+def test_index_persists_incrementally(tmp_path):
+    """Test that entries appended to disk are reloaded, ignoring a torn last line"""
+    path = tmp_path / "index.dat"
+    index = MinHashLSHIndex(path=str(path))
+    index.add("task_1", "python", "Parse CSV files into JSON")
+    index.add("task_1", "python", "Parse CSV files into JSON")
+    with open(path, "a") as index_file:
+        index_file.write("task_2\tpython\tAAA")
+
+    reloaded = MinHashLSHIndex(path=str(path))
+    assert len(reloaded) == 1
+    assert reloaded.query("python", "Parse CSV files into JSON")[0] == {"task_id": "task_1", "similarity": 1.0}
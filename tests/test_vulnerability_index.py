@@ -0,0 +1,99 @@
+import asyncio
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "ai_core"))
+
+from advanced_features import AdvancedSecurityScanner
+from vulnerability_index import (
+    DEFAULT_DATASET, VulnerabilityIndex, extract_dependencies, parse_version, write_dataset,
+)
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "data", "vulnerabilities.tsv")
+
+
+def test_parse_version_ordering():
+    assert parse_version("1.0") == parse_version("1.0.0")
+    assert parse_version("2.0-beta9") < parse_version("2.0") < parse_version("2.0.1")
+    assert parse_version("2.9") < parse_version("2.10")
+    assert parse_version("2.0-beta8") < parse_version("2.0b9") < parse_version("2.0rc1") < parse_version("2.0")
+    assert parse_version("1.2") < parse_version("1.2.post1") < parse_version("1.2.1")
+
+
+def test_lookup_by_version_range():
+    index = VulnerabilityIndex(FIXTURE)
+    assert [a["advisory_id"] for a in index.lookup("pypi", "Requests", "2.19.1")] == ["CVE-2018-18074", "CVE-2023-32681"]
+    assert [a["advisory_id"] for a in index.lookup("pypi", "requests", "2.25.0")] == ["CVE-2023-32681"]
+    assert index.lookup("pypi", "requests", "2.31.0") == []
+    assert index.lookup("pypi", "requests") == []
+    assert [a["advisory_id"] for a in index.lookup("pypi", "abandoned_lib")] == ["TEST-0001"]
+    assert index.lookup("maven", "org.apache.logging.log4j", "2.0-beta8") == []
+    assert index.lookup("pypi", "missing", "1.0") == []
+    assert VulnerabilityIndex(DEFAULT_DATASET).lookup("maven", "org.apache.logging.log4j", "2.14.1")
+
+
+def test_binary_search_matches_linear_scan(tmp_path):
+    rng = random.Random(7)
+    advisories = [
+        {"ecosystem": rng.choice(["pypi", "npm"]), "package": f"pkg{rng.randrange(3000)}",
+         "fixed": f"1.{rng.randrange(20)}", "advisory_id": f"ID-{n}"}
+        for n in range(20000)
+    ]
+    path = str(tmp_path / "large.tsv")
+    write_dataset(path, advisories)
+    index = VulnerabilityIndex(path)
+    for package in ["pkg0", "pkg17", "pkg1500", "pkg2999", "pkg3000", "aaa", "zzz"]:
+        for ecosystem in ["npm", "pypi"]:
+            expected = sorted(a["advisory_id"] for a in advisories
+                              if a["ecosystem"] == ecosystem and a["package"] == package)
+            assert sorted(a["advisory_id"] for a in index.advisories(ecosystem, package)) == expected
+
+
+def test_extract_dependencies_from_imports_and_pins():
+    code = "import os\nimport yaml\nfrom requests.adapters import HTTPAdapter\nimport requests\n"
+    dependencies = extract_dependencies(code, "python", ["PyYAML==5.3", "urllib3==1.24.1"])
+    assert [(d.name, d.version, d.line) for d in dependencies] == [
+        ("pyyaml", "5.3", 2), ("requests", None, 3), ("urllib3", "1.24.1", None),
+    ]
+    js = "const _ = require('lodash');\nimport x from './local';\nimport { a } from '@scope/pkg/sub';\n"
+    assert [(d.name, d.line) for d in extract_dependencies(js, "javascript")] == [("lodash", 1), ("@scope/pkg", 3)]
+
+
+def test_java_imports_report_one_coordinate():
+    code = (
+        "import java.util.List;\n"
+        "import org.apache.logging.log4j.LogManager;\n"
+        "import org.apache.logging.log4j.core.config.Configurator;\n"
+        "import com.example.util.Strings;\n"
+    )
+    dependencies = extract_dependencies(code, "java")
+    # استيراد حزمة فرعية يُدمج في التبعية المبلغ عنها سابقاً
+    assert [(d.name, d.line) for d in dependencies] == [("org.apache.logging.log4j", 2), ("com.example.util", 4)]
+    # البادئات تُطابق المتطلبات المثبتة ولا تظهر كتبعيات
+    dependencies = extract_dependencies(code, "java", ["org.apache.logging.log4j:log4j-core:2.14.1"])
+    assert [(d.name, d.version) for d in dependencies] == [
+        ("org.apache.logging.log4j", "2.14.1"), ("com.example.util", None),
+    ]
+    # دون متطلبات تُحل البادئة إلى المجموعة في البيانات وتُفحص مرة واحدة
+    dependencies = extract_dependencies(code.split("\n", 2)[2], "java")
+    assert [d.name for d in dependencies] == ["org.apache.logging.log4j.core", "com.example.util"]
+    findings = VulnerabilityIndex(FIXTURE).check(dependencies)
+    assert [d.name for d in dependencies] == ["org.apache.logging.log4j", "com.example.util"]
+    # دون إصدار معروف لا تنطبق إلا النطاقات المفتوحة، ونطاقات log4j لها إصدار مُصلح
+    assert findings == []
+
+
+def test_scanner_reports_vulnerable_dependencies():
+    scanner = AdvancedSecurityScanner(FIXTURE)
+    code = "import org.apache.logging.log4j.LogManager;\n\npublic class App {}\n"
+    results = asyncio.run(scanner.scan_code_security(
+        code, "java", ["org.apache.logging.log4j:log4j-core:2.14.1"]))
+    findings = [v for v in results["vulnerabilities"] if v["rule_id"] == "VULNERABLE_DEPENDENCY"]
+    assert [(v["advisory_id"], v["line_number"], v["version"]) for v in findings] == [("CVE-2021-44228", 1, "2.14.1")]
+    assert "2.15.0" in findings[0]["fix_suggestion"]
+    assert results["security_score"] == 70
+    assert [(d["name"], d["version"]) for d in results["dependencies"]] == [("org.apache.logging.log4j", "2.14.1")]
+
+    results = asyncio.run(scanner.scan_code_security("import abandoned_lib\n", "python"))
+    assert [v["advisory_id"] for v in results["vulnerabilities"]] == ["TEST-0001"]